@@ -0,0 +1,72 @@
+"""
+Benchmark the compression of sdist archives, comparing gzip.GzipFile to the
+block-parallel ParallelGzipFile of py-build-cmake, for the given compression
+level. The input is a tar archive of a generated tree of source files.
+
+Usage: python scripts/bench_sdist_gzip.py [size in MiB] [compression level]
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import random
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from py_build_cmake.export.parallel_gzip import ParallelGzipFile
+
+
+def create_tar(size: int) -> bytes:
+    """Tar archive of source-like files with a total size of about size."""
+    rng = random.Random(0)
+    words = [
+        "".join(
+            rng.choice("abcdefghijklmnopqrstuvwxyz_") for _ in range(rng.randint(2, 12))
+        )
+        for _ in range(2000)
+    ]
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w", format=tarfile.PAX_FORMAT) as tf:
+        i = 0
+        while buf.tell() < size:
+            lines = (
+                " ".join(rng.choices(words, k=rng.randint(1, 12)))
+                for _ in range(rng.randint(10, 2000))
+            )
+            data = "\n".join(lines).encode()
+            ti = tarfile.TarInfo(f"src/mod{i // 100}/f{i}.cpp")
+            ti.size = len(data)
+            tf.addfile(ti, io.BytesIO(data))
+            i += 1
+    return buf.getvalue()
+
+
+def main():
+    size = int(float(sys.argv[1]) * (1 << 20)) if len(sys.argv) > 1 else 100 << 20
+    level = int(sys.argv[2]) if len(sys.argv) > 2 else 9
+    data = create_tar(size)
+    print(f"{len(data) / (1 << 20):.1f} MiB, level {level}")
+    with tempfile.TemporaryDirectory() as tmp:
+        openers = {
+            "GzipFile": lambda p: gzip.GzipFile(p, "wb", level),
+            "parallel": lambda p: ParallelGzipFile(p, level),
+        }
+        for name, opener in openers.items():
+            path = Path(tmp) / f"{name}.tar.gz"
+            start = time.perf_counter()
+            with opener(path) as f:
+                for i in range(0, len(data), 1 << 16):
+                    f.write(data[i : i + (1 << 16)])
+            elapsed = time.perf_counter() - start
+            compressed = path.stat().st_size / (1 << 20)
+            print(f"{name:>10}: {elapsed:.3f} s, {compressed:.2f} MiB")
+            assert gzip.decompress(path.read_bytes()) == data
+
+
+if __name__ == "__main__":
+    main()
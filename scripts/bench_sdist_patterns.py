@@ -0,0 +1,135 @@
+"""
+Benchmark the selection of sdist files using include and exclude patterns,
+comparing the previous implementation (which expands every pattern using
+Path.glob, and checks every file against all matching directories) to the
+compiled patterns of py-build-cmake's FilePatterns. Both implementations
+should select the same files.
+
+Usage: python scripts/bench_sdist_patterns.py [number of files] [number of patterns]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from py_build_cmake.export.sdist import FilePatterns
+
+
+class GlobFilePatterns:
+    """The previous implementation of FilePatterns."""
+
+    def __init__(self, patterns: Iterable[str], basedir: Path):
+        self.basedir = basedir
+        self.dirs = set()
+        self.files = set()
+        for pattern in patterns:
+            for path in sorted(basedir.glob(pattern)):
+                rel = path.relative_to(basedir)
+                if path.is_dir():
+                    self.dirs.add(rel)
+                else:
+                    self.files.add(rel)
+
+    def match_file(self, rel_path: Path) -> bool:
+        if rel_path in self.files:
+            return True
+        return any(d in rel_path.parents for d in self.dirs)
+
+    def match_dir(self, rel_path: Path) -> bool:
+        if rel_path in self.dirs:
+            return True
+        return any(d in rel_path.parents for d in self.dirs)
+
+
+def select_glob(includes: list[str], excludes: list[str], basedir: Path):
+    inc = GlobFilePatterns(includes, basedir)
+    exc = GlobFilePatterns(excludes, basedir)
+    files = {f for f in inc.files if not exc.match_file(f)}
+    for rel_d in inc.dirs:
+        for dirpath, dirs, dfiles in os.walk(basedir / rel_d):
+            for file in dfiles:
+                f_rel = (Path(dirpath) / file).relative_to(basedir)
+                if not exc.match_file(f_rel):
+                    files.add(f_rel)
+            dirs[:] = [
+                d
+                for d in dirs
+                if not exc.match_dir((Path(dirpath) / d).relative_to(basedir))
+            ]
+    return sorted(files)
+
+
+def select_compiled(includes: list[str], excludes: list[str], basedir: Path):
+    from py_build_cmake.export.sdist import SdistBuilder
+
+    builder = SdistBuilder.__new__(SdistBuilder)
+    builder.cfgdir = basedir
+    builder.includes = FilePatterns(includes, basedir)
+    builder.excludes = FilePatterns(excludes, basedir)
+    builder.prune, builder.prune_dirs = True, set()
+    builder.vcs = None
+    return sorted(builder.iter_included_files())
+
+
+def create_tree(root: Path, num_files: int) -> tuple[list[str], list[str]]:
+    """Create a tree of libraries with sources, tests and data files, and
+    return the names of the top-level and second-level directories."""
+    libs, subdirs = [], []
+    files_per_dir = 20
+    num_dirs = max(1, num_files // (4 * files_per_dir))
+    for i in range(num_dirs):
+        lib = f"lib{i % 50}"
+        sub = f"{lib}/mod{i // 50}"
+        for kind, ext in (("src", ".cpp"), ("include", ".hpp")):
+            d = root / sub / kind
+            d.mkdir(parents=True, exist_ok=True)
+            for j in range(files_per_dir):
+                (d / f"f{j}{ext}").touch()
+        for kind, ext in (("test", ".py"), ("data", ".bin")):
+            d = root / sub / kind
+            d.mkdir(parents=True, exist_ok=True)
+            for j in range(files_per_dir):
+                (d / f"f{j}{ext}").touch()
+        libs.append(lib)
+        subdirs.append(sub)
+    return sorted(set(libs)), subdirs
+
+
+def make_patterns(libs: list[str], subdirs: list[str], num_patterns: int):
+    includes = ["CMakeLists.txt", "**/*.cmake"]
+    excludes = ["**/*.bin"]
+    i = 0
+    while len(includes) + len(excludes) < num_patterns:
+        sub = subdirs[i % len(subdirs)]
+        includes += [f"{sub}/src", f"{sub}/include/*.hpp"]
+        excludes += [f"{sub}/test", f"{sub}/src/f1?.cpp"]
+        i += 1
+    return includes, excludes
+
+
+def main():
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    num_patterns = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        libs, subdirs = create_tree(root, num_files)
+        includes, excludes = make_patterns(libs, subdirs, num_patterns)
+        print(f"{num_files} files, {len(includes) + len(excludes)} patterns")
+        results = []
+        for name, select in (("glob", select_glob), ("compiled", select_compiled)):
+            start = time.perf_counter()
+            files = select(includes, excludes, root)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>10}: {len(files)} files selected in {elapsed:.3f} s")
+            results.append(files)
+        assert results[0] == results[1], "Implementations disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark the amount of file I/O needed to package a Wheel, comparing
+distlib's Wheel.build (which reads every file once to hash it for the RECORD
+file and once more to compress it) to py-build-cmake's WheelBuilder (which
+hashes and compresses in a single pass).
+
+Usage: python scripts/bench_wheel_io.py [total size in MiB] [number of files]
+
+Linux only: the number of bytes read is taken from /proc/self/io (rchar).
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from distlib.wheel import Wheel  # type: ignore[import-untyped]
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from py_build_cmake.export.wheel import WheelBuilder
+
+
+def bytes_read() -> int:
+    with Path("/proc/self/io").open() as f:
+        stats = dict(line.split(": ") for line in f.read().splitlines())
+    return int(stats["rchar"])
+
+
+def create_staging_dir(staging: Path, total_mib: int, num_files: int) -> int:
+    (staging / "pkg").mkdir(parents=True)
+    distinfo = staging / "pkg-1.0.dist-info"
+    distinfo.mkdir()
+    (distinfo / "METADATA").write_text(
+        "Metadata-Version: 2.1\nName: pkg\nVersion: 1.0\n"
+    )
+    size = total_mib * 1024 * 1024 // num_files
+    for i in range(num_files):
+        # Roughly 50% compressible
+        blocks = (os.urandom(4096) + bytes(4096) for _ in range(size // 8192))
+        (staging / "pkg" / f"lib{i}.so").write_bytes(b"".join(blocks))
+    return sum(f.stat().st_size for f in staging.rglob("*") if f.is_file())
+
+
+def build(cls, staging: Path, out_dir: Path) -> tuple[int, float, int]:
+    out_dir.mkdir()
+    whl = cls()
+    whl.name, whl.version, whl.dirname = "pkg", "1.0", str(out_dir)
+    paths = {"prefix": str(staging), "platlib": str(staging)}
+    tags = {"pyver": ["cp3"], "abi": ["none"], "arch": ["any"]}
+    start_read, start_time = bytes_read(), time.perf_counter()
+    wheel_path = whl.build(paths, tags=tags, wheel_version=(1, 0))
+    elapsed = time.perf_counter() - start_time
+    return bytes_read() - start_read, elapsed, Path(wheel_path).stat().st_size
+
+
+def main():
+    total_mib = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    num_files = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with tempfile.TemporaryDirectory() as tmp:
+        staging = Path(tmp) / "staging"
+        payload = create_staging_dir(staging, total_mib, num_files)
+        print(f"Payload: {payload / 2**20:.1f} MiB in {num_files} files")
+        for name, cls in (("distlib", Wheel), ("py-build-cmake", WheelBuilder)):
+            read, elapsed, wheel_size = build(cls, staging, Path(tmp) / name)
+            print(
+                f"{name:>15}: {read / payload:.2f} bytes read per payload byte, "
+                f"{read / wheel_size:.2f} per Wheel byte, {elapsed:.2f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
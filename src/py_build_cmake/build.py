@@ -1,24 +1,20 @@
 from __future__ import annotations
 
 import contextlib
+import functools
+import itertools
 import logging
 import os
 import platform
 import shutil
 import sysconfig
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
-
-from .commands.cmake import (
-    CMakeBuildSettings,
-    CMakeConfigureSettings,
-    CMakeInstallSettings,
-    CMaker,
-    CMakeSettings,
-)
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
 from .commands.cmd_runner import CommandRunner
-from .commands.try_run import check_cmake_program, check_stubgen_program
 from .common import (
     BuildPaths,
     ComponentConfig,
@@ -32,16 +28,14 @@ from .common import (
     logformat,
     util,
 )
-from .config import load as config_load
-from .config.dynamic import find_module, update_dynamic_metadata
-from .export import editable as export_editable
-from .export import metadata as export_metadata
-from .export import util as export_util
-from .export.editable.build_hook import write_build_hook
-from .export.native_tags import get_interpreter_name
-from .export.sdist import SdistBuilder
-from .export.tags import convert_wheel_tags, get_cross_tags, get_native_tags, is_pure
-from .export.wheel import WheelBuilder
+
+# Most modules are only imported by the hooks that need them, so that hooks
+# like get_requires_for_build_sdist don't pay for importing the CMake, config
+# and Wheel machinery (see tests/test_import_time.py).
+if TYPE_CHECKING:
+    from .commands.cmake import CMaker
+    from .commands.try_run import ProgramProbe
+    from .export.manifest import WheelManifest
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +45,9 @@ class _BuildBackend:
 
     def __init__(self) -> None:
         self.runner: CommandRunner = CommandRunner()
+        self.parallel: bool = False
+        self.rebuild: bool = False
+        self.user_build_cache: bool = False
 
     @property
     def verbose(self):
@@ -82,15 +79,16 @@ class _BuildBackend:
     ):
         """https://www.python.org/dev/peps/pep-0517/#build-wheel"""
         try:
-            assert metadata_directory is None
-
             # Parse options
             self.parse_config_settings(config_settings)
 
             # Build wheel
             with tempfile.TemporaryDirectory() as tmp_build_dir:
                 return self.build_wheel_in_dir(
-                    wheel_directory, tmp_build_dir, config_settings
+                    wheel_directory,
+                    tmp_build_dir,
+                    config_settings,
+                    metadata_directory=metadata_directory,
                 )
         except Exception as e:
             format_and_rethrow_exception(e)
@@ -100,15 +98,17 @@ class _BuildBackend:
     ):
         """https://www.python.org/dev/peps/pep-0660/#build-editable"""
         try:
-            assert metadata_directory is None
-
             # Parse options
             self.parse_config_settings(config_settings)
 
             # Build wheel
             with tempfile.TemporaryDirectory() as tmp_build_dir:
                 return self.build_wheel_in_dir(
-                    wheel_directory, tmp_build_dir, config_settings, editable=True
+                    wheel_directory,
+                    tmp_build_dir,
+                    config_settings,
+                    editable=True,
+                    metadata_directory=metadata_directory,
                 )
         except Exception as e:
             format_and_rethrow_exception(e)
@@ -123,24 +123,98 @@ class _BuildBackend:
         except Exception as e:
             format_and_rethrow_exception(e)
 
+    # --- Optional methods of PEP 517 and PEP 660 -----------------------------
+
+    def prepare_metadata_for_build_wheel(
+        self, metadata_directory, config_settings=None
+    ):
+        """https://www.python.org/dev/peps/pep-0517/#prepare-metadata-for-build-wheel"""
+        try:
+            # Parse options
+            self.parse_config_settings(config_settings)
+
+            # Write the metadata without building the CMake projects
+            return self.do_prepare_metadata(metadata_directory, config_settings)
+        except Exception as e:
+            format_and_rethrow_exception(e)
+
+    def prepare_metadata_for_build_editable(
+        self, metadata_directory, config_settings=None
+    ):
+        """https://www.python.org/dev/peps/pep-0660/#prepare-metadata-for-build-editable"""
+        return self.prepare_metadata_for_build_wheel(
+            metadata_directory, config_settings
+        )
+
     # --- Parsing config options and metadata ---------------------------------
 
     @staticmethod
-    def is_verbose_enabled(config_settings: dict | None):
+    def get_bool_config_setting(
+        config_settings: dict | None, keys: set[str], env_var: str
+    ) -> bool:
+        """Look up a boolean flag in the config settings passed by the build
+        frontend (the last occurrence wins), falling back to the given
+        environment variable."""
         truthy = lambda x: x.lower() in ("", "1", "true", "yes", "y")
         if config_settings is not None:
-            verbose_keys = {"verbose", "--verbose", "V", "-V"}
-            verbose_opts = {
-                k: v for k, v in config_settings.items() if k in verbose_keys
-            }
-            if verbose_opts:
-                last_val = next(reversed(list(verbose_opts.values())))
+            opts = {k: v for k, v in config_settings.items() if k in keys}
+            if opts:
+                last_val = next(reversed(list(opts.values())))
                 return truthy(last_val)
-        env_verbose = os.environ.get("PY_BUILD_CMAKE_VERBOSE")
-        if env_verbose is not None:
-            return truthy(env_verbose)
+        env_val = os.environ.get(env_var)
+        if env_val is not None:
+            return truthy(env_val)
         return False
 
+    @staticmethod
+    def is_verbose_enabled(config_settings: dict | None):
+        verbose_keys = {"verbose", "--verbose", "V", "-V"}
+        return _BuildBackend.get_bool_config_setting(
+            config_settings, verbose_keys, "PY_BUILD_CMAKE_VERBOSE"
+        )
+
+    @staticmethod
+    def is_parallel_enabled(config_settings: dict | None):
+        parallel_keys = {"parallel", "--parallel"}
+        return _BuildBackend.get_bool_config_setting(
+            config_settings, parallel_keys, "PY_BUILD_CMAKE_PARALLEL"
+        )
+
+    @staticmethod
+    def is_rebuild_forced(config_settings: dict | None):
+        rebuild_keys = {"rebuild", "--rebuild"}
+        return _BuildBackend.get_bool_config_setting(
+            config_settings, rebuild_keys, "PY_BUILD_CMAKE_REBUILD"
+        )
+
+    @staticmethod
+    def is_user_build_cache_enabled(config_settings: dict | None):
+        user_build_cache_keys = {"user_build_cache", "--user-build-cache"}
+        return _BuildBackend.get_bool_config_setting(
+            config_settings, user_build_cache_keys, "PY_BUILD_CMAKE_USER_BUILD_CACHE"
+        )
+
+    @staticmethod
+    def is_config_cache_enabled(config_settings: dict | None):
+        config_cache_keys = {"config_cache", "--config-cache"}
+        return _BuildBackend.get_bool_config_setting(
+            config_settings, config_cache_keys, "PY_BUILD_CMAKE_CONFIG_CACHE"
+        )
+
+    @staticmethod
+    def is_probe_cache_enabled(config_settings: dict | None):
+        probe_cache_keys = {"probe_cache", "--probe-cache"}
+        return _BuildBackend.get_bool_config_setting(
+            config_settings, probe_cache_keys, "PY_BUILD_CMAKE_PROBE_CACHE"
+        )
+
+    @staticmethod
+    def is_daemon_enabled(config_settings: dict | None):
+        daemon_keys = {"daemon", "--daemon"}
+        return _BuildBackend.get_bool_config_setting(
+            config_settings, daemon_keys, "PY_BUILD_CMAKE_DAEMON"
+        )
+
     @staticmethod
     def get_log_level(config_settings: dict | None) -> int:
         def parse_log_level(loglevel: str) -> int:
@@ -174,17 +248,29 @@ class _BuildBackend:
         except ValueError as e:
             logger.error("Invalid log level specified", exc_info=e)
         self.runner.verbose = self.is_verbose_enabled(config_settings)
+        self.runner.probe_cache = self.is_probe_cache_enabled(config_settings)
+        self.parallel = self.is_parallel_enabled(config_settings)
+        self.rebuild = self.is_rebuild_forced(config_settings)
+        self.user_build_cache = self.is_user_build_cache_enabled(config_settings)
 
     @staticmethod
     def get_requires_build_project(
         config_settings: dict | None, cfg: Config, runner: CommandRunner
     ):
+        from .commands.try_run import (
+            check_programs,
+            get_cmake_program_probes,
+            get_stubgen_program_probes,
+        )
+
         deps: list[str] = []
+        probes: list[ProgramProbe] = []
         # Check if we need CMake
-        if cfg.cmake:
-            check_cmake_program(cfg, deps, runner)
+        if cfg.has_cmake:
+            probes += get_cmake_program_probes(cfg)
         if cfg.stubgen:
-            check_stubgen_program(deps, runner)
+            probes += get_stubgen_program_probes()
+        check_programs(probes, deps, runner)
         if runner.verbose:
             print("Dependencies for build:", deps)
         return deps
@@ -192,11 +278,15 @@ class _BuildBackend:
     # --- Building wheels -----------------------------------------------------
 
     def build_wheel_in_dir(
-        self, wheel_dir, tmp_build_dir, config_settings, editable=False
+        self,
+        wheel_dir,
+        tmp_build_dir,
+        config_settings,
+        editable=False,
+        metadata_directory=None,
     ):
         """This is the main function that contains all steps necessary to build
         a complete wheel package, including the CMake builds etc."""
-
         # Load metadata from the pyproject.toml file
         src_dir = Path().resolve()
         cfg, module = self.read_all_metadata(src_dir, config_settings, self.verbose)
@@ -205,51 +295,295 @@ class _BuildBackend:
 
         # Set up all paths
         paths = self.get_default_paths(wheel_dir, tmp_build_dir, src_dir, cfg)
+        with self.use_user_build_cache(paths, pkg_info, editable) as cache_paths:
+            return self.build_wheel_in_paths(
+                cfg,
+                module,
+                pkg_info,
+                cmake_cfg,
+                cache_paths,
+                editable,
+                metadata_directory,
+            )
+
+    def build_wheel_in_paths(
+        self, cfg, module, pkg_info, cmake_cfg, paths, editable, metadata_directory
+    ):
+        """Configure, build and install the CMake projects and package the
+        Wheel, using the given build paths."""
+        from .export import cache as export_cache
+        from .export import editable as export_editable
+        from .export.editable.build_hook import write_build_hook
+        from .export.tags import is_pure
+
+        cmakers = self.get_cmakers(cfg, cmake_cfg, paths, pkg_info, editable)
+        manifest, staging_method = self.get_staging(cfg, editable)
+
+        def install(idx: int):
+            installed = cmakers[idx].install()
+            prefix = cmakers[idx].install_settings.prefix
+            if not editable and prefix and prefix != paths.staging_dir:
+                # Installed into a persistent prefix (cmake.incremental_install)
+                self.stage_installed_files(
+                    paths, prefix, installed, manifest, staging_method
+                )
+            if editable:
+                write_build_hook(cfg, paths.pkg_staging_dir, module, cmakers[idx], idx)
+
+        # If none of the inputs changed since the previous build, we can reuse
+        # the previous Wheel. We do need to build the CMake projects to find
+        # out whether anything changed.
+        cache_dir = None if editable else self.get_wheel_cache_dir(cfg, paths)
+        if cache_dir is not None:
+            self.run_cmake_pipelines(cmake_cfg, cmakers, install=lambda idx: None)
+            cache_key = export_cache.get_wheel_cache_key(
+                cfg,
+                module,
+                [cmaker.cmake_settings.build_path for cmaker in cmakers.values()],
+                self.get_wheel_tags(
+                    is_pure(self.get_wheel_config(cfg), cfg.has_cmake),
+                    self.get_wheel_config(cfg),
+                    cfg.cross,
+                ),
+            )
+            if not self.rebuild:
+                cached_wheel = export_cache.lookup_cached_wheel(
+                    cache_dir, cache_key, paths.wheel_dir
+                )
+                if cached_wheel is not None:
+                    return cached_wheel
 
         # Copy the module's Python source files to the temporary folder
         if not editable:
-            export_util.copy_pkg_source_to(paths.staging_dir, module)
+            self.stage_pkg_source(paths, module, manifest, staging_method)
         else:
             paths = export_editable.do_editable_install(cfg, paths, module)
 
         # Create dist-info folder
-        distinfo_dir = f"{pkg_info.norm_name}-{pkg_info.version}.dist-info"
-        distinfo_dir = paths.pkg_staging_dir / distinfo_dir
-        distinfo_dir.mkdir(parents=True, exist_ok=True)
-
-        # Write metadata, license and entry points to Wheel's distinfo
-        export_metadata.write_metadata(cfg, distinfo_dir)
-        export_metadata.write_license_files(cfg, distinfo_dir)
-        export_metadata.write_entry_points(cfg, distinfo_dir)
+        distinfo_dir = paths.pkg_staging_dir / self.get_distinfo_name(pkg_info)
+        if self.can_reuse_metadata(metadata_directory, distinfo_dir):
+            # Use the metadata from prepare_metadata_for_build_wheel
+            shutil.copytree(metadata_directory, distinfo_dir)
+        else:
+            # Write metadata, license and entry points to Wheel's distinfo
+            distinfo_dir.mkdir(parents=True, exist_ok=True)
+            self.write_distinfo(cfg, distinfo_dir)
 
         # Configure, build and install the CMake project
-        for idx, cmkcfg in cmake_cfg.items():
+        if cache_dir is None:
+            self.run_cmake_pipelines(cmake_cfg, cmakers, install)
+        else:  # Already configured and built above
+            for idx in cmakers:
+                install(idx)
+
+        # Generate .pyi stubs (for the Python files only)
+        if cfg.stubgen is not None and not editable:
+            self.generate_stubs(paths, module, cfg.stubgen)
+
+        # Create wheel
+        wheel_name = self.create_wheel(
+            paths, cfg, cmake_cfg, pkg_info, editable, manifest
+        )
+        if cache_dir is not None:
+            export_cache.store_cached_wheel(
+                cache_dir, cache_key, paths.wheel_dir / wheel_name
+            )
+        return wheel_name
+
+    @staticmethod
+    def stage_pkg_source(
+        paths: BuildPaths,
+        module: Module,
+        manifest: WheelManifest | None,
+        staging_method: str,
+    ):
+        """Copy or link the Python source files to the staging directory, or
+        add them to the manifest when using virtual staging."""
+        from .export import util as export_util
+
+        if manifest is not None:
+            manifest.add_module(module)
+        else:
+            export_util.copy_pkg_source_to(
+                paths.staging_dir, module, method=staging_method
+            )
+
+    @staticmethod
+    def stage_installed_files(
+        paths: BuildPaths,
+        prefix: Path,
+        installed: list[Path],
+        manifest: WheelManifest | None,
+        staging_method: str,
+    ):
+        """Copy or link the files installed into a persistent prefix to the
+        staging directory, or add them to the manifest when using virtual
+        staging."""
+        from .export import util as export_util
+
+        if manifest is not None:
+            manifest.add_installed(prefix, installed)
+        else:
+            export_util.stage_installed_files(
+                paths.staging_dir, prefix, installed, staging_method
+            )
+
+    def get_cmakers(
+        self,
+        cfg: Config,
+        cmake_cfg: dict[int, Any],
+        paths: BuildPaths,
+        pkg_info: PackageInfo,
+        editable: bool = False,
+    ) -> dict[int, CMaker]:
+        """Create a CMaker for each CMake configuration, in the order returned
+        by get_cmake_build_order."""
+        cmakers: dict[int, CMaker] = {}
+        for idx in self.get_cmake_build_order(cmake_cfg):
             build_cfg_name = _BuildBackend.get_build_config_name(cfg, idx)
-            path = cmkcfg["build_path"]
-            path = str(path).replace("{build_config}", build_cfg_name)
-            build_dir = Path(path)
-            cmaker = self.get_cmaker(
+            path = cmake_cfg[idx]["build_path"]
+            build_path = Path(str(path).replace("{build_config}", build_cfg_name))
+            build_path = self.get_cache_build_path(build_path, paths)
+            prefix = self.get_install_prefix(
+                cmake_cfg[idx], build_path, paths, editable
+            )
+            cmakers[idx] = self.get_cmaker(
                 paths.source_dir,
-                build_dir,
-                paths.staging_dir,
-                cmkcfg,
+                build_path,
+                prefix,
+                cmake_cfg[idx],
                 cfg.cross,
                 pkg_info,
                 runner=self.runner,
             )
-            cmaker.configure()
-            cmaker.build()
-            cmaker.install()
+        return cmakers
 
-            if editable:
-                write_build_hook(cfg, paths.pkg_staging_dir, module, cmaker, idx)
+    def run_cmake_pipelines(
+        self,
+        cmake_cfg: dict[int, Any],
+        cmakers: dict[int, CMaker],
+        install: Callable[[int], None],
+    ):
+        """Configure, build and install all CMake projects. The install steps
+        are always carried out one at a time, in the order of cmakers."""
+        order = list(cmakers)
+        if self.parallel and len(order) > 1:
+            self.run_cmake_pipelines_parallel(cmake_cfg, cmakers, order, install)
+        else:
+            for idx in order:
+                cmakers[idx].configure()
+                cmakers[idx].build()
+                install(idx)
 
-        # Generate .pyi stubs (for the Python files only)
-        if cfg.stubgen is not None and not editable:
-            self.generate_stubs(paths, module, cfg.stubgen)
+    @staticmethod
+    def run_cmake_pipelines_parallel(
+        cmake_cfg: dict[int, Any],
+        cmakers: dict[int, CMaker],
+        order: list[int],
+        install: Callable[[int], None],
+    ):
+        """Configure and build the CMake projects concurrently. A project is
+        only configured once all projects it depends on have been installed.
+        The install steps themselves are carried out sequentially on the
+        calling thread, in the given order, so the contents of the staging
+        directory do not depend on the scheduling of the builds."""
+        installed = {idx: threading.Event() for idx in order}
+        aborted = threading.Event()
+
+        def configure_and_build(idx: int):
+            for dep in cmake_cfg[idx].get("depends_on", []):
+                installed[int(dep)].wait()
+            if aborted.is_set():
+                return
+            cmakers[idx].configure()
+            cmakers[idx].build()
+
+        with ThreadPoolExecutor(max_workers=len(order)) as pool:
+            futures = {idx: pool.submit(configure_and_build, idx) for idx in order}
+            try:
+                for idx in order:
+                    futures[idx].result()
+                    install(idx)
+                    installed[idx].set()
+            except BaseException:
+                # Don't start any new builds, and wake up the builds that are
+                # still waiting for their dependencies
+                aborted.set()
+                for f in futures.values():
+                    f.cancel()
+                for e in installed.values():
+                    e.set()
+                raise
 
-        # Create wheel
-        return self.create_wheel(paths, cfg, cmake_cfg, pkg_info)
+    @staticmethod
+    def get_cmake_build_order(cmake_cfg: dict[int, Any]) -> list[int]:
+        """Sort the indices of the CMake configurations such that every
+        configuration comes after the ones listed in its depends_on option.
+        Independent configurations are kept in ascending order."""
+        deps: dict[int, set[int]] = {}
+        for idx, cmkcfg in cmake_cfg.items():
+            deps[idx] = set()
+            for dep in cmkcfg.get("depends_on", []):
+                try:
+                    dep_idx = int(dep)
+                except ValueError:
+                    dep_idx = None
+                if dep_idx not in cmake_cfg or dep_idx == idx:
+                    msg = f"Invalid value {dep!r} in cmake.{idx}.depends_on: "
+                    msg += "should be the index of another CMake configuration "
+                    msg += "(possible values are: "
+                    msg += ", ".join(str(i) for i in cmake_cfg if i != idx) + ")"
+                    raise ConfigError(msg)
+                deps[idx].add(dep_idx)
+        order: list[int] = []
+        while len(order) < len(deps):
+            ready = [i for i in deps if i not in order and deps[i] <= set(order)]
+            if not ready:
+                remaining = ", ".join(str(i) for i in deps if i not in order)
+                msg = "Circular dependency between the CMake configurations "
+                msg += f"with indices {remaining} (see cmake.depends_on)"
+                raise ConfigError(msg)
+            order.append(min(ready))
+        return order
+
+    def do_prepare_metadata(self, metadata_directory, config_settings) -> str:
+        """Write the dist-info directory (metadata, license and entry points),
+        without configuring or building any CMake projects."""
+        src_dir = Path().resolve()
+        cfg, module = self.read_all_metadata(src_dir, config_settings, self.verbose)
+        pkg_info = self.get_pkg_info(cfg, module)
+        distinfo_name = self.get_distinfo_name(pkg_info)
+        distinfo_dir = Path(metadata_directory) / distinfo_name
+        distinfo_dir.mkdir(parents=True, exist_ok=True)
+        self.write_distinfo(cfg, distinfo_dir)
+        logger.debug("Prepared metadata: %s", distinfo_dir)
+        return distinfo_name
+
+    @staticmethod
+    def write_distinfo(cfg: Config, distinfo_dir: Path):
+        from .export import metadata as export_metadata
+
+        export_metadata.write_metadata(cfg, distinfo_dir)
+        export_metadata.write_license_files(cfg, distinfo_dir)
+        export_metadata.write_entry_points(cfg, distinfo_dir)
+
+    @staticmethod
+    def can_reuse_metadata(metadata_directory, distinfo_dir: Path) -> bool:
+        """Check whether the dist-info directory created by
+        prepare_metadata_for_build_wheel can be copied to the Wheel."""
+        if metadata_directory is None:
+            return False
+        metadata_directory = Path(metadata_directory)
+        if metadata_directory.name != distinfo_dir.name:
+            msg = "Ignoring metadata directory %s because its name does not "
+            msg += "match the package name and version (expected %s)"
+            logger.warning(msg, metadata_directory, distinfo_dir.name)
+            return False
+        return metadata_directory.is_dir() and not distinfo_dir.exists()
+
+    @staticmethod
+    def get_distinfo_name(pkg_info: PackageInfo) -> str:
+        return f"{pkg_info.norm_name}-{pkg_info.version}.dist-info"
 
     @staticmethod
     def get_pkg_info(cfg: Config | ComponentConfig, module: Module | None):
@@ -259,6 +593,54 @@ class _BuildBackend:
             module_name=module.name if module is not None else "",
         )
 
+    @staticmethod
+    def get_install_prefix(
+        cmake_cfg: dict, build_path: Path, paths: BuildPaths, editable: bool
+    ) -> Path:
+        """CMake installs into the staging directory directly, unless the
+        cmake.incremental_install option is enabled, in which case it installs
+        into a persistent prefix in the build directory, so that files that are
+        up-to-date are not copied again."""
+        if editable or not cmake_cfg.get("incremental_install"):
+            return paths.staging_dir
+        return build_path / "py-build-cmake-install"
+
+    @contextlib.contextmanager
+    def use_user_build_cache(
+        self, paths: BuildPaths, pkg_info: PackageInfo, editable: bool
+    ) -> Iterator[BuildPaths]:
+        """Move the build cache directory (normally .py-build-cmake_cache in
+        the source directory) to the user's cache directory if enabled. The
+        cache entry is locked until the build is done. Editable installs
+        always use the source directory."""
+        if not self.user_build_cache or editable:
+            yield paths
+            return
+
+        from dataclasses import replace
+
+        from .commands import user_cache
+
+        with user_cache.use_entry(
+            user_cache.get_build_cache_dir(),
+            pkg_info.norm_name,
+            pkg_info.version,
+            paths.source_dir,
+            user_cache.get_max_size(),
+        ) as entry:
+            yield replace(paths, build_dir=entry / paths.build_dir.name)
+
+    @staticmethod
+    def get_cache_build_path(build_path: Path, paths: BuildPaths) -> Path:
+        """If the given CMake build directory is in the default build cache
+        directory, and that directory was moved (user_build_cache), return
+        the corresponding path in the new cache directory."""
+        default_cache_dir = paths.source_dir / ".py-build-cmake_cache"
+        try:
+            return paths.build_dir.parent / build_path.relative_to(default_cache_dir)
+        except ValueError:
+            return build_path
+
     @staticmethod
     def get_default_paths(wheel_dir, tmp_build_dir, src_dir, cfg):
         build_cfg_name = _BuildBackend.get_build_config_name(cfg, 0)
@@ -274,6 +656,8 @@ class _BuildBackend:
 
     @staticmethod
     def read_all_metadata(src_dir, config_settings, verbose) -> tuple[Config, Module]:
+        from .config.dynamic import find_module, update_dynamic_metadata
+
         cfg = _BuildBackend.read_config(src_dir, config_settings, verbose)
         module = find_module(cfg.module, src_dir)
         modfile = module.full_file
@@ -314,20 +698,32 @@ class _BuildBackend:
     @staticmethod
     def read_config(src_dir, config_settings, verbose):
         """Read the configuration without the dynamic data."""
+        from .config import load as config_load
+
+        use_cache = _BuildBackend.is_config_cache_enabled(config_settings)
         return config_load.read_full_config(
-            src_dir / "pyproject.toml", config_settings, verbose
+            src_dir / "pyproject.toml", config_settings, verbose, use_cache=use_cache
         )
 
     @staticmethod
     def create_wheel(
-        paths: BuildPaths, cfg: Config, cmake_cfg, package_info: PackageInfo
+        paths: BuildPaths,
+        cfg: Config,
+        cmake_cfg,
+        package_info: PackageInfo,
+        editable: bool = False,
+        manifest: WheelManifest | None = None,
     ):
-        """Create a wheel package from the build directory."""
+        """Create a wheel package from the build directory, or from the given
+        manifest and the files in the build directory."""
+        from .export.tags import is_pure
+        from .export.wheel import WheelBuilder
+
         whl = WheelBuilder()
         whl.name = package_info.norm_name
         whl.version = package_info.version
         wheel_cfg = _BuildBackend.get_wheel_config(cfg)
-        pure = is_pure(wheel_cfg, cmake_cfg)
+        pure = is_pure(wheel_cfg, cfg.has_cmake)
         tags = _BuildBackend.get_wheel_tags(pure, wheel_cfg, cfg.cross)
         libdir = "purelib" if pure else "platlib"
         staging_dir = paths.pkg_staging_dir
@@ -335,12 +731,99 @@ class _BuildBackend:
         whl.dirname = paths.wheel_dir
         if wheel_cfg.get("build_tag"):
             whl.buildver = wheel_cfg["build_tag"]
-        wheel_path = whl.build(whl_paths, tags=tags, wheel_version=(1, 0))
+        whl.compression_level, whl.compression_rules = (
+            _BuildBackend.get_wheel_compression(wheel_cfg, editable)
+        )
+        if wheel_cfg.get("incremental") and not editable:
+            whl.incremental_dir = _BuildBackend.get_incremental_wheel_dir(paths)
+        if manifest is not None:
+            # Files that CMake installed into the staging directory directly
+            manifest.add_tree(paths.staging_dir)
+            manifest.log()
+            distinfo_name = _BuildBackend.get_distinfo_name(package_info)
+            wheel_path = whl.build_from_manifest(
+                manifest.files,
+                paths.pkg_staging_dir / distinfo_name,
+                pure,
+                tags,
+                wheel_version=(1, 0),
+            )
+        else:
+            wheel_path = whl.build(whl_paths, tags=tags, wheel_version=(1, 0))
         logger.debug("Built Wheel: %s", wheel_path)
         return str(Path(wheel_path).relative_to(paths.wheel_dir))
 
+    @staticmethod
+    def get_wheel_compression(
+        wheel_cfg: dict[str, Any], editable: bool
+    ) -> tuple[int | None, list[tuple[str, int]]]:
+        """Get the compression level for the Wheel (None for the default level),
+        and the compression levels for specific glob patterns (0 means that
+        files should be stored without compression)."""
+
+        def check_level(option: str, value: Any) -> int:
+            if value == "store":
+                return 0
+            with contextlib.suppress(ValueError, TypeError):
+                if 0 <= int(value) <= 9:
+                    return int(value)
+            msg = f"Invalid value {value!r} for wheel.{option}: "
+            msg += "should be a compression level from 0 to 9"
+            msg += ", or 'store'" if option.startswith("compression_rules") else ""
+            raise ConfigError(msg)
+
+        level_opt = "editable_compression_level" if editable else "compression_level"
+        level = wheel_cfg.get(level_opt, 1 if editable else None)
+        if level is not None:
+            level = check_level(level_opt, level)
+        rules = [
+            (pattern, check_level(f"compression_rules[{pattern!r}]", value))
+            for pattern, value in wheel_cfg.get("compression_rules", {}).items()
+        ]
+        return level, rules
+
+    @staticmethod
+    def get_staging(cfg: Config, editable: bool) -> tuple[WheelManifest | None, str]:
+        """With the virtual staging method, the Wheel is created from a
+        manifest, and the files are read from their original locations rather
+        than from the staging directory. Returns the manifest (if any) and the
+        method to use for files that are staged."""
+        from .export.manifest import WheelManifest
+
+        method = _BuildBackend.get_wheel_config(cfg).get("staging_method", "auto")
+        if editable or method != "virtual":
+            return None, method
+        if cfg.stubgen is not None:
+            msg = "Virtual staging cannot be used with stubgen, which requires "
+            msg += "all files in the staging directory"
+            logger.info(msg)
+            return None, "auto"
+        return WheelManifest(), "auto"
+
+    @staticmethod
+    def get_incremental_wheel_dir(paths: BuildPaths) -> Path:
+        """Directory where the previous Wheel and its manifest are stored (if
+        the wheel.incremental option is enabled)."""
+        return paths.build_dir.parent / "incremental" / paths.build_dir.name
+
+    @staticmethod
+    def get_wheel_cache_dir(cfg: Config, paths: BuildPaths) -> Path | None:
+        """Directory where the previous Wheel is stored (if the wheel.cache
+        option is enabled)."""
+        if not _BuildBackend.get_wheel_config(cfg).get("cache"):
+            return None
+        cmake_cfg = _BuildBackend.get_cmake_config(cfg)
+        if any(c.get("depends_on") for c in cmake_cfg.values()):
+            msg = "The Wheel cache cannot be used for CMake configurations "
+            msg += "with dependencies (cmake.depends_on)"
+            logger.info(msg)
+            return None
+        return paths.build_dir.parent / "wheels" / paths.build_dir.name
+
     @staticmethod
     def get_wheel_tags(pure: bool, wheel_cfg: dict[str, Any], cross_cfg):
+        from .export.tags import convert_wheel_tags, get_cross_tags, get_native_tags
+
         plat = wheel_cfg.get("platform_tag", "")
         guess_plat = "guess" in plat
         if pure:
@@ -380,6 +863,8 @@ class _BuildBackend:
     # --- Building sdists -----------------------------------------------------
 
     def do_build_sdist(self, sdist_directory, config_settings):
+        from .export.sdist import SdistBuilder
+
         # Load metadata
         src_dir = Path().resolve()
         pyproject = src_dir / "pyproject.toml"
@@ -397,10 +882,38 @@ class _BuildBackend:
             extra_files=extra_files,
             include_patterns=sdist_cfg.get("include_patterns", []),
             exclude_patterns=sdist_cfg.get("exclude_patterns", []),
+            prune=sdist_cfg.get("prune", True),
+            prune_dirs=[
+                self.get_build_path_root(Path(c["build_path"]))
+                for c in self.get_cmake_config(cfg).values()
+            ],
+            vcs=sdist_cfg.get("vcs"),
+            compression_level=self.get_sdist_compression_level(sdist_cfg),
+        )
+        cache_dir = None
+        if sdist_cfg.get("cache"):
+            cache_dir = src_dir / ".py-build-cmake_cache" / "sdist"
+        sdist_tar = sdist_builder.build(
+            Path(sdist_directory), cache_dir=cache_dir, rebuild=self.rebuild
         )
-        sdist_tar = sdist_builder.build(Path(sdist_directory))
         return str(Path(sdist_tar).relative_to(sdist_directory))
 
+    @staticmethod
+    def get_sdist_compression_level(sdist_cfg: dict[str, Any]) -> int:
+        level = sdist_cfg.get("compression_level", 9)
+        if not 0 <= level <= 9:
+            msg = f"Invalid value {level!r} for sdist.compression_level: "
+            msg += "should be a compression level from 0 to 9"
+            raise ConfigError(msg)
+        return level
+
+    @staticmethod
+    def get_build_path_root(build_path: Path) -> Path:
+        """The part of the build path before the first placeholder, e.g.
+        .py-build-cmake_cache for .py-build-cmake_cache/{build_config}."""
+        parts = itertools.takewhile(lambda p: "{" not in p, build_path.parts)
+        return Path(*parts)
+
     # --- CMake builds --------------------------------------------------------
 
     @staticmethod
@@ -413,6 +926,15 @@ class _BuildBackend:
         package_info: PackageInfo,
         **kwargs,
     ):
+        from .commands.cmake import (
+            CMakeBuildSettings,
+            CMakeConfigureSettings,
+            CMakeInstallSettings,
+            CMaker,
+            CMakeSettings,
+        )
+        from .export.native_tags import get_interpreter_name
+
         # Optionally include the cross-compilation settings
         if cross_cfg:
             cross_compiling = True
@@ -619,8 +1141,10 @@ class _BuildBackend:
         """Get a string representing the Python version, ABI and architecture,
         used to name the build folder so builds for different versions don't
         interfere."""
+        from .export.tags import is_pure
+
         wheel_cfg = _BuildBackend.get_wheel_config(cfg)
-        pure = is_pure(wheel_cfg, cfg.cmake)
+        pure = is_pure(wheel_cfg, cfg.has_cmake)
         tags = _BuildBackend.get_wheel_tags(pure, wheel_cfg, cfg.cross)
         name = "-".join(".".join(x) for x in tags.values())
         if index != 0:
@@ -629,9 +1153,40 @@ class _BuildBackend:
 
 
 _BACKEND = _BuildBackend()
-get_requires_for_build_wheel = _BACKEND.get_requires_for_build_wheel
-get_requires_for_build_sdist = _BACKEND.get_requires_for_build_sdist
-get_requires_for_build_editable = _BACKEND.get_requires_for_build_editable
-build_wheel = _BACKEND.build_wheel
-build_sdist = _BACKEND.build_sdist
-build_editable = _BACKEND.build_editable
+
+
+def get_hook_config_settings(name: str, args: tuple, kwargs: dict) -> dict | None:
+    """Extract the config_settings argument of a call to the given hook."""
+    if "config_settings" in kwargs:
+        return kwargs["config_settings"]
+    # get_requires_for_build_*(config_settings)
+    # build_*(directory, config_settings, ...), prepare_*(directory, config_settings)
+    index = 0 if name.startswith("get_requires") else 1
+    return args[index] if len(args) > index else None
+
+
+def _hook(name: str) -> Callable:
+    """Wrap the given PEP 517 hook so that it is forwarded to the
+    py-build-cmake daemon if enabled (see daemon.py)."""
+    method = getattr(_BACKEND, name)
+
+    @functools.wraps(method)
+    def hook(*args, **kwargs):
+        config_settings = get_hook_config_settings(name, args, kwargs)
+        if not _BuildBackend.is_daemon_enabled(config_settings):
+            return method(*args, **kwargs)
+        from . import daemon
+
+        return daemon.call_hook(name, args, kwargs, fallback=method)
+
+    return hook
+
+
+get_requires_for_build_wheel = _hook("get_requires_for_build_wheel")
+get_requires_for_build_sdist = _hook("get_requires_for_build_sdist")
+get_requires_for_build_editable = _hook("get_requires_for_build_editable")
+build_wheel = _hook("build_wheel")
+build_sdist = _hook("build_sdist")
+build_editable = _hook("build_editable")
+prepare_metadata_for_build_wheel = _hook("prepare_metadata_for_build_wheel")
+prepare_metadata_for_build_editable = _hook("prepare_metadata_for_build_editable")
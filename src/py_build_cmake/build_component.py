@@ -91,6 +91,7 @@ class _BuildComponentBackend:
         except ValueError as e:
             logger.error("Invalid log level specified", exc_info=e)
         self.runner.verbose = std_backend.is_verbose_enabled(config_settings)
+        self.runner.probe_cache = std_backend.is_probe_cache_enabled(config_settings)
 
     @staticmethod
     def read_all_metadata(src_dir, config_settings, verbose):
@@ -1,41 +1,54 @@
 from __future__ import annotations
 
 from pathlib import Path, PurePosixPath
+from typing import Any
 
 import click
 
 from . import __version__
 
 
+def load_cmake_project(directory, build_path, verbose, cross, local, override, index):
+    """Read the configuration, and select the CMake configuration with the
+    given index. Returns the configuration, the package info, the source
+    directory, the CMake configuration, its build configuration name and its
+    build directory."""
+    from .build import _BuildBackend as backend
+
+    src_dir = Path(directory or ".").resolve()
+    config_settings = {
+        "--cross": list(cross),
+        "--local": list(local),
+        "--override": list(override),
+    }
+    # Read configuration and package metadata
+    cfg, module = backend.read_all_metadata(src_dir, config_settings, verbose)
+    pkg_info = backend.get_pkg_info(cfg, module)
+    cmake_cfgs = backend.get_cmake_config(cfg)
+    if not cmake_cfgs:
+        msg = "Not a CMake project ([tool.py-build-cmake.cmake] missing)."
+        raise ValueError(msg)
+    try:
+        cmake_cfg = cmake_cfgs[index]
+    except KeyError as e:
+        msg = "Invalid CMake configuration index (--index). "
+        msg += "Possible values are: " + " ".join(map(str, cmake_cfgs))
+        raise ValueError(msg) from e
+
+    # Set up all paths
+    build_cfg_name = backend.get_build_config_name(cfg, index)
+    path = build_path or cmake_cfg["build_path"]
+    build_dir = Path(str(path).replace("{build_config}", build_cfg_name))
+    return cfg, pkg_info, src_dir, cmake_cfg, build_cfg_name, build_dir
+
+
 def cmake_command(directory, build_path, verbose, dry, cross, local, override):
     def get_cmaker(index: int):
         from .build import _BuildBackend as backend
         from .commands.cmd_runner import CommandRunner
 
-        src_dir = Path(directory or ".").resolve()
-        config_settings = {
-            "--cross": list(cross),
-            "--local": list(local),
-            "--override": list(override),
-        }
-        # Read configuration and package metadata
-        cfg, module = backend.read_all_metadata(src_dir, config_settings, verbose)
-        pkg_info = backend.get_pkg_info(cfg, module)
-        cmake_cfgs = backend.get_cmake_config(cfg)
-        if not cmake_cfgs:
-            msg = "Not a CMake project ([tool.py-build-cmake.cmake] missing)."
-            raise ValueError(msg)
-        try:
-            cmake_cfg = cmake_cfgs[index]
-        except KeyError as e:
-            msg = "Invalid CMake configuration index (--index). "
-            msg += "Possible values are: " + " ".join(map(str, cmake_cfgs))
-            raise ValueError(msg) from e
-
-        # Set up all paths
-        build_cfg_name = backend.get_build_config_name(cfg, index)
-        path = build_path or cmake_cfg["build_path"]
-        build_dir = Path(str(path).replace("{build_config}", build_cfg_name))
+        args = directory, build_path, verbose, cross, local, override, index
+        cfg, pkg_info, src_dir, cmake_cfg, _, build_dir = load_cmake_project(*args)
 
         # CMake builder
         return backend.get_cmaker(
@@ -149,7 +162,7 @@ def configure(obj, preset, use_build_presets, args, index):
         cmaker.conf_settings.preset = preset
     if use_build_presets:
         cmaker.build_settings.presets = [""]
-    cmaker.configure()
+    cmaker.configure(force=True)
 
 
 @cli.command(help="Build the CMake project.")
@@ -433,5 +446,213 @@ CMAKE_PREFIX_PATH = {"prepend" = "/some/linux-specific/path"}
         )
 
 
+@config.command(
+    help="Check the configuration for all platforms. Builds only process the "
+    "configuration for the current platform (or the cross-compilation target), "
+    "so mistakes in the sections for other platforms may go unnoticed."
+)
+@click.pass_context
+def lint(ctx: click.Context):
+    from .common import ConfigError
+    from .config.load import read_full_config
+
+    params = ctx.find_root().params
+    src_dir = Path(params["directory"] or ".").resolve()
+    config_settings: dict[str, str | list[str]] = {
+        "--cross": list(params["cross"]),
+        "--local": list(params["local"]),
+        "--override": list(params["override"]),
+    }
+    pyproject_path = src_dir / "pyproject.toml"
+    try:
+        read_full_config(
+            pyproject_path, config_settings, params["verbose"], all_targets=True
+        )
+    except ConfigError as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(f"No problems found in {pyproject_path}")
+
+
+@cli.group(help="Wheel operations.")
+def wheel():
+    pass
+
+
+@wheel.command(
+    help="Change the tags of an existing Wheel without rebuilding it. "
+    "The compressed contents are copied as-is, only the WHEEL and RECORD files "
+    "are rewritten. Tags that are not specified are kept."
+)
+@click.option(
+    "--python-tag",
+    multiple=True,
+    help="New Python tag (may be repeated). Use 'auto' to keep the first "
+    "Python tag of the Wheel.",
+)
+@click.option("--abi-tag", multiple=True, help="New ABI tag (may be repeated).")
+@click.option(
+    "--platform-tag",
+    multiple=True,
+    help="New platform tag (may be repeated). Use 'guess' to include the "
+    "current platform tags of the Wheel.",
+)
+@click.option(
+    "--build-tag",
+    default=None,
+    help="New build tag. Use an empty string to remove it.",
+)
+@click.option(
+    "-w",
+    "--wheel-dir",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+    default=None,
+    help="Folder to write the new Wheel to (default: folder of the Wheel).",
+)
+@click.argument(
+    "wheel_file", type=click.Path(exists=True, file_okay=True, dir_okay=False)
+)
+def retag(python_tag, abi_tag, platform_tag, build_tag, wheel_dir, wheel_file):
+    import zipfile
+
+    from .export.retag import retag_wheel
+
+    wheel_path = Path(wheel_file)
+    wheel_cfg: dict[str, Any] = {
+        "python_abi": "auto",
+        "python_tag": list(python_tag) or ["auto"],
+    }
+    if abi_tag:
+        wheel_cfg["abi_tag"] = list(abi_tag)
+    if platform_tag:
+        wheel_cfg["platform_tag"] = list(platform_tag)
+    out_dir = Path(wheel_dir) if wheel_dir is not None else wheel_path.parent
+    try:
+        new_path = retag_wheel(wheel_path, out_dir, wheel_cfg, build_tag)
+    except (ValueError, KeyError, zipfile.BadZipFile) as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(str(new_path))
+
+
+@cli.group(
+    help="Snapshots of CMake build directories. Use these commands to save the "
+    "build directory after a build, and to restore it before building the "
+    "package again, e.g. on a CI runner that starts without a build directory."
+)
+def snapshot():
+    pass
+
+
+def snapshot_params(ctx: click.Context, index: int, key: tuple[str, ...]):
+    """Build directory, source directory, build configuration name and
+    fingerprint of the snapshot for the given CMake configuration."""
+    from .commands.snapshot import get_snapshot_fingerprint
+
+    params = ctx.find_root().params
+    try:
+        cfg, _, src_dir, cmake_cfg, build_cfg_name, build_dir = load_cmake_project(
+            params["directory"],
+            params["build_path"],
+            params["verbose"],
+            params["cross"],
+            params["local"],
+            params["override"],
+            index,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+    fingerprint = get_snapshot_fingerprint(
+        build_cfg_name, cmake_cfg, cfg.cross, src_dir, key
+    )
+    return build_dir.resolve(), src_dir, build_cfg_name, fingerprint
+
+
+@snapshot.command("export", help="Save the build directory to the store.")
+@click.option(
+    "--store",
+    type=click.Path(file_okay=False, dir_okay=True),
+    required=True,
+    help="Folder in which the snapshots are stored.",
+)
+@click.option(
+    "--index",
+    default=0,
+    nargs=1,
+    type=int,
+    required=False,
+    metavar="INDEX",
+    help="Numeric index of the CMake configurations to use. This corresponds "
+    "to the keys used in [tool.py-build-cmake.cmake] in pyproject.toml.",
+)
+@click.option(
+    "--key",
+    multiple=True,
+    help="Additional value to include in the fingerprint of the snapshot, "
+    "e.g. the compiler version (may be repeated).",
+)
+@click.pass_context
+def snapshot_export(ctx: click.Context, store, index, key):
+    import tarfile
+
+    from .commands.snapshot import export_snapshot
+
+    build_dir, src_dir, build_cfg_name, fingerprint = snapshot_params(ctx, index, key)
+    try:
+        path = export_snapshot(
+            Path(store).resolve(), build_dir, src_dir, build_cfg_name, fingerprint
+        )
+    except (ValueError, OSError, tarfile.TarError) as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(str(path))
+
+
+@snapshot.command(
+    "import",
+    help="Restore the build directory from the store, if a matching snapshot "
+    "exists and if the build directory does not exist yet.",
+)
+@click.option(
+    "--store",
+    type=click.Path(file_okay=False, dir_okay=True),
+    required=True,
+    help="Folder in which the snapshots are stored.",
+)
+@click.option(
+    "--index",
+    default=0,
+    nargs=1,
+    type=int,
+    required=False,
+    metavar="INDEX",
+    help="Numeric index of the CMake configurations to use. This corresponds "
+    "to the keys used in [tool.py-build-cmake.cmake] in pyproject.toml.",
+)
+@click.option(
+    "--key",
+    multiple=True,
+    help="Additional value to include in the fingerprint of the snapshot, "
+    "e.g. the compiler version (may be repeated).",
+)
+@click.option("--force", is_flag=True, help="Replace the build directory if it exists.")
+@click.pass_context
+def snapshot_import(ctx: click.Context, store, index, key, force):
+    import tarfile
+
+    from .commands.snapshot import import_snapshot
+
+    build_dir, src_dir, build_cfg_name, fingerprint = snapshot_params(ctx, index, key)
+    try:
+        path = import_snapshot(
+            Path(store).resolve(),
+            build_dir,
+            src_dir,
+            build_cfg_name,
+            fingerprint,
+            force=force,
+        )
+    except (ValueError, KeyError, OSError, tarfile.TarError) as e:
+        raise click.ClickException(str(e)) from e
+    click.echo("No snapshot restored" if path is None else str(path))
+
+
 if __name__ == "__main__":
     cli()
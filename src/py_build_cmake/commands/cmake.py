@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import contextlib
+import hashlib
 import logging
 import os
 import platform
@@ -16,6 +18,7 @@ from distlib.version import NormalizedVersion  # type: ignore[import-untyped]
 
 from .. import __version__
 from ..common import PackageInfo
+from ..common.util import write_file_if_changed
 from .cmd_runner import CommandRunner
 
 logger = logging.getLogger(__name__)
@@ -76,6 +79,31 @@ class Option:
 
 
 class CMaker:
+    # Environment variables (other than the ones in the user's cmake.env
+    # configuration) that affect the result of the CMake configure step.
+    configure_env_vars = frozenset(
+        (
+            "CC", "CXX", "CPPFLAGS", "CFLAGS", "CXXFLAGS", "LDFLAGS",
+            "ASM", "ASMFLAGS", "FC", "FFLAGS", "OBJC", "OBJCFLAGS", "OBJCXX",
+            "OBJCXXFLAGS", "CUDACXX", "CUDAFLAGS", "CUDAHOSTCXX", "HIPCXX",
+            "HIPFLAGS", "RC", "RCFLAGS", "SWIFTC", "MACOSX_DEPLOYMENT_TARGET",
+            "SDKROOT", "ARCHFLAGS",
+        )
+    )  # fmt: skip
+    configure_env_prefixes = ("CMAKE_", "PY_BUILD_CMAKE_")
+    # Settings that do not affect the result of the configure step: the
+    # installation prefix is passed again using --prefix during installation,
+    # and the others only control py-build-cmake itself
+    fingerprint_ignored_options = frozenset(("CMAKE_INSTALL_PREFIX",))
+    fingerprint_ignored_env_vars = frozenset(
+        (
+            "PY_BUILD_CMAKE_INSTALL_PREFIX", "PY_BUILD_CMAKE_VERBOSE",
+            "PY_BUILD_CMAKE_LOGLEVEL", "PY_BUILD_CMAKE_DAEMON",
+            "PY_BUILD_CMAKE_DAEMON_TIMEOUT", "PY_BUILD_CMAKE_CONFIG_CACHE",
+            "PY_BUILD_CMAKE_PROBE_CACHE", "PY_BUILD_CMAKE_CACHE_DIR",
+        )
+    )  # fmt: skip
+
     def __init__(
         self,
         cmake_settings: CMakeSettings,
@@ -312,6 +340,9 @@ class CMaker:
             + self.get_configure_options_install()
         )
 
+    def get_preload_file(self) -> Path:
+        return self.cmake_settings.build_path / "py-build-cmake-preload.cmake"
+
     def write_preload_options(self) -> list[str]:
         """Write the options into the CMake pre-load script and return the
         command-line flags that tell CMake to load it."""
@@ -325,22 +356,21 @@ class CMaker:
                 f' CACHE {o.type} "{o.description}" FORCE)\n'
             )
 
-        preload_file = self.cmake_settings.build_path / "py-build-cmake-preload.cmake"
+        preload_file = self.get_preload_file()
         version = self.cmake_settings.minimum_required
+        contents = f"cmake_minimum_required(VERSION {version})\n"
+        contents += "".join(map(fmt_opt, opts))
         if self.runner.verbose:
             print("Writing CMake pre-load file")
             print(f"{preload_file}")
             print("---------------------------")
-            print(f"cmake_minimum_required(VERSION {version})")
-            for o in opts:
-                print(fmt_opt(o), end="")
+            print(contents, end="")
             print("---------------------------\n")
         if not self.runner.dry:
+            # Only touch the file if its contents changed, so tools that look
+            # at its modification time don't consider the build out of date
             self.cmake_settings.build_path.mkdir(parents=True, exist_ok=True)
-            with preload_file.open("w", encoding="utf-8") as f:
-                f.write(f"cmake_minimum_required(VERSION {version})\n")
-                for o in opts:
-                    f.write(fmt_opt(o))
+            write_file_if_changed(preload_file, contents.encode("utf-8"))
         return ["-C", str(preload_file)]
 
     def get_cmake_generator_platform(self) -> list[str]:
@@ -373,11 +403,89 @@ class CMaker:
         cwd = self.cmake_settings.working_dir
         return str(cwd) if cwd is not None else None
 
-    def configure(self):
+    def get_fingerprint_file(self) -> Path:
+        return self.cmake_settings.build_path / "py-build-cmake-configure.sha256"
+
+    def get_configure_fingerprint(self, cmd: list[str], env: dict[str, str]) -> str:
+        """Hash of everything that affects the result of the configure step:
+        the exact command, the relevant environment variables, the options in
+        the pre-load script, and the contents of the toolchain file and the
+        CMake cache. The installation prefix is excluded, because regular
+        builds install into a new temporary directory every time."""
+        h = hashlib.sha256()
+
+        def update(*args):
+            for a in args:
+                h.update(str(a).encode("utf-8"))
+                h.update(b"\0")
+
+        update(__version__, *cmd)
+        for o in self.get_preload_options():
+            if o.name not in self.fingerprint_ignored_options:
+                update(o.name, o.type, o.value)
+        user_env = self.conf_settings.environment or {}
+        for k in sorted(env):
+            if k in self.fingerprint_ignored_env_vars:
+                continue
+            if (
+                k in user_env
+                or k in self.configure_env_vars
+                or k.startswith(self.configure_env_prefixes)
+            ):
+                update(k, env[k])
+        files = [self.cmake_settings.build_path / "CMakeCache.txt"]
+        if self.conf_settings.toolchain_file is not None:
+            files.append(self.conf_settings.toolchain_file)
+        for f in files:
+            update(f)
+            try:
+                h.update(f.read_bytes())
+            except OSError:
+                update("<missing>")
+        return h.hexdigest()
+
+    def is_configured(self) -> bool:
+        """Check whether CMake has successfully generated the build system in
+        the build directory. If any of the CMake scripts change afterwards,
+        CMake automatically re-runs the configuration during the build step."""
+        build_path = self.cmake_settings.build_path
+        return (build_path / "CMakeCache.txt").is_file() and (
+            build_path / "CMakeFiles" / "cmake.check_cache"
+        ).is_file()
+
+    def can_skip_configure(self, cmd: list[str]) -> bool:
+        """The configure step can only be skipped if we know the build
+        directory (i.e. it is not selected by a preset), and if the user did
+        not explicitly request a fresh configuration."""
+        return not self.runner.dry and "-B" in cmd and "--fresh" not in cmd
+
+    def configure(self, force: bool = False):
+        """Run the CMake configure step. The step is skipped if the build
+        directory was already configured with the exact same command, options,
+        environment and toolchain file, unless force is set."""
         env = self.prepare_environment()
         cmd = self.get_configure_command()
         cwd = self.get_working_dir()
+        fingerprint_file = self.get_fingerprint_file()
+        use_fingerprint = self.can_skip_configure(cmd)
+        if use_fingerprint:
+            fingerprint = self.get_configure_fingerprint(cmd, env)
+            old_fingerprint = None
+            with contextlib.suppress(OSError):
+                old_fingerprint = fingerprint_file.read_text(encoding="utf-8")
+            if not force and old_fingerprint == fingerprint and self.is_configured():
+                logger.info(
+                    "CMake configuration in %s is up to date, skipping configure step",
+                    self.cmake_settings.build_path,
+                )
+                return
+            # The fingerprint is only valid after a successful configure step
+            with contextlib.suppress(FileNotFoundError):
+                fingerprint_file.unlink()
         self.run(cmd, cwd=cwd, check=True, env=env)
+        if use_fingerprint:
+            fingerprint = self.get_configure_fingerprint(cmd, env)
+            write_file_if_changed(fingerprint_file, fingerprint.encode("utf-8"))
 
     def get_build_command(self, config, preset):
         cmd = [str(self.cmake_settings.command), "--build"]
@@ -423,8 +531,30 @@ class CMaker:
         for config in self.install_settings.configs or [None]:
             yield from self.get_install_command(config)
 
-    def install(self):
+    def get_install_manifest(self, component: str) -> Path:
+        """File in which CMake lists the files installed by the install step
+        for the given component."""
+        if component:
+            return self.cmake_settings.build_path / f"install_manifest_{component}.txt"
+        return self.cmake_settings.build_path / "install_manifest.txt"
+
+    def read_install_manifest(self, component: str) -> list[Path]:
+        try:
+            manifest = self.get_install_manifest(component).read_text("utf-8")
+        except FileNotFoundError:
+            return []
+        return [Path(f) for f in manifest.splitlines() if f]
+
+    def install(self) -> list[Path]:
+        """Run the install step, and return the list of installed files (as
+        listed in CMake's install manifests)."""
         env = self.prepare_environment()
         cwd = self.get_working_dir()
-        for cmd in self.get_install_commands():
-            self.run(cmd, cwd=cwd, check=True, env=env)
+        installed: dict[Path, None] = {}
+        configs: list[str | None] = [*self.install_settings.configs] or [None]
+        for config in configs:
+            cmds = self.get_install_command(config)
+            for component, cmd in zip(self.install_settings.components, cmds):
+                self.run(cmd, cwd=cwd, check=True, env=env)
+                installed.update(dict.fromkeys(self.read_install_manifest(component)))
+        return list(installed)
@@ -2,17 +2,25 @@ from __future__ import annotations
 
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
 from subprocess import CalledProcessError
 from subprocess import run as sp_run
+from typing import TYPE_CHECKING, Sequence
 
-from distlib.version import NormalizedVersion  # type: ignore[import-untyped]
+from . import probe_cache
+
+if TYPE_CHECKING:
+    from distlib.version import NormalizedVersion  # type: ignore[import-untyped]
 
 
 class CommandRunner:
-    def __init__(self, verbose: bool = False, dry: bool = False):
+    def __init__(
+        self, verbose: bool = False, dry: bool = False, probe_cache: bool = False
+    ):
         self.verbose = verbose
         self.dry = dry
+        self.probe_cache = probe_cache
 
     def run(self, *args, **kwargs):
         """Wrapper around subprocess.run that optionally prints the command."""
@@ -37,6 +45,8 @@ class CommandRunner:
     ):
         """Check if there's a new enough version of the given command available
         in PATH."""
+        from distlib.version import NormalizedVersion
+
         name = name or program
         if self.verbose:
             print(
@@ -45,10 +55,10 @@ class CommandRunner:
         try:
             # Try running the command
             cmd = [program, "--version"] if check_version else [program, "-h"]
-            res = self.run(cmd, check=True, capture_output=True, encoding="utf-8")
+            output = self.run_probe(cmd, name, check_version)
             # Try finding the version
-            if res is not None and check_version:
-                m = re.search(r"\d+(\.\d+){1,}", res.stdout)
+            if output is not None and check_version:
+                m = re.search(r"\d+(\.\d+){1,}", output)
                 if not m:
                     msg = f"Unexpected {name} version output"
                     raise RuntimeError(msg)
@@ -71,3 +81,35 @@ class CommandRunner:
                 print(f"{type(e).__module__}.{type(e).__name__}", e, sep=": ")
             return False
         return True
+
+    def run_probe(self, cmd: list[str], name: str, keep_output: bool) -> str | None:
+        """Run the given command and return its output, or reuse the output of
+        an earlier successful run of the same executable (if the probe cache
+        is enabled)."""
+        use_file = self.probe_cache
+        use_cache = use_file or probe_cache.is_memory_cache_enabled()
+        key = probe_cache.get_probe_key(cmd) if use_cache and not self.dry else None
+        output = probe_cache.lookup_probe(key, use_file) if key is not None else None
+        if output is not None:
+            if self.verbose:
+                print(f"Using cached result of {name} probe")
+            return output
+        res = self.run(cmd, check=True, capture_output=True, encoding="utf-8")
+        if res is None:
+            return None
+        output = res.stdout if keep_output else ""
+        if key is not None:
+            probe_cache.store_probe(key, output, use_file)
+        return output
+
+    def check_program_versions(
+        self,
+        probes: Sequence[tuple[str, NormalizedVersion | None, str | None, bool]],
+    ) -> list[bool]:
+        """Call check_program_version for each of the given argument tuples.
+        The probes are carried out concurrently, unless verbose output is
+        enabled, to keep the output readable."""
+        if self.verbose or len(probes) < 2:
+            return [self.check_program_version(*p) for p in probes]
+        with ThreadPoolExecutor(len(probes)) as pool:
+            return list(pool.map(lambda p: self.check_program_version(*p), probes))
@@ -0,0 +1,135 @@
+"""
+Cache for the results of probing programs such as `cmake --version`. The
+results are stored in the user's cache directory only if enabled (using the
+`probe_cache` config setting or the PY_BUILD_CMAKE_PROBE_CACHE environment
+variable), and kept in memory by the daemon. Results are keyed by the path of the executable as found in the PATH, its
+resolved path, size and modification time, so installing a different version
+of the program invalidates the entry automatically.
+
+Version manager shims (e.g. pyenv or asdf) are scripts that select the actual
+program based on environment variables or files in the working directory, so
+their identity says nothing about the program that will run. For scripts, the
+working directory and all environment variables are therefore part of the key
+as well. Selection based on configuration files (such as .tool-versions) that
+change while the environment stays the same is not detected; disable the cache
+or delete the cache file in that case.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Sequence
+
+from .. import __version__
+from ..common.util import get_user_cache_dir, write_file_if_changed
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+max_entries = 256
+# Probe results by key, only used by the daemon
+_memory_cache: dict[str, str] | None = None
+
+
+def enable_memory_cache():
+    """Keep the probe results in memory, for long-lived processes that carry
+    out multiple hooks."""
+    global _memory_cache  # noqa: PLW0603
+    if _memory_cache is None:
+        _memory_cache = {}
+
+
+def is_memory_cache_enabled() -> bool:
+    return _memory_cache is not None
+
+
+def get_probe_cache_file() -> Path | None:
+    try:
+        return get_user_cache_dir() / "probes.json"
+    except RuntimeError:  # Home directory cannot be determined
+        return None
+
+
+def _is_script(path: Path) -> bool:
+    if path.suffix.lower() in (".bat", ".cmd", ".ps1"):
+        return True
+    try:
+        with path.open("rb") as f:
+            return f.read(2) == b"#!"
+    except OSError:
+        return False
+
+
+def _get_environment_digest() -> str:
+    env = json.dumps(sorted(os.environ.items()), ensure_ascii=False)
+    return hashlib.sha256(env.encode("utf-8", "surrogateescape")).hexdigest()
+
+
+def get_probe_key(cmd: Sequence[str]) -> str | None:
+    """Identify the program that would be executed by the given command.
+    Returns None if the program cannot be found."""
+    path = shutil.which(cmd[0])
+    if path is None:
+        return None
+    try:
+        realpath = Path(path).resolve()
+        st = realpath.stat()
+    except OSError:
+        return None
+    # The unresolved path matters for programs that behave differently
+    # depending on the name they are invoked by (e.g. ccache symlinks)
+    key = [__version__, path, str(realpath), st.st_size, st.st_mtime_ns]
+    if _is_script(realpath):
+        key += [str(Path.cwd()), _get_environment_digest()]
+    return json.dumps(key + list(cmd[1:]))
+
+
+def _load(cache_file: Path) -> dict[str, str]:
+    try:
+        entries = json.loads(cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return entries if isinstance(entries, dict) else {}
+
+
+def lookup_probe(key: str, use_file: bool) -> str | None:
+    """Get the output of a previous successful probe, from memory, or from the
+    cache file if use_file is set."""
+    with _lock:
+        if _memory_cache is not None and key in _memory_cache:
+            return _memory_cache[key]
+    cache_file = get_probe_cache_file() if use_file else None
+    if cache_file is None:
+        return None
+    with _lock:
+        return _load(cache_file).get(key)
+
+
+def store_probe(key: str, output: str, use_file: bool):
+    """Store the output of a successful probe, in memory, and in the cache file
+    if use_file is set. Failure to write the cache file is not an error."""
+    with _lock:
+        if _memory_cache is not None:
+            _memory_cache[key] = output
+    cache_file = get_probe_cache_file() if use_file else None
+    if cache_file is None:
+        return
+    with _lock:
+        entries = _load(cache_file)
+        entries.pop(key, None)
+        entries[key] = output
+        # Dicts preserve insertion order, drop the oldest entries
+        for old_key in list(entries)[: max(0, len(entries) - max_entries)]:
+            del entries[old_key]
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            contents = json.dumps(entries, indent=1).encode("utf-8")
+            write_file_if_changed(cache_file, contents)
+        except OSError as e:
+            logger.debug("Failed to write probe cache %s: %s", cache_file, e)
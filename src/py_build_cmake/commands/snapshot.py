@@ -0,0 +1,370 @@
+"""
+Snapshots of CMake build directories, to avoid compiling everything from
+scratch on machines that start without a build directory (e.g. CI runners).
+A snapshot is a compressed archive of a configured and built build directory,
+stored in a local directory under a name that consists of the build
+configuration name and a fingerprint of the configuration.
+
+When a snapshot is restored, absolute paths to the original source and build
+directories in CMake's text files (such as CMakeCache.txt) are relocated.
+The modification times of the restored files are set such that only the
+build outputs that depend on source files that changed since the snapshot was
+created are rebuilt. The source files themselves are never modified. This only
+works for CMake's Makefile generators: Ninja records the modification times of
+the outputs and hashes of the commands (which contain absolute paths) in its
+logs, which cannot be relocated, so Ninja build directories are not supported.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tarfile
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+from .. import __version__
+from ..common.util import CacheKey
+
+logger = logging.getLogger(__name__)
+
+snapshot_version = 1
+metadata_name = "py-build-cmake-snapshot.json"
+
+
+def is_ninja_build_dir(build_dir: Path) -> bool:
+    """Check whether the given build directory was generated by one of CMake's
+    Ninja generators."""
+    return (build_dir / "build.ninja").is_file()
+
+
+def _check_relocatable(build_dir: Path, description: str):
+    if is_ninja_build_dir(build_dir):
+        msg = (
+            f"{description} was generated by Ninja, whose logs cannot be "
+            "relocated without rebuilding everything. Please use a Makefile "
+            "generator instead."
+        )
+        raise ValueError(msg)
+
+
+def iter_source_files(source_dir: Path, build_dir: Path) -> Iterable[Path]:
+    """Iterate over the files in the source directory, excluding the build
+    directory, hidden folders (e.g. .git and .py-build-cmake_cache) and
+    __pycache__ folders."""
+    build_dir = build_dir.resolve()
+    for dirpath, dirs, files in os.walk(source_dir):
+        path = Path(dirpath)
+        dirs[:] = sorted(
+            d
+            for d in dirs
+            if not d.startswith(".")
+            and d != "__pycache__"
+            and (path / d).resolve() != build_dir
+        )
+        for f in sorted(files):
+            yield path / f
+
+
+def hash_source_files(source_dir: Path, build_dir: Path) -> dict[str, str]:
+    """SHA256 hashes of all source files, by relative path."""
+    hashes = {}
+    for path in iter_source_files(source_dir, build_dir):
+        sha256 = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(chunk)
+        hashes[path.relative_to(source_dir).as_posix()] = sha256.hexdigest()
+    return hashes
+
+
+def get_snapshot_fingerprint(
+    build_config: str,
+    cmake_cfg: dict[str, Any],
+    cross_cfg: dict[str, Any] | None,
+    source_dir: Path,
+    extra: Iterable[str] = (),
+) -> str:
+    """Fingerprint of everything that should be the same for a snapshot to be
+    usable: the configuration, the platform and any extra values given by the
+    user (e.g. the compiler version). The location of the source and build
+    directories does not matter, and neither do the contents of the source
+    files (changed files are simply rebuilt)."""
+
+    def relocatable(value: Any) -> str:
+        s = json.dumps(value, sort_keys=True, default=str)
+        for src in {str(source_dir), source_dir.as_posix()}:
+            s = s.replace(json.dumps(src)[1:-1], "{source_dir}")
+        return s
+
+    cmake_cfg = {k: v for k, v in cmake_cfg.items() if k != "build_path"}
+    key = CacheKey()
+    key.update(__version__, snapshot_version, sys.platform, build_config)
+    key.update(relocatable(cmake_cfg), relocatable(cross_cfg))
+    key.update(*extra)
+    return key.hexdigest()
+
+
+def get_snapshot_path(store_dir: Path, build_config: str, fingerprint: str) -> Path:
+    return store_dir / f"{build_config}-{fingerprint[:32]}.tar.gz"
+
+
+def export_snapshot(
+    store_dir: Path,
+    build_dir: Path,
+    source_dir: Path,
+    build_config: str,
+    fingerprint: str,
+) -> Path:
+    """Pack the given build directory into a snapshot in store_dir, replacing
+    any previous snapshot with the same name. Returns the path of the
+    snapshot."""
+    if not (build_dir / "CMakeCache.txt").is_file():
+        msg = f"Build directory {build_dir} has not been configured"
+        raise ValueError(msg)
+    _check_relocatable(build_dir, f"Build directory {build_dir}")
+    metadata = {
+        "version": snapshot_version,
+        "build_config": build_config,
+        "fingerprint": fingerprint,
+        "source_dir": str(source_dir),
+        "build_dir": str(build_dir),
+        "sources": hash_source_files(source_dir, build_dir),
+    }
+    metadata_bytes = json.dumps(metadata, indent=1).encode("utf-8")
+    store_dir.mkdir(parents=True, exist_ok=True)
+    snapshot = get_snapshot_path(store_dir, build_config, fingerprint)
+    tmp_snapshot = snapshot.with_name(f".{snapshot.name}.{os.getpid()}.tmp")
+    try:
+        with tarfile.open(tmp_snapshot, "w:gz", compresslevel=6) as tar:
+            info = tarfile.TarInfo(metadata_name)
+            info.size, info.mtime = len(metadata_bytes), int(time.time())
+            tar.addfile(info, io.BytesIO(metadata_bytes))
+            for path in sorted(build_dir.iterdir()):
+                tar.add(path, arcname=path.name)
+        tmp_snapshot.replace(snapshot)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            tmp_snapshot.unlink()
+    logger.info("Exported build directory %s to %s", build_dir, snapshot)
+    return snapshot
+
+
+def _check_member(member: tarfile.TarInfo):
+    """Only allow regular files, folders and links that stay inside of the
+    build directory (for Python versions without tarfile extraction
+    filters)."""
+    path = Path(member.name)
+    if path.is_absolute() or ".." in path.parts:
+        msg = f"Invalid path in snapshot: {member.name}"
+        raise ValueError(msg)
+    if member.issym() or member.islnk():
+        target = Path(member.linkname)
+        if member.issym():
+            target = path.parent / target
+        if target.is_absolute() or os.path.normpath(target).startswith(".."):
+            msg = f"Invalid link in snapshot: {member.name} -> {member.linkname}"
+            raise ValueError(msg)
+    elif not (member.isfile() or member.isdir()):
+        msg = f"Invalid file type in snapshot: {member.name}"
+        raise ValueError(msg)
+
+
+def _extract(tar: tarfile.TarFile, dest: Path):
+    if hasattr(tarfile, "data_filter"):
+        tar.extractall(dest, filter="data")
+    else:
+        members = tar.getmembers()
+        for member in members:
+            _check_member(member)
+        tar.extractall(dest, members)
+
+
+def relocate_paths(root: Path, mapping: dict[str, str]):
+    """Replace the given absolute paths in all text files in the given
+    directory. Binary files (files that contain null bytes) are not modified,
+    since the length of the paths may differ."""
+    replacements = {}
+    for old, new in mapping.items():
+        if old != new:
+            replacements[old.encode()] = new.encode()
+            replacements[Path(old).as_posix().encode()] = Path(new).as_posix().encode()
+    if not replacements:
+        return
+    # Replace longer paths first (the build directory is often a subdirectory
+    # of the source directory), and only match complete path components
+    keys = sorted(replacements, key=len, reverse=True)
+    pattern = re.compile(b"(?:" + b"|".join(map(re.escape, keys)) + rb")(?![\w.+-])")
+    count = 0
+    for dirpath, _, files in os.walk(root):
+        for f in files:
+            path = Path(dirpath) / f
+            if path.is_symlink():
+                continue
+            with path.open("rb") as fd:
+                data = fd.read(8192)
+                if b"\0" in data:
+                    continue
+                data += fd.read()
+            if b"\0" in data or not pattern.search(data):
+                continue
+            path.write_bytes(pattern.sub(lambda m: replacements[m[0]], data))
+            count += 1
+    logger.debug("Relocated paths in %d files", count)
+
+
+def _parse_make_rules(path: Path) -> Iterable[tuple[str, list[str]]]:
+    """Parse the rules in a Makefile or a Makefile-style dependency file, as
+    written by the compiler (.d files) or by CMake's Makefile generators
+    (build.make, compiler_depend.make). Recipes and variables are ignored."""
+    text = path.read_text(encoding="utf-8", errors="surrogateescape")
+    for line in re.sub(r"\\\r?\n", " ", text).splitlines():
+        if line.startswith(("#", "\t")):
+            continue
+        target, sep, deps = line.partition(": ")
+        if sep:
+            deps_list = re.split(r"(?<!\\)\s+", deps.strip())
+            yield target.strip(), [d.replace("\\ ", " ") for d in deps_list if d]
+
+
+def _parse_cmake_list(path: Path, variable: str) -> list[str]:
+    """Get the quoted values of a set() command in a CMake file such as
+    CMakeFiles/Makefile.cmake."""
+    text = path.read_text(encoding="utf-8", errors="surrogateescape")
+    m = re.search(r"set\(" + variable + r"\s((?:\s*\"[^\"]*\")*)\s*\)", text)
+    return re.findall(r"\"([^\"]*)\"", m[1]) if m else []
+
+
+def _find_dependent_outputs(
+    root: Path, changed: dict[str, int]
+) -> Iterable[tuple[Path, int]]:
+    """Find the build outputs in the given directory that depend on any of the
+    given changed files, according to the Makefiles and dependency files
+    generated by CMake and the compiler. Yields the outputs together with the
+    earliest modification time of the changed files they depend on."""
+    for dirpath, _, files in os.walk(root):
+        directory = Path(dirpath)
+        for f in files:
+            path = directory / f
+            if f.endswith((".d", ".make")):
+                rules = _parse_make_rules(path)
+                # Targets are relative to the directory containing CMakeFiles
+                dirs = [d for d in path.parents if d.name == "CMakeFiles"]
+                base = dirs[0].parent if dirs else directory
+            elif f == "Makefile.cmake" and directory.name == "CMakeFiles":
+                # Files that cause CMake to re-run the configuration step
+                outputs = _parse_cmake_list(path, "CMAKE_MAKEFILE_OUTPUTS")
+                depends = _parse_cmake_list(path, "CMAKE_MAKEFILE_DEPENDS")
+                rules = iter([(t, depends) for t in outputs])
+                base = directory.parent
+            else:
+                continue
+            for target, deps in rules:
+                mtimes = [changed[d] for d in deps if d in changed]
+                if mtimes:
+                    yield base / target, min(mtimes)
+
+
+def update_mtimes(
+    build_dir: Path,
+    source_dir: Path,
+    sources: dict[str, str],
+    current: dict[str, str] | None = None,
+):
+    """Make the restored build directory up to date with respect to the
+    source files that did not change since the snapshot was created, and out
+    of date with respect to the files that did change. Only the modification
+    times of the files in the build directory are changed: they are set to a
+    time after all unchanged source files, except for the build outputs that
+    depend on changed source files (according to the dependency information
+    of CMake's Makefile generators), which are set to a time before the
+    changed files. The current hashes of the source files are computed if not
+    given."""
+    if current is None:
+        current = hash_source_files(source_dir, build_dir)
+    restored = time.time_ns() - 1_000_000_000
+    changed: dict[str, int] = {}
+    for rel_path, sha256 in current.items():
+        path = source_dir / rel_path
+        mtime = path.stat().st_mtime_ns
+        if sources.get(rel_path) == sha256:
+            restored = max(restored, mtime)
+        else:
+            changed[str(path)] = changed[path.as_posix()] = mtime
+    for dirpath, _, files in os.walk(build_dir):
+        for f in files:
+            path = Path(dirpath) / f
+            if not path.is_symlink():
+                os.utime(path, ns=(restored, restored))
+    outdated: dict[Path, int] = {}
+    for output, mtime in _find_dependent_outputs(build_dir, changed):
+        outdated[output] = min(mtime, outdated.get(output, mtime))
+    for output, mtime in outdated.items():
+        if output.is_file() and not output.is_symlink():
+            older = mtime - 1_000_000_000
+            os.utime(output, ns=(older, older))
+    if changed:
+        num_changed = sum(1 for p in current if sources.get(p) != current[p])
+        logger.info(
+            "%d source files changed since the snapshot was created, "
+            "%d build outputs are out of date",
+            num_changed,
+            len(outdated),
+        )
+
+
+def import_snapshot(
+    store_dir: Path,
+    build_dir: Path,
+    source_dir: Path,
+    build_config: str,
+    fingerprint: str,
+    force: bool = False,
+) -> Path | None:
+    """Restore the snapshot with the given name from store_dir to the given
+    build directory. Returns the path of the snapshot, or None if there is no
+    such snapshot, or if the build directory exists already and force is
+    not set."""
+    snapshot = get_snapshot_path(store_dir, build_config, fingerprint)
+    if not snapshot.is_file():
+        logger.info("No snapshot %s found", snapshot)
+        return None
+    if build_dir.exists() and any(build_dir.iterdir()):
+        if not force:
+            logger.info("Build directory %s exists, not restoring it", build_dir)
+            return None
+        shutil.rmtree(build_dir)
+    build_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = build_dir.with_name(f".{build_dir.name}.{os.getpid()}.tmp")
+    try:
+        with tarfile.open(snapshot, "r:gz") as tar:
+            _extract(tar, tmp_dir)
+        metadata_path = tmp_dir / metadata_name
+        metadata = json.loads(metadata_path.read_bytes())
+        metadata_path.unlink()
+        if metadata["version"] != snapshot_version:
+            msg = f"Unsupported snapshot version in {snapshot}"
+            raise ValueError(msg)
+        _check_relocatable(tmp_dir, f"Snapshot {snapshot}")
+        mapping = {
+            metadata["build_dir"]: str(build_dir),
+            metadata["source_dir"]: str(source_dir),
+        }
+        relocate_paths(tmp_dir, mapping)
+        with contextlib.suppress(FileNotFoundError):
+            build_dir.rmdir()
+        tmp_dir.replace(build_dir)
+    finally:
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+    update_mtimes(build_dir, source_dir, metadata["sources"])
+    logger.info("Restored build directory %s from %s", build_dir, snapshot)
+    return snapshot
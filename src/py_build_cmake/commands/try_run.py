@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Optional, Tuple
 
 from distlib.version import NormalizedVersion  # type: ignore[import-untyped]
 
@@ -8,15 +8,19 @@ from ..common import CMAKE_MINIMUM_REQUIRED, Config
 from ..common.util import get_os_name
 from .cmd_runner import CommandRunner
 
+# Arguments for CommandRunner.check_program_version and the build requirement
+# to add if the check fails
+ProgramProbe = Tuple[Tuple[str, Optional[NormalizedVersion], Optional[str], bool], str]
 
-def check_cmake_program(cfg: Config, deps: list[str], runner: CommandRunner):
-    assert cfg.cmake
+
+def get_cmake_program_probes(cfg: Config) -> list[ProgramProbe]:
+    cmake_cfg = cfg.cmake or {}
     # Do we need to perform a native build?
     native = not cfg.cross
-    native_cfg = cfg.cmake.get(get_os_name(), {}) if native else {}
+    native_cfg = cmake_cfg.get(get_os_name(), {}) if native else {}
     # Do we need to perform a cross build?
     cross = cfg.cross
-    cross_cfg = cfg.cmake.get("cross", {})
+    cross_cfg = cmake_cfg.get("cross", {})
     cfgs: list[dict[str, Any]] = []
     if native:
         cfgs.append(native_cfg)
@@ -34,20 +38,28 @@ def check_cmake_program(cfg: Config, deps: list[str], runner: CommandRunner):
     )
     # If CMake in PATH doesn't work or is too old, add it as a build
     # requirement
-    if not runner.check_program_version("cmake", min_cmake_ver, "CMake"):
-        deps.append("cmake>=" + str(min_cmake_ver))
+    probes: list[ProgramProbe] = [
+        (("cmake", min_cmake_ver, "CMake", True), "cmake>=" + str(min_cmake_ver))
+    ]
 
     # Do any of the configs require Ninja as a generator?
     need_ninja = any(
         "ninja" in v.get("generator", "").lower() for c in cfgs for v in c.values()
     )
-    if need_ninja and not runner.check_program_version("ninja", None, "Ninja"):
+    if need_ninja:
         # If so, check if a working version exists in the PATH, otherwise,
         # add it as a build requirement
-        deps.append("ninja")
+        probes.append((("ninja", None, "Ninja", True), "ninja"))
+    return probes
+
+
+def get_stubgen_program_probes() -> list[ProgramProbe]:
+    # we need https://github.com/python/mypy/pull/14722
+    return [(("stubgen", None, None, False), "mypy>=1.4.0")]
 
 
-def check_stubgen_program(deps: list[str], runner: CommandRunner):
-    if not runner.check_program_version("stubgen", None, None, False):
-        # we need https://github.com/python/mypy/pull/14722
-        deps.append("mypy>=1.4.0")
+def check_programs(probes: list[ProgramProbe], deps: list[str], runner: CommandRunner):
+    """Check all programs (concurrently), and add the build requirements for
+    the programs that are missing or too old to deps."""
+    results = runner.check_program_versions([args for args, _ in probes])
+    deps += [dep for (_, dep), ok in zip(probes, results) if not ok]
@@ -0,0 +1,210 @@
+"""
+User-level cache of build directories. Build frontends like pip build packages
+from source distributions in a new temporary directory every time, so the
+build directories in .py-build-cmake_cache are thrown away after each build.
+When the user cache is enabled, the build directories are placed in the user's
+cache directory instead, under a name that consists of the project name and
+version, and a digest of the contents of the source directory.
+
+When the same sources are built again from a different directory, the paths in
+CMake's text files are relocated (see snapshot.py). Build directories that were
+generated by Ninja cannot be relocated, and are removed instead. The total size
+of the cache is limited by removing the least recently used entries.
+
+Each entry has a lock file next to it, which is locked for the entire duration
+of a build, so concurrent builds of the same sources wait for each other
+instead of writing to the same build directories, and entries that are in use
+are never removed.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import IO, Iterator
+
+from .. import __version__
+from ..common.util import CacheKey, get_user_cache_dir, write_file_if_changed
+from .snapshot import (
+    hash_source_files,
+    is_ninja_build_dir,
+    relocate_paths,
+    update_mtimes,
+)
+
+logger = logging.getLogger(__name__)
+
+metadata_name = "py-build-cmake-entry.json"
+default_max_size_mib = 10 * 1024
+
+
+def get_build_cache_dir() -> Path:
+    return get_user_cache_dir() / "builds"
+
+
+def get_max_size() -> int:
+    """Maximum size of the user build cache in bytes, can be changed by
+    setting PY_BUILD_CMAKE_USER_BUILD_CACHE_SIZE (in MiB)."""
+    size = os.environ.get("PY_BUILD_CMAKE_USER_BUILD_CACHE_SIZE")
+    try:
+        return int(float(size) * 1024 * 1024) if size else default_max_size_mib << 20
+    except ValueError:
+        msg = "Invalid value for PY_BUILD_CMAKE_USER_BUILD_CACHE_SIZE: %s"
+        logger.warning(msg, size)
+        return default_max_size_mib << 20
+
+
+def get_dir_size(path: Path) -> int:
+    size = 0
+    for dirpath, _, files in os.walk(path):
+        for f in files:
+            with contextlib.suppress(OSError):
+                size += (Path(dirpath) / f).lstat().st_size
+    return size
+
+
+def _read_metadata(entry: Path) -> dict:
+    try:
+        metadata = json.loads((entry / metadata_name).read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return metadata if isinstance(metadata, dict) else {}
+
+
+def get_lock_path(entry: Path) -> Path:
+    return entry.with_name(f"{entry.name}.lock")
+
+
+def _try_lock(f: IO[bytes]) -> bool:
+    """Try to acquire an exclusive lock on the given file without blocking."""
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(f: IO[bytes]):
+    if sys.platform == "win32":
+        import msvcrt
+
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def lock_entry(entry: Path, blocking: bool = True) -> Iterator[bool]:
+    """Lock the given cache entry, waiting for other builds that are using it
+    if blocking is set. Yields whether the lock was acquired. The lock files
+    are never removed, since another process may be waiting for them."""
+    lock_path = get_lock_path(entry)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("ab") as f:
+        locked = _try_lock(f)
+        if not locked and blocking:
+            logger.info("Waiting for build cache entry %s to be released", entry)
+            while not locked:
+                time.sleep(0.1)
+                locked = _try_lock(f)
+        try:
+            yield locked
+        finally:
+            if locked:
+                _unlock(f)
+
+
+def evict(cache_dir: Path, max_size: int, keep: Path):
+    """Remove the least recently used entries until the total size of the cache
+    is below max_size. The sizes of the entries are measured when they are
+    used (before building them). The given entry and entries that are in use
+    by other builds are never removed."""
+    entries = []
+    for entry in cache_dir.iterdir():
+        if not entry.is_dir():
+            continue
+        metadata = _read_metadata(entry)
+        last_used = metadata.get("last_used", 0)
+        size = metadata.get("size")
+        if not isinstance(size, int):
+            size = get_dir_size(entry)
+        entries.append((last_used, size, entry))
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries, key=lambda e: e[0]):
+        if total <= max_size:
+            break
+        if entry == keep:
+            continue
+        with lock_entry(entry, blocking=False) as locked:
+            if not locked:
+                logger.debug("Build cache entry %s is in use, not removing it", entry)
+                continue
+            logger.info("Removing least recently used build cache entry %s", entry)
+            shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+
+
+@contextlib.contextmanager
+def use_entry(
+    cache_dir: Path, name: str, version: str, source_dir: Path, max_size: int
+) -> Iterator[Path]:
+    """Select and lock the cache entry for the given project and sources. If
+    the entry was last used for a different source directory, the paths in the
+    build directories are relocated, and Ninja build directories are removed.
+    The entry remains locked until the context is exited."""
+    sources = hash_source_files(source_dir, source_dir / ".py-build-cmake_cache")
+    key = CacheKey()
+    key.update(__version__, *(x for item in sorted(sources.items()) for x in item))
+    entry = cache_dir / f"{name}-{version}-{key.hexdigest()[:16]}"
+    with lock_entry(entry):
+        _prepare_entry(entry, cache_dir, source_dir, sources, max_size)
+        yield entry
+
+
+def _prepare_entry(
+    entry: Path,
+    cache_dir: Path,
+    source_dir: Path,
+    sources: dict[str, str],
+    max_size: int,
+):
+    entry.mkdir(parents=True, exist_ok=True)
+    metadata = _read_metadata(entry)
+    old_source_dir = metadata.get("source_dir")
+    if old_source_dir and old_source_dir != str(source_dir):
+        logger.info("Relocating build cache entry %s to %s", entry, source_dir)
+        for build_dir in entry.iterdir():
+            if is_ninja_build_dir(build_dir):
+                logger.warning(
+                    "Build directory %s was generated by Ninja, which does not "
+                    "support relocation, removing it. Please use a Makefile "
+                    "generator to reuse build directories from the user cache.",
+                    build_dir,
+                )
+                shutil.rmtree(build_dir)
+        relocate_paths(entry, {old_source_dir: str(source_dir)})
+        update_mtimes(entry, source_dir, sources, sources)
+    else:
+        logger.info("Using build cache entry %s", entry)
+    metadata = {
+        "source_dir": str(source_dir),
+        "size": get_dir_size(entry),
+        "last_used": time.time(),
+    }
+    write_file_if_changed(entry / metadata_name, json.dumps(metadata).encode())
+    evict(cache_dir, max_size, entry)
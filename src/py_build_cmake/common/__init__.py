@@ -5,9 +5,10 @@ import os
 from dataclasses import dataclass, field
 from pathlib import Path
 from subprocess import CalledProcessError
-from typing import Any, Sequence
+from typing import TYPE_CHECKING, Any, Sequence
 
-import pyproject_metadata
+if TYPE_CHECKING:
+    import pyproject_metadata
 
 logger = logging.getLogger(__name__)
 
@@ -102,6 +103,9 @@ class Config:
     wheel: dict[str, dict[str, Any]] = field(default_factory=dict)
     stubgen: dict[str, Any] | None = field(default=None)
     cross: dict[str, Any] | None = field(default=None)
+    # Whether any target has a CMake configuration, including the targets that
+    # were pruned because they do not apply to the current build
+    has_cmake: bool = field(default=False)
 
     @property
     def referenced_files(self) -> list[Path]:
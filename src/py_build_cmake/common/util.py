@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import contextlib
+import hashlib
+import os
 import platform
 import re
 import sys
-from typing import Sequence, cast
+import threading
+from pathlib import Path
+from typing import Any, Sequence, cast
 
 if sys.version_info < (3, 8):
     OSIdentifier = str
@@ -79,3 +84,74 @@ def archflags_to_platform_tag(archflags: Sequence[str]) -> str | None:
         ("x86_64",): "x86_64",
         ("arm64",): "arm64",
     }.get(tuple(sorted(archflags)))
+
+
+def write_file_if_changed(path: Path, contents: bytes) -> bool:
+    """Write the given contents to a file, unless the file already contains
+    exactly these bytes, in which case it is left untouched (including its
+    modification time). The new file is written to a temporary file first,
+    which then atomically replaces the original. Returns True if the file was
+    written."""
+    try:
+        if path.read_bytes() == contents:
+            return False
+    except OSError:
+        pass
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp.open("wb") as f:
+            f.write(contents)
+        tmp.replace(path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            tmp.unlink()
+        raise
+    return True
+
+
+class CacheKey:
+    """Incrementally computes a digest of all inputs of a build."""
+
+    def __init__(self) -> None:
+        self._hash = hashlib.sha256()
+
+    def update(self, *args: Any):
+        for a in args:
+            self._hash.update(str(a).encode("utf-8"))
+            self._hash.update(b"\0")
+
+    def update_file_stat(self, path: Path, label: str | Path):
+        """Add the size and modification time of the given file."""
+        try:
+            st = path.stat()
+            self.update(label, st.st_size, st.st_mtime_ns)
+        except OSError:
+            self.update(label, "<missing>")
+
+    def update_file_contents(self, path: Path):
+        self.update(path)
+        try:
+            with path.open("rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    self._hash.update(chunk)
+        except OSError:
+            self.update("<missing>")
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def get_user_cache_dir() -> Path:
+    """Directory for caches that are shared between projects and builds. Can be
+    overridden using the PY_BUILD_CMAKE_CACHE_DIR environment variable."""
+    cache_dir = os.environ.get("PY_BUILD_CMAKE_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir)
+    system = platform.system()
+    if system == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    elif system == "Darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "py-build-cmake"
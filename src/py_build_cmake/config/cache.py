@@ -0,0 +1,151 @@
+"""
+Caching of the fully resolved configuration. Build frontends usually invoke
+each PEP 517 hook in a separate process, so without this cache, all config
+files would be loaded, verified, overridden and finalized again for every
+hook. The cache is opt-in (see _BuildBackend.is_config_cache_enabled), because
+it writes to the source directory. The daemon additionally keeps the resolved
+configurations in memory (see enable_memory_cache).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import platform
+import sys
+import sysconfig
+from pathlib import Path
+from typing import Any, Iterable
+
+from .. import __version__
+from ..common import Config
+from ..common.util import CacheKey, write_file_if_changed
+
+logger = logging.getLogger(__name__)
+
+# Pickled cache entries by key, only used by the daemon. Every lookup unpickles
+# a new copy, because the hooks modify the configuration (dynamic metadata).
+_memory_cache: dict[str, bytes] | None = None
+max_memory_entries = 16
+
+# Environment variables that affect the configuration (see quirks.py and
+# load_extra_config_files)
+config_env_vars = (
+    "ARCHFLAGS",
+    "DIST_EXTRA_CONFIG",
+    "MACOSX_DEPLOYMENT_TARGET",
+    "_PYTHON_HOST_PLATFORM",
+    "PWD",
+)
+
+
+def get_config_cache_file(pyproject_folder: Path) -> Path:
+    return pyproject_folder / ".py-build-cmake_cache" / "config.pickle"
+
+
+def get_config_cache_key(
+    pyproject_path: Path,
+    flag_overrides: dict[str, list[str]],
+    config_files: Iterable[Path],
+    cli_overrides: Any,
+) -> str:
+    """Compute the key for the configuration cache, based on the contents of
+    all config files, the command-line overrides, and the identity of the
+    Python interpreter and platform."""
+    key = CacheKey()
+    key.update(__version__, sys.version, sys.executable)
+    key.update(sys.implementation.cache_tag, sysconfig.get_platform())
+    key.update(platform.system(), platform.machine())
+    for var in config_env_vars:
+        key.update(var, os.environ.get(var, "<unset>"))
+    key.update(pyproject_path.resolve(), repr(flag_overrides), repr(cli_overrides))
+    key.update_file_contents(pyproject_path)
+    for path in config_files:
+        key.update_file_contents(path)
+    dist_extra_conf = os.environ.get("DIST_EXTRA_CONFIG")
+    if dist_extra_conf:
+        key.update_file_contents(Path(dist_extra_conf))
+    return key.hexdigest()
+
+
+def _file_signature(path: Path) -> tuple[int, int, str] | None:
+    """Size, modification time and hash of the given file, or None if it does
+    not exist."""
+    try:
+        st = path.stat()
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns, digest
+
+
+def enable_memory_cache():
+    """Keep the resolved configurations in memory, for long-lived processes
+    that carry out multiple hooks."""
+    global _memory_cache  # noqa: PLW0603
+    if _memory_cache is None:
+        _memory_cache = {}
+
+
+def is_memory_cache_enabled() -> bool:
+    return _memory_cache is not None
+
+
+def _check_entry(entry: Any, key: str) -> Config | None:
+    """Return the configuration of the given cache entry if it was stored
+    using the same key, and if none of the files it references (readme,
+    license) were created, removed or changed."""
+    if not isinstance(entry, dict) or entry.get("key") != key:
+        return None
+    if any(_file_signature(path) != sig for path, sig in entry["files"]):
+        return None
+    return entry["config"]
+
+
+def load_cached_config(cache_file: Path | None, key: str) -> Config | None:
+    """Return the configuration stored in memory or in the given cache file
+    using the same key, if it is still valid."""
+    if _memory_cache is not None and key in _memory_cache:
+        cfg = _check_entry(pickle.loads(_memory_cache[key]), key)
+        if cfg is not None:
+            logger.info("Configuration unchanged, using configuration in memory")
+            return cfg
+    if cache_file is None:
+        return None
+    try:
+        with cache_file.open("rb") as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:  # Corrupt cache or different versions of dependencies
+        logger.debug("Ignoring configuration cache %s: %s", cache_file, e)
+        return None
+    cfg = _check_entry(entry, key)
+    if cfg is not None:
+        logger.info(
+            "Configuration unchanged, using cached configuration %s", cache_file
+        )
+    return cfg
+
+
+def store_cached_config(cache_file: Path | None, key: str, cfg: Config):
+    """Store the configuration in memory (if enabled) and in the given cache
+    file. Failure to write the cache (e.g. because the source directory is
+    read-only) is not an error."""
+    files = [(path, _file_signature(path)) for path in cfg.referenced_files]
+    data = pickle.dumps({"key": key, "files": files, "config": cfg})
+    if _memory_cache is not None:
+        _memory_cache.pop(key, None)
+        _memory_cache[key] = data
+        # Dicts preserve insertion order, drop the oldest entries
+        for old_key in list(_memory_cache)[:-max_memory_entries]:
+            del _memory_cache[old_key]
+    if cache_file is None:
+        return
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        write_file_if_changed(cache_file, data)
+    except OSError as e:
+        logger.debug("Failed to write configuration cache %s: %s", cache_file, e)
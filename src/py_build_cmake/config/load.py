@@ -6,15 +6,15 @@ import os
 from copy import copy
 from pathlib import Path, PurePosixPath
 from pprint import pprint
-from typing import Any, Dict, Optional, cast
+from typing import TYPE_CHECKING, Any, Dict, Optional, cast
 
 import pyproject_metadata
 from distlib.util import normalize_name  # type: ignore[import-untyped]
-from lark import LarkError
 
 from .. import __version__
 from ..common import ComponentConfig, Config, ConfigError
-from .cli_override import CLIOption, parse_cli, parse_file
+from ..common.util import get_os_name
+from . import cache as config_cache
 from .options.config_path import ConfPath
 from .options.config_reference import ConfigReference
 from .options.default import ConfigDefaulter
@@ -32,6 +32,9 @@ from .options.value_reference import OverrideAction, OverrideActionEnum, ValueRe
 from .options.verify import ConfigVerifier
 from .quirks import config_quirks
 
+if TYPE_CHECKING:
+    from .cli_override import CLIOption
+
 try:
     import tomllib as toml_  # type: ignore[import,unused-ignore]
 except ImportError:
@@ -44,10 +47,16 @@ def read_full_config(
     pyproject_path: Path,
     config_settings: dict[str, str | list[str]] | None,
     verbose: bool,
+    all_targets: bool = False,
+    use_cache: bool = False,
 ) -> Config:
+    """Load and process the configuration. Unless all_targets is set, only the
+    configuration for the current platform (or for cross-compilation) is
+    resolved. If use_cache is set, the resolved configuration is cached in the
+    .py-build-cmake_cache directory next to pyproject.toml."""
     config_settings = config_settings or {}
     overrides, cli_overrides = parse_config_settings_overrides(config_settings, verbose)
-    cfg = read_config(pyproject_path, overrides, cli_overrides)
+    cfg = read_config(pyproject_path, overrides, cli_overrides, all_targets, use_cache)
     if verbose:
         print_config_verbose(cfg)
     return cfg
@@ -79,6 +88,16 @@ def parse_config_settings_overrides(
         pprint(file_overrides)
         print("Configuration settings command-line overrides:")
         pprint(cli_overrides)
+    return file_overrides, parse_cli_overrides(cli_overrides)
+
+
+def parse_cli_overrides(cli_overrides: list[str]) -> list[CLIOption]:
+    if not cli_overrides:  # Avoid importing Lark if not necessary
+        return []
+    from lark import LarkError
+
+    from .cli_override import parse_cli
+
     parsed_cli_overrides = []
     for o in cli_overrides:
         try:
@@ -86,7 +105,7 @@ def parse_config_settings_overrides(
         except LarkError as e:
             msg = f"Failed to parse command line override: {o}"
             raise ConfigError(msg) from e
-    return file_overrides, parsed_cli_overrides
+    return parsed_cli_overrides
 
 
 def try_load_toml(path: Path):
@@ -104,6 +123,10 @@ def try_load_toml(path: Path):
 
 
 def try_load_pbc(path: Path):
+    from lark import LarkError
+
+    from .cli_override import parse_file
+
     try:
         return parse_file(path.read_text("utf-8"))
     except FileNotFoundError as e:
@@ -117,12 +140,17 @@ def try_load_pbc(path: Path):
         raise ConfigError(msg) from e
 
 
+def get_config_file_path(path: Path) -> Path:
+    """Config files specified on the command line are relative to the working
+    directory of the frontend."""
+    if path.is_absolute():
+        return path
+    return (Path(os.environ.get("PWD", ".")) / path).resolve()
+
+
 def load_extra_config_files(flag_overrides, targetpath, config_files, overrides):
     for path in map(Path, flag_overrides):
-        if path.is_absolute():
-            fullpath = path
-        else:
-            fullpath = (Path(os.environ.get("PWD", ".")) / path).resolve()
+        fullpath = get_config_file_path(path)
         if path.suffix == ".toml":
             config = try_load_toml(fullpath)
             if config:  # Treat empty file as no override
@@ -144,18 +172,41 @@ def read_config(
     pyproject_path: str | Path,
     flag_overrides: dict[str, list[str]],
     cli_overrides: list[CLIOption],
+    all_targets: bool = False,
+    use_cache: bool = False,
 ) -> Config:
-    # Load the pyproject.toml file
     pyproject_path = Path(pyproject_path)
     pyproject_folder = pyproject_path.parent
+
+    # Load local overrides
+    check_if_local_configs_exist(flag_overrides, pyproject_folder)
+
+    # Reuse the configuration from a previous invocation if none of the config
+    # files and overrides changed
+    cache_file = None
+    if use_cache:
+        cache_file = config_cache.get_config_cache_file(pyproject_folder)
+    use_cache = not all_targets and (
+        use_cache or config_cache.is_memory_cache_enabled()
+    )
+    cache_key = ""
+    if use_cache:
+        cache_key = config_cache.get_config_cache_key(
+            pyproject_path,
+            flag_overrides,
+            [get_config_file_path(Path(p)) for f in flag_overrides.values() for p in f],
+            cli_overrides,
+        )
+        cfg = config_cache.load_cached_config(cache_file, cache_key)
+        if cfg is not None:
+            return cfg
+
+    # Load the pyproject.toml file
     pyproject: dict[str, Any] = try_load_toml(pyproject_path)
     if "project" not in pyproject:
         msg = "Missing [project] table"
         raise ConfigError(msg)
 
-    # Load local overrides
-    check_if_local_configs_exist(flag_overrides, pyproject_folder)
-
     # File names mapping to the actual dict with the config
     config_files: dict[str, dict[str, Any]] = {
         "pyproject.toml": pyproject,
@@ -176,7 +227,12 @@ def read_config(
     for i, o in enumerate(cli_overrides):
         overrides.update(add_cli_override(config_files, o, f"<cli:{i+1}>"))
 
-    return process_config(pyproject_path, config_files, overrides)
+    if all_targets:
+        return process_config(pyproject_path, config_files, overrides)
+    cfg = process_config(pyproject_path, config_files, overrides, active_only=True)
+    if use_cache:
+        config_cache.store_cached_config(cache_file, cache_key, cfg)
+    return cfg
 
 
 def check_if_local_configs_exist(flag_overrides, pyproject_folder):
@@ -218,7 +274,12 @@ def process_config(
     config_files: dict[str, dict[str, Any]],
     overrides: dict[ConfPath, ConfPath],
     test: bool = False,
+    active_only: bool = False,
 ) -> Config:
+    """Verify and process the given configuration files. If active_only is
+    set, the OS-specific and cross-compilation sections that do not apply to
+    the current build are discarded after verification, so their inheritance,
+    finalization and default values are not processed."""
     pyproject = config_files["pyproject.toml"]
     assert pyproject is not None
     # Check the package/module name and normalize it
@@ -248,13 +309,11 @@ def process_config(
 
     # Verify the configuration and apply the overrides
     verify_and_override_config(overrides, root_ref, root_val)
+    cfg.has_cmake = has_cmake_section(root_val)
 
-    # Tweak the configuration depending on the environment and platform
-    config_quirks(root_val.sub_ref(get_tool_pbc_path()))
-    set_up_os_specific_cross_inheritance(root_ref, root_val)
-
-    # Carry out inheritance between options
-    inherit_default_and_finalize_config(root_ref, root_val)
+    # Tweak the configuration depending on the environment and platform, and
+    # carry out inheritance between options
+    resolve_config(root_ref, root_val, active_only)
     pbc_value_ref = root_val.sub_ref(get_tool_pbc_path())
 
     # Store the module configuration
@@ -278,12 +337,6 @@ def process_config(
     }
 
     # Store the sdist folders (this is based on flit)
-    def get_sdist_cludes(v: ValueReference) -> dict[str, Any]:
-        return {
-            clude + "_patterns": v.get_value(ConfPath(("sdist", clude)))
-            for clude in ("include", "exclude")
-        }
-
     cfg.sdist = {
         os: get_sdist_cludes(pbc_value_ref.sub_ref(os))
         for os in ("linux", "windows", "mac", "cross")
@@ -324,6 +377,44 @@ def process_config(
     return cfg
 
 
+def get_sdist_cludes(v: ValueReference) -> dict[str, Any]:
+    sdist_cfg = {
+        clude + "_patterns": v.get_value(ConfPath(("sdist", clude)))
+        for clude in ("include", "exclude")
+    }
+    for opt in ("prune", "vcs", "compression_level", "cache"):
+        if v.is_value_set(ConfPath(("sdist", opt))):
+            sdist_cfg[opt] = v.get_value(ConfPath(("sdist", opt)))
+    return sdist_cfg
+
+
+def has_cmake_section(root_val: ValueReference) -> bool:
+    """Check whether the common section or any of the OS-specific or
+    cross-compilation sections contain a CMake configuration. This has to be
+    checked before the sections that do not apply to the current build are
+    pruned: a project that only uses CMake on Windows is still not a pure
+    Python package when built on Linux."""
+    pbc_value_ref = root_val.sub_ref(get_tool_pbc_path())
+    return pbc_value_ref.is_value_set("cmake") or any(
+        pbc_value_ref.is_value_set(ConfPath((os, "cmake")))
+        for os in ("linux", "windows", "mac", "cross")
+    )
+
+
+def resolve_config(
+    root_ref: ConfigReference, root_val: ValueReference, active_only: bool
+):
+    """Apply the platform quirks, and carry out inheritance, finalization and
+    default values. If active_only is set, the sections that do not apply to
+    the current build are pruned first, and the common sections are cleared
+    after they have been inherited by the OS-specific sections."""
+    config_quirks(root_val.sub_ref(get_tool_pbc_path()))
+    set_up_os_specific_cross_inheritance(root_ref, root_val)
+    if active_only:
+        prune_inactive_targets(root_ref, root_val)
+    inherit_default_and_finalize_config(root_ref, root_val, active_only)
+
+
 def verify_and_override_config(
     overrides: dict[ConfPath, ConfPath],
     root_ref: ConfigReference,
@@ -359,12 +450,16 @@ def verify_and_override_config(
 
 
 def inherit_default_and_finalize_config(
-    root_ref: ConfigReference, root_val: ValueReference
+    root_ref: ConfigReference,
+    root_val: ValueReference,
+    prune_inherited: bool = False,
 ):
     ConfigInheritor(
         root=root_ref,
         root_values=root_val,
     ).inherit()
+    if prune_inherited:
+        clear_inherited_values(root_val)
     root_val.set_value(
         "pyproject.toml",
         ConfigFinalizer(
@@ -398,6 +493,49 @@ def set_up_os_specific_cross_inheritance(
             root_ref.sub_ref(child).config.inherits = parent
 
 
+def get_active_targets(root_val: ValueReference) -> set[str] | None:
+    """Get the names of the OS-specific and cross-compilation sections that
+    are used for the current build. Returns None if the current OS is not
+    supported."""
+    pbc_value_ref = root_val.sub_ref(get_tool_pbc_path())
+    if pbc_value_ref.is_value_set("cross"):
+        targets = {"cross"}
+        os_path = ConfPath(("cross", "os"))
+        if pbc_value_ref.is_value_set(os_path):
+            targets.add(cast(str, pbc_value_ref.get_value(os_path)))
+        return targets
+    try:
+        return {get_os_name()}
+    except ValueError:
+        return None
+
+
+def prune_inactive_targets(root_ref: ConfigReference, root_val: ValueReference):
+    """Remove the options and values of the OS-specific and cross-compilation
+    sections that are not used for the current build. This should happen
+    after the configuration has been verified, and before inheritance."""
+    active = get_active_targets(root_val)
+    if active is None:
+        return
+    pbc_ref = root_ref.sub_ref(get_tool_pbc_path())
+    pbc_value_ref = root_val.sub_ref(get_tool_pbc_path())
+    for target in {"linux", "windows", "mac", "cross"} - active:
+        pbc_ref.config.sub_options.pop(target, None)
+        if pbc_value_ref.is_value_set(target):
+            pbc_value_ref.clear_value(target)
+
+
+def clear_inherited_values(root_val: ValueReference):
+    """After inheritance, the values of the common editable, sdist, cmake and
+    wheel sections have been merged into the OS-specific and cross-compilation
+    sections. Only the latter are used, so there is no need to finalize the
+    common sections or to fill in their default values."""
+    pbc_value_ref = root_val.sub_ref(get_tool_pbc_path())
+    for s in ("editable", "sdist", "cmake", "wheel"):
+        if pbc_value_ref.is_value_set(s):
+            pbc_value_ref.clear_value(s)
+
+
 def print_config_verbose(cfg: Config):
     print("\npy-build-cmake (" + __version__ + ")")
     print("options")
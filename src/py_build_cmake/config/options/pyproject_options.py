@@ -125,6 +125,51 @@ def get_options(project_path: Path | PurePosixPath, *, test: bool = False):
                                 "distribution. May include the '*' wildcard "
                                 "or '**' for recursive patterns.",
                                 default=DefaultValueValue([])),
+        BoolConfigOption("prune",
+                         "Skip directories that never belong in the source "
+                         "distribution while searching for the included "
+                         "files, without descending into them: version "
+                         "control metadata (e.g. `.git`), `__pycache__`, "
+                         "`.py-build-cmake_cache`, the CMake build "
+                         "directories (`cmake.build_path`), and any "
+                         "directory containing a `CMakeCache.txt` or "
+                         "`pyvenv.cfg` file. Directories that appear in the "
+                         "`include` patterns without wildcards are never "
+                         "skipped.\n"
+                         "If unset, pruning is enabled.",
+                         "prune = false"),
+        EnumConfigOption("vcs",
+                         "Select the files for the source distribution from "
+                         "the files tracked by version control, rather than "
+                         "walking the project directory. With `git`, the "
+                         "`include` and `exclude` patterns (and the files of "
+                         "the Python package) only consider the files listed "
+                         "by `git ls-files`, so untracked files are never "
+                         "included. The directories of submodules are "
+                         "walked instead, skipping the same directories as "
+                         "the `prune` option. The listing is cached until "
+                         "the git index changes. If the project is not part "
+                         "of a "
+                         "git repository, the project directory is walked "
+                         "instead.",
+                         "vcs = \"git\"",
+                         options=["git", "none"]),
+        IntConfigOption("compression_level",
+                        "Gzip compression level for the source "
+                        "distribution, from 0 (no compression) to 9 "
+                        "(smallest). The archive is compressed in blocks, "
+                        "using multiple threads.\n"
+                        "If unset, level 9 is used.",
+                        "compression_level = 6"),
+        BoolConfigOption("cache",
+                         "Keep a copy of the most recently built source "
+                         "distribution in `.py-build-cmake_cache/sdist`, and "
+                         "reuse it if the selected files (their names, sizes, "
+                         "modification times, permissions and contents) and "
+                         "the package metadata did not change. Pass the "
+                         "`rebuild` config setting to ignore the cached "
+                         "sdist.",
+                         "cache = true"),
     ])  # fmt: skip
 
     # [tool.py-build-cmake.cmake]
@@ -248,6 +293,20 @@ def get_options(project_path: Path | PurePosixPath, *, test: bool = False):
                               "Use an empty string to specify the default "
                               "component.",
                               default=DefaultValueValue([""])),
+        BoolConfigOption("incremental_install",
+                         "Install the project into a persistent prefix in the "
+                         "CMake build directory, rather than into a new "
+                         "temporary staging directory for every build. CMake "
+                         "skips files that are up-to-date, and the installed "
+                         "files are then hard linked into the staging "
+                         "directory (or copied if the build directory is on a "
+                         "different file system), so unchanged files are not "
+                         "copied again.\n"
+                         "Only the files listed in CMake's install manifest "
+                         "of the current build are packaged. The install "
+                         "prefix is specific to each CMake configuration, and "
+                         "this option has no effect for editable installs.",
+                         "incremental_install = true"),
         DictOfStrConfigOption("env",
                               "Environment variables to set when running "
                               "CMake. Supports variable expansion using "
@@ -255,6 +314,17 @@ def get_options(project_path: Path | PurePosixPath, *, test: bool = False):
                               "env = { \"CMAKE_PREFIX_PATH\" "
                               "= \"${HOME}/.local\" }",
                               default=DefaultValueValue({})),
+        ListOfStrConfigOption("depends_on",
+                              "Indices of other CMake configurations that "
+                              "have to be built and installed before this "
+                              "one is configured. Only relevant for projects "
+                              "with multiple CMake configurations, e.g. "
+                              "[tool.py-build-cmake.cmake.1]. Configurations "
+                              "without dependencies between them can be "
+                              "built in parallel (see the `parallel` config "
+                              "setting).",
+                              "depends_on = [\"0\"]",
+                              convert_str_to_singleton=True),
     ])  # fmt: skip
 
     # [tool.py-build-cmake.wheel]
@@ -386,6 +456,82 @@ def get_options(project_path: Path | PurePosixPath, *, test: bool = False):
                            "#file-name-convention",
                            "build_tag = '1'",
                            default=NoDefaultValue()),
+        BoolConfigOption("cache",
+                         "Keep a copy of the most recently built Wheel in the "
+                         "build cache directory, and reuse it if none of the "
+                         "inputs changed: the configuration, the Python source "
+                         "files and the outputs of the CMake builds. The CMake "
+                         "projects are still configured and built to detect "
+                         "changes, but the install, packaging and compression "
+                         "steps are skipped.\n"
+                         "Files that are installed directly from the source "
+                         "directory by CMake are not tracked, so only enable "
+                         "this option if all installed files are build "
+                         "outputs. Pass the `rebuild` config setting to "
+                         "ignore the cached Wheel.",
+                         "cache = true"),
+        BoolConfigOption("incremental",
+                         "Keep a link to the most recently built Wheel in the "
+                         "build cache directory, together with a manifest of "
+                         "its files. When building the Wheel again, the "
+                         "compressed data of files that did not change (same "
+                         "size, modification time and permissions) is copied "
+                         "from the previous Wheel without recompressing it, "
+                         "and only the files that changed are compressed "
+                         "again.\n"
+                         "Files whose modification times have a resolution "
+                         "of one second (such as files installed by CMake) "
+                         "are hashed to make sure that they did not change.",
+                         "incremental = true"),
+        IntConfigOption("compression_level",
+                        "Deflate compression level for the files in the "
+                        "Wheel, from 1 (fastest) to 9 (smallest). Level 0 "
+                        "stores the files without compression.\n"
+                        "If unset, the default level of zlib is used (6).",
+                        "compression_level = 9"),
+        IntConfigOption("editable_compression_level",
+                        "Compression level for editable Wheels (see "
+                        "`compression_level`). Editable Wheels are installed "
+                        "right away and never distributed, so speed matters "
+                        "more than size.\n"
+                        "If unset, level 1 is used.",
+                        "editable_compression_level = 0"),
+        DictOfStrConfigOption("compression_rules",
+                              "Compression level for specific files in the "
+                              "Wheel. The keys are glob patterns, which are "
+                              "matched against the full path of each file "
+                              "inside of the Wheel (`*` also matches `/`). "
+                              "The values are either compression levels (see "
+                              "`compression_level`) or `store`, to include "
+                              "the file without compression. Useful for "
+                              "files that are already compressed, or for "
+                              "large debug files where compression takes "
+                              "a long time for little gain. If multiple "
+                              "patterns match, the last one takes "
+                              "precedence. The rules also apply to editable "
+                              "Wheels.",
+                              "compression_rules = { '*.debug' = 'store', '*.so' = '9' }"),
+        EnumConfigOption("staging_method",
+                         "How files are placed in the staging directory "
+                         "from which the Wheel is created: `reflink` "
+                         "(copy-on-write clone), `hardlink`, `copy`, or "
+                         "`auto`. If a method is not supported by the file "
+                         "system, the next one in this list is used. With "
+                         "`auto`, files are only linked if the source "
+                         "directory and the temporary directory are on the "
+                         "same file system. Files that need to be copied "
+                         "are copied in parallel.\n"
+                         "With `virtual`, the Python source files and the "
+                         "files installed by `cmake.incremental_install` "
+                         "are not staged at all: the Wheel is created from "
+                         "a manifest of archive paths, and the files are "
+                         "read from their original locations. This method "
+                         "cannot be combined with `stubgen` (`auto` is used "
+                         "instead).\n"
+                         "If unset, `auto` is used.",
+                         "staging_method = 'copy'",
+                         options=["auto", "reflink", "hardlink", "copy",
+                                  "virtual"]),
     ])  # fmt: skip
     # [tool.py-build-cmake.stubgen]
     stubgen = pbc.insert(
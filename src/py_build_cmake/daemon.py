@@ -0,0 +1,341 @@
+"""
+Optional long-lived helper process that carries out the PEP 517 hooks on
+behalf of the build frontend. Frontends invoke every hook in a fresh Python
+interpreter, which has to import all dependencies, build the parsers and load
+the configuration again. When enabled (using the `daemon` config setting or
+the PY_BUILD_CMAKE_DAEMON environment variable), the first hook starts a
+daemon in the background and is then carried out in-process as usual.
+Subsequent hooks are forwarded to the daemon over a Unix domain socket. The
+standard output and error file descriptors of the hook process are passed to
+the daemon, together with the environment and working directory, so the
+output of CMake and other subprocesses ends up in the same place as without
+the daemon. A single backend is used for all hooks, and the resolved
+configuration and the results of probing programs are kept in memory. The
+daemon exits after it has been idle for a while (PY_BUILD_CMAKE_DAEMON_TIMEOUT,
+in seconds). If the daemon cannot be reached, the hook is carried out
+in-process. If the connection is lost after the hook was forwarded, the hook
+fails, since the daemon might still be carrying it out.
+"""
+
+from __future__ import annotations
+
+import array
+import contextlib
+import hashlib
+import importlib
+import logging
+import os
+import pickle
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Callable
+
+from . import __version__
+
+logger = logging.getLogger(__name__)
+
+default_idle_timeout = 300.0
+
+hooks = (
+    "get_requires_for_build_wheel",
+    "get_requires_for_build_editable",
+    "get_requires_for_build_sdist",
+    "prepare_metadata_for_build_wheel",
+    "prepare_metadata_for_build_editable",
+    "build_wheel",
+    "build_editable",
+    "build_sdist",
+)
+
+# Modules that are imported lazily by the hooks, but that should be imported
+# only once by the daemon
+preload_modules = (
+    "py_build_cmake.commands.cmake",
+    "py_build_cmake.commands.try_run",
+    "py_build_cmake.config.dynamic",
+    "py_build_cmake.config.load",
+    "py_build_cmake.export.editable",
+    "py_build_cmake.export.metadata",
+    "py_build_cmake.export.sdist",
+    "py_build_cmake.export.tags",
+    "py_build_cmake.export.wheel",
+)
+
+_header = struct.Struct("!Q")
+
+
+class DaemonUnavailable(Exception):
+    """The daemon could not be reached, the hook should be carried out
+    in-process."""
+
+
+class DaemonConnectionLost(RuntimeError):
+    """The connection to the daemon was lost after the hook was forwarded."""
+
+
+def is_supported() -> bool:
+    return sys.platform != "win32" and hasattr(socket, "AF_UNIX")
+
+
+def get_idle_timeout() -> float:
+    timeout = os.environ.get("PY_BUILD_CMAKE_DAEMON_TIMEOUT")
+    try:
+        return float(timeout) if timeout else default_idle_timeout
+    except ValueError:
+        logger.warning("Invalid value for PY_BUILD_CMAKE_DAEMON_TIMEOUT: %s", timeout)
+        return default_idle_timeout
+
+
+def get_socket_dir() -> Path:
+    return Path(tempfile.gettempdir()) / f"py-build-cmake-{os.getuid()}"
+
+
+def get_socket_path(src_dir: Path) -> Path:
+    """Each combination of source directory and Python environment gets its
+    own daemon. The path is kept short because of the length limit of Unix
+    socket addresses."""
+    key = repr((__version__, sys.executable, sys.path, str(src_dir)))
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+    return get_socket_dir() / f"{digest}.sock"
+
+
+def _is_private_dir(path: Path) -> bool:
+    """Only the current user should be able to connect to the daemon."""
+    st = path.stat()
+    return st.st_uid == os.getuid() and (st.st_mode & 0o077) == 0
+
+
+def _send(sock: socket.socket, obj: Any, fds: list[int] | None = None):
+    data = pickle.dumps(obj)
+    msg = _header.pack(len(data)) + data
+    if fds:
+        anc = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+        sent = sock.sendmsg([msg], anc)
+        if sent < len(msg):
+            sock.sendall(msg[sent:])
+    else:
+        sock.sendall(msg)
+
+
+def _recv(sock: socket.socket) -> tuple[Any, list[int]]:
+    fds = array.array("i")
+    ancbufsize = socket.CMSG_SPACE(2 * fds.itemsize)
+    data, ancdata, _, _ = sock.recvmsg(1 << 16, ancbufsize)
+    for level, kind, cmsg_data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            end = len(cmsg_data) - len(cmsg_data) % fds.itemsize
+            fds.frombytes(cmsg_data[:end])
+    if len(data) < _header.size:
+        msg = "Connection closed unexpectedly"
+        raise EOFError(msg)
+    (size,) = _header.unpack(data[: _header.size])
+    buf = bytearray(data[_header.size :])
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            msg = "Connection closed unexpectedly"
+            raise EOFError(msg)
+        buf += chunk
+    return pickle.loads(buf), list(fds)
+
+
+# --- Client ------------------------------------------------------------------
+
+
+def call_hook(name: str, args: tuple, kwargs: dict, fallback: Callable) -> Any:
+    """Forward the given hook to the daemon, or carry it out in-process (using
+    the fallback function) if the daemon is not running yet."""
+    if not is_supported():
+        return fallback(*args, **kwargs)
+    socket_path = get_socket_path(Path().resolve())
+    try:
+        status, value = _forward(socket_path, name, args, kwargs)
+    except DaemonUnavailable as e:
+        logger.debug("py-build-cmake daemon unavailable: %s", e)
+        start_daemon(socket_path)
+        return fallback(*args, **kwargs)
+    if status == "error":
+        raise value
+    return value
+
+
+def _forward(socket_path: Path, name: str, args: tuple, kwargs: dict):
+    request = {
+        "hook": name,
+        "args": args,
+        "kwargs": kwargs,
+        "cwd": str(Path.cwd()),
+        "env": dict(os.environ),
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            if not _is_private_dir(socket_path.parent):
+                msg = f"Insecure permissions for {socket_path.parent}"
+                raise DaemonUnavailable(msg)
+            sock.connect(str(socket_path))
+        except ConnectionRefusedError as e:  # Stale socket
+            with contextlib.suppress(OSError):
+                socket_path.unlink()
+            raise DaemonUnavailable(str(e)) from e
+        except OSError as e:
+            raise DaemonUnavailable(str(e)) from e
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            _send(sock, request, fds=[1, 2])
+        except OSError as e:
+            raise DaemonUnavailable(str(e)) from e
+        # The daemon may be carrying out the hook, so running it in-process as
+        # well is not safe (e.g. two builds writing to the same directory)
+        try:
+            reply, _ = _recv(sock)
+        except (OSError, EOFError) as e:
+            msg = f"Lost connection to py-build-cmake daemon during {name}: {e}"
+            raise DaemonConnectionLost(msg) from e
+    return reply
+
+
+def start_daemon(socket_path: Path):
+    """Start the daemon in the background. Failure is not an error."""
+    try:
+        socket_path.parent.mkdir(mode=0o700, exist_ok=True)
+        if not _is_private_dir(socket_path.parent):
+            logger.warning("Insecure permissions for %s", socket_path.parent)
+            return
+        cmd = [sys.executable, "-m", "py_build_cmake.daemon"]
+        cmd += [str(socket_path), str(get_idle_timeout())]
+        subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=str(socket_path.parent),
+            start_new_session=True,
+        )
+    except OSError as e:
+        logger.debug("Failed to start py-build-cmake daemon: %s", e)
+
+
+def stop_daemon(socket_path: Path) -> bool:
+    """Ask the daemon to exit. Returns False if it was not running."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+            _send(sock, {"hook": "shutdown"})
+            _recv(sock)
+        except (OSError, EOFError):
+            return False
+    return True
+
+
+# --- Server ------------------------------------------------------------------
+
+
+def serve(socket_path: Path, idle_timeout: float):
+    from .build import _BuildBackend
+    from .commands import probe_cache
+    from .config import cache as config_cache
+
+    for module in preload_modules:
+        importlib.import_module(module)
+    config_cache.enable_memory_cache()
+    probe_cache.enable_memory_cache()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(str(socket_path))
+    except OSError:  # Another daemon is already running
+        server.close()
+        return
+    inode = socket_path.stat().st_ino
+    server.listen()
+    server.settimeout(idle_timeout)
+    try:
+        backend = _BuildBackend()
+        while _accept(server, backend):
+            pass
+    finally:
+        server.close()
+        with contextlib.suppress(OSError):
+            if socket_path.stat().st_ino == inode:
+                socket_path.unlink()
+
+
+def _accept(server: socket.socket, backend: Any) -> bool:
+    """Handle the next request. Returns False if the daemon should exit."""
+    try:
+        conn = server.accept()[0]
+    except socket.timeout:
+        return False
+    with conn:
+        conn.settimeout(None)
+        return _handle(conn, backend)
+
+
+def _handle(conn: socket.socket, backend: Any) -> bool:
+    try:
+        request, fds = _recv(conn)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return True
+    try:
+        name = request["hook"]
+        if name == "shutdown":
+            _send(conn, ("result", None))
+            return False
+        if name not in hooks or len(fds) != 2:
+            _send(conn, ("error", RuntimeError(f"Invalid request {name!r}")))
+            return True
+        reply = _run_hook(backend, request, fds)
+        try:
+            _send(conn, reply)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            _send(conn, ("error", RuntimeError(str(reply[1]))))
+    finally:
+        for fd in fds:
+            os.close(fd)
+    return True
+
+
+def _run_hook(backend: Any, request: dict, fds: list[int]):
+    """Run the hook with the environment, working directory, and standard
+    output and error streams of the client."""
+    from .build import get_hook_config_settings
+
+    old_env, old_cwd = dict(os.environ), Path.cwd()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = [os.dup(1), os.dup(2)]
+    try:
+        os.dup2(fds[0], 1)
+        os.dup2(fds[1], 2)
+        os.environ.clear()
+        os.environ.update(request["env"])
+        os.chdir(request["cwd"])
+        # Let the backend configure logging for every request
+        for handler in logging.root.handlers[:]:
+            logging.root.removeHandler(handler)
+        hook, args, kwargs = request["hook"], request["args"], request["kwargs"]
+        config_settings = get_hook_config_settings(hook, args, kwargs)
+        if backend.is_verbose_enabled(config_settings):
+            print(f"Running {hook} in py-build-cmake daemon")
+        return ("result", getattr(backend, hook)(*args, **kwargs))
+    except Exception as e:
+        return ("error", e)
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved_fds[0], 1)
+        os.dup2(saved_fds[1], 2)
+        for fd in saved_fds:
+            os.close(fd)
+        os.chdir(old_cwd)
+        os.environ.clear()
+        os.environ.update(old_env)
+
+
+if __name__ == "__main__":
+    serve(Path(sys.argv[1]), float(sys.argv[2]))
@@ -0,0 +1,200 @@
+"""
+Caching of previously built Wheel packages and source distributions. If none
+of the inputs of a build changed since the last build, the previous Wheel or
+sdist can be reused as-is, without installing and compressing all files again.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import shutil
+import stat
+from pathlib import Path
+from typing import Any, Iterable
+
+from .. import __version__
+from ..common import Config, Module
+from ..common.util import CacheKey, write_file_if_changed
+from .staging import reflink_or_copy
+
+logger = logging.getLogger(__name__)
+
+
+def _is_build_output(name: str) -> bool:
+    """Files in the CMake build directory that are rewritten by every build,
+    even if nothing changed, and that do not end up in the Wheel. Also excludes
+    folders created by py-build-cmake, such as the incremental install prefix
+    (its contents are copies of build outputs)."""
+    return not (
+        name.startswith(("install_manifest", "py-build-cmake-"))
+        or name in (".ninja_log", ".ninja_deps")
+    )
+
+
+def iter_build_outputs(build_dir: Path) -> Iterable[Path]:
+    """Iterate over the files in the CMake build directory, excluding CMake's
+    internal files (object files, dependency information, etc.) and files
+    written by py-build-cmake itself."""
+    for dirpath, dirs, files in os.walk(build_dir):
+        dirs[:] = sorted(d for d in dirs if d != "CMakeFiles" and _is_build_output(d))
+        for f in sorted(files):
+            if _is_build_output(f):
+                yield Path(dirpath) / f
+
+
+_install_files_re = re.compile(r"^\s*file\(INSTALL DESTINATION .*? FILES (.*)$", re.M)
+_quoted_re = re.compile(r'\s*"([^"]*)"')
+
+
+def _parse_install_files(line: str) -> Iterable[str]:
+    """Quoted arguments at the start of the given line, i.e. the list of files
+    following the FILES keyword, up to the next (unquoted) keyword."""
+    pos = 0
+    while True:
+        m = _quoted_re.match(line, pos)
+        if m is None:
+            return
+        yield m.group(1)
+        pos = m.end()
+
+
+def iter_installed_sources(build_dir: Path) -> Iterable[Path]:
+    """Iterate over the files outside of the CMake build directory that are
+    installed directly by CMake (e.g. headers, data files or scripts in the
+    source directory), as listed in the cmake_install.cmake scripts. These are
+    not build outputs, so they have to be tracked separately. Files that are
+    installed by custom install scripts or code are not included."""
+    build_paths = {build_dir.absolute(), build_dir.resolve()}
+    for dirpath, dirs, files in os.walk(build_dir):
+        dirs[:] = sorted(d for d in dirs if d != "CMakeFiles" and _is_build_output(d))
+        if "cmake_install.cmake" not in files:
+            continue
+        script = Path(dirpath) / "cmake_install.cmake"
+        try:
+            contents = script.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        for m in _install_files_re.finditer(contents):
+            for f in _parse_install_files(m.group(1)):
+                path = Path(f)
+                if "${" in f or not path.is_absolute():
+                    continue
+                if not build_paths.isdisjoint((path, *path.parents)):
+                    continue
+                if path.is_dir():
+                    for subdir, subdirs, subfiles in os.walk(path):
+                        subdirs.sort()
+                        yield from (Path(subdir) / sf for sf in sorted(subfiles))
+                else:
+                    yield path
+
+
+def get_wheel_cache_key(
+    cfg: Config,
+    module: Module,
+    build_dirs: Iterable[Path],
+    tags: dict[str, list[str]],
+) -> str:
+    """Compute the key for the Wheel cache, based on the resolved
+    configuration, the files of the Python package, the outputs of the CMake
+    builds, the source files installed by CMake and the Wheel tags."""
+    key = CacheKey()
+    key.update(__version__, os.environ.get("SOURCE_DATE_EPOCH", ""))
+    key.update(repr(cfg), repr(sorted(tags.items())))
+    for f in cfg.referenced_files:
+        key.update_file_contents(Path(f))
+    for f in module.iter_files_abs():
+        key.update_file_stat(f, f.relative_to(module.prefix))
+    for build_dir in build_dirs:
+        key.update(build_dir)
+        for f in iter_build_outputs(build_dir):
+            key.update_file_stat(f, f.relative_to(build_dir))
+        for f in iter_installed_sources(build_dir):
+            key.update_file_stat(f, f)
+    return key.hexdigest()
+
+
+def get_sdist_cache_key(
+    cfgdir: Path, files: Iterable[Path], pkg_info: bytes, *settings: Any
+) -> str:
+    """Compute the key for the sdist cache, based on the sorted list of files
+    to include (relative to cfgdir), their sizes, modification times,
+    permissions and contents, the contents of the PKG-INFO file, and any other
+    settings that affect the archive."""
+    key = CacheKey()
+    key.update(__version__, os.environ.get("SOURCE_DATE_EPOCH", ""), *settings)
+    for f in files:
+        path = cfgdir / f
+        try:
+            st = path.lstat()
+        except OSError:
+            key.update(f.as_posix(), "<missing>")
+            continue
+        key.update(f.as_posix(), st.st_size, st.st_mtime_ns, st.st_mode)
+        if stat.S_ISLNK(st.st_mode):
+            key.update(os.readlink(path))
+        elif stat.S_ISREG(st.st_mode):
+            key.update_file_contents(path)
+    key.update("PKG-INFO", pkg_info.hex())
+    return key.hexdigest()
+
+
+def _lookup_cached_file(cache_dir: Path, key: str, dist_dir: Path) -> Path | None:
+    try:
+        entry = (cache_dir / "key").read_text(encoding="utf-8").split("\n")
+    except OSError:
+        return None
+    if len(entry) != 2 or entry[0] != key:
+        return None
+    cached_file = cache_dir / entry[1]
+    if not cached_file.is_file():
+        return None
+    # Never link, so the cache is not affected if the frontend modifies the
+    # returned file in place (e.g. to repair or sign a Wheel)
+    reflink_or_copy(cached_file, dist_dir / cached_file.name)
+    return cached_file
+
+
+def _store_cached_file(cache_dir: Path, key: str, dist_path: Path):
+    if cache_dir.exists():
+        shutil.rmtree(cache_dir)
+    cache_dir.mkdir(parents=True)
+    # Copy rather than link, so the cache is not affected if the frontend
+    # modifies the file in place
+    shutil.copy2(dist_path, cache_dir / dist_path.name)
+    entry = f"{key}\n{dist_path.name}"
+    write_file_if_changed(cache_dir / "key", entry.encode("utf-8"))
+
+
+def lookup_cached_wheel(cache_dir: Path, key: str, wheel_dir: Path) -> str | None:
+    """If the cache contains a Wheel for the given key, copy it to the given
+    directory, and return its file name."""
+    cached_wheel = _lookup_cached_file(cache_dir, key, wheel_dir)
+    if cached_wheel is None:
+        return None
+    logger.info("Inputs unchanged, reusing cached Wheel %s", cached_wheel)
+    return cached_wheel.name
+
+
+def store_cached_wheel(cache_dir: Path, key: str, wheel_path: Path):
+    """Store the given Wheel in the cache, replacing any previous entry."""
+    _store_cached_file(cache_dir, key, wheel_path)
+    logger.debug("Stored Wheel %s in cache %s", wheel_path.name, cache_dir)
+
+
+def lookup_cached_sdist(cache_dir: Path, key: str, sdist_dir: Path) -> str | None:
+    """If the cache contains an sdist for the given key, copy it to the given
+    directory, and return its file name."""
+    cached_sdist = _lookup_cached_file(cache_dir, key, sdist_dir)
+    if cached_sdist is None:
+        return None
+    logger.info("Files unchanged, reusing cached sdist %s", cached_sdist)
+    return cached_sdist.name
+
+
+def store_cached_sdist(cache_dir: Path, key: str, sdist_path: Path):
+    """Store the given sdist in the cache, replacing any previous entry."""
+    _store_cached_file(cache_dir, key, sdist_path)
+    logger.debug("Stored sdist %s in cache %s", sdist_path.name, cache_dir)
@@ -0,0 +1,142 @@
+"""
+Incremental updates of Wheels. The previous Wheel is kept in the build cache
+directory, together with a manifest that records the SHA256 hash of each
+entry, and the size, modification time and mode of the file it was created
+from. Entries of files that did not change are copied from the previous Wheel
+as-is, without recompressing them. Only the files that changed are compressed
+again.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Any
+
+from .. import __version__
+from ..common.util import write_file_if_changed
+from .parallel_zip import AnyEntry, CompressedEntry, RawEntry, ZipEntry
+from .util import link_or_copy
+
+logger = logging.getLogger(__name__)
+
+manifest_version = 1
+
+
+class IncrementalWheel:
+    """The previous Wheel in the given directory, and its manifest."""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.wheel: Path | None = None
+        self.zinfos: dict[str, zipfile.ZipInfo] = {}
+        self.entries: dict[str, Any] = {}
+        self.signatures: dict[str, list[Any]] = {}
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.cache_dir / "manifest.json"
+
+    def get_header(self) -> dict[str, Any]:
+        """If any of these values changed, the previous Wheel is not used."""
+        return {
+            "version": manifest_version,
+            "py-build-cmake": __version__,
+            "zlib": zlib.ZLIB_RUNTIME_VERSION,
+        }
+
+    def load(self):
+        """Load the manifest and the list of entries of the previous Wheel."""
+        try:
+            manifest = json.loads(self.manifest_path.read_bytes())
+            if manifest["header"] != self.get_header():
+                return
+            wheel = self.cache_dir / manifest["wheel"]
+            # Make sure that the Wheel was not modified
+            stat = wheel.stat()
+            if [stat.st_size, stat.st_mtime_ns] != manifest["wheel_stat"]:
+                logger.info("Previous Wheel %s was modified, ignoring it", wheel)
+                return
+            with zipfile.ZipFile(wheel) as zf:
+                self.zinfos = {zinfo.filename: zinfo for zinfo in zf.infolist()}
+        except (OSError, ValueError, KeyError, TypeError, zipfile.BadZipFile) as e:
+            logger.debug("Previous Wheel in %s not used: %s", self.cache_dir, e)
+            return
+        self.wheel = wheel
+        self.entries = manifest["entries"]
+
+    @staticmethod
+    def get_signature(entry: ZipEntry) -> list[Any]:
+        """Properties of the file and the compression settings of the given
+        entry that should be the same for the entry to be reused."""
+        stat = entry.path.stat()
+        return [
+            stat.st_size,
+            stat.st_mtime_ns,
+            stat.st_mode,
+            entry.compress_type,
+            entry.compresslevel,
+            list(entry.date_time) if entry.date_time is not None else None,
+        ]
+
+    def update_entries(self, entries: list[ZipEntry]) -> list[AnyEntry]:
+        """Replace the entries of files that did not change since the previous
+        Wheel by raw copies of the entries in that Wheel."""
+        result: list[AnyEntry] = []
+        for entry in entries:
+            signature = self.get_signature(entry)
+            self.signatures[entry.arcname] = signature
+            old = self.entries.get(entry.arcname)
+            zinfo = self.zinfos.get(entry.arcname)
+            if (
+                self.wheel is None
+                or old is None
+                or zinfo is None
+                or old["signature"] != signature
+                or zinfo.compress_type != entry.compress_type
+            ):
+                result.append(entry)
+                continue
+            # If the modification time has a resolution of one second (e.g.
+            # for files installed by CMake), a file could have changed without
+            # updating it, so its contents are verified as well
+            verify = signature[1] % 1_000_000_000 == 0
+            sha256 = bytes.fromhex(old["sha256"])
+            result.append(RawEntry(entry, self.wheel, zinfo, sha256, verify))
+        reused = [e for e in result if isinstance(e, RawEntry)]
+        verified = sum(e.verify for e in reused)
+        msg = "Reusing %d of %d files from the previous Wheel (verifying %d)"
+        logger.info(msg, len(reused), len(result), verified)
+        return result
+
+    def store(self, wheel_path: Path, written: list[CompressedEntry]):
+        """Keep a hard link to (or a copy of) the given Wheel, and write the
+        manifest for its entries."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            self.manifest_path.unlink()
+        for old_wheel in self.cache_dir.glob("*.whl"):
+            old_wheel.unlink()
+        wheel = self.cache_dir / wheel_path.name
+        link_or_copy(wheel_path, wheel)
+        stat = wheel.stat()
+        entries = {
+            w.zinfo.filename: {
+                "signature": self.signatures[w.zinfo.filename],
+                "sha256": w.sha256.hex(),
+            }
+            for w in written
+            if w.zinfo.filename in self.signatures
+        }
+        manifest = {
+            "header": self.get_header(),
+            "wheel": wheel.name,
+            "wheel_stat": [stat.st_size, stat.st_mtime_ns],
+            "entries": entries,
+        }
+        write_file_if_changed(self.manifest_path, json.dumps(manifest).encode())
+        logger.debug("Stored Wheel %s for incremental updates", wheel)
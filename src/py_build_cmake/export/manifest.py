@@ -0,0 +1,60 @@
+"""
+Manifest of the files to include in a Wheel. Rather than copying all files to
+a staging directory first, the Wheel can be created from a list of archive
+paths and the files they are read from (virtual staging).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import Iterable
+
+from ..common import Module
+
+logger = logging.getLogger(__name__)
+
+
+class WheelManifest:
+    """Maps the archive paths of the files in a Wheel to the absolute paths of
+    the files to read them from. Files that are added later replace earlier
+    files with the same archive path (like files that are installed into the
+    same staging directory). The dist-info folder is not included."""
+
+    def __init__(self) -> None:
+        self.files: dict[str, Path] = {}
+
+    def add(self, arcname: str, path: Path):
+        self.files.pop(arcname, None)  # Keep the order of insertion
+        self.files[arcname] = path
+
+    def add_module(self, module: Module):
+        """Add the Python source files of the given module."""
+        for src in module.iter_files_abs():
+            self.add(src.relative_to(module.prefix).as_posix(), src)
+
+    def add_installed(self, prefix: Path, files: Iterable[Path]):
+        """Add the given files, which were installed into the given prefix."""
+        for src in files:
+            try:
+                rel_path = src.relative_to(prefix)
+            except ValueError:
+                logger.warning("Installed file %s is not in prefix %s", src, prefix)
+                continue
+            self.add(rel_path.as_posix(), src)
+
+    def add_tree(self, root: Path):
+        """Add all files in the given directory, except for the .dist-info
+        folder at the top level."""
+        for dirpath, dirs, files in os.walk(root):
+            if Path(dirpath) == root:
+                dirs[:] = [d for d in dirs if not d.endswith(".dist-info")]
+            for f in sorted(files):
+                path = Path(dirpath) / f
+                self.add(path.relative_to(root).as_posix(), path)
+            dirs.sort()
+
+    def log(self):
+        for arcname, path in self.files.items():
+            logger.debug("Wheel manifest: %s <- %s", arcname, path)
@@ -0,0 +1,136 @@
+"""
+Writing gzip files (sdists) using multiple threads, similar to pigz. The data
+is split into blocks of a fixed size, which are compressed concurrently as
+separate raw deflate streams. Every block except the last one ends with a sync
+flush (an empty stored block that ends on a byte boundary), so the compressed
+blocks can simply be concatenated into a single valid deflate stream. To
+avoid losing compression at the block boundaries, the last 32 KiB of the
+previous block is used as a preset dictionary for the next one.
+
+The compressed data only depends on the data itself, the compression level and
+the block size, not on the number of threads or their scheduling, so the
+output is reproducible (given a fixed modification time in the header).
+"""
+
+from __future__ import annotations
+
+import io
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from .parallel_zip import get_default_workers
+
+# Uncompressed size of the blocks that are compressed independently
+block_size = 1 << 20
+# Size of the deflate window, i.e. the maximum useful dictionary size
+_window_size = 1 << 15
+
+
+def compress_block(data: bytes, zdict: bytes, level: int, last: bool) -> bytes:
+    """Compress one block as a raw deflate stream, using the end of the
+    previous block as a dictionary."""
+    args = (level, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL)
+    if zdict:
+        compressor = zlib.compressobj(*args, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(*args)
+    flush_mode = zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH
+    return compressor.compress(data) + compressor.flush(flush_mode)
+
+
+def gzip_header(filename: str | Path, level: int, mtime: float | None) -> bytes:
+    """The gzip header, as written by gzip.GzipFile."""
+    fname = Path(filename).name
+    if fname.endswith(".gz"):
+        fname = fname[:-3]
+    try:
+        fname_bytes = fname.encode("latin-1")
+    except UnicodeEncodeError:
+        fname_bytes = b""
+    flags = b"\010" if fname_bytes else b"\000"
+    if mtime is None:
+        mtime = time.time()
+    xfl = b"\002" if level == 9 else b"\004" if level == 1 else b"\000"
+    header = b"\037\213\010" + flags + struct.pack("<L", int(mtime)) + xfl + b"\377"
+    return header + (fname_bytes + b"\000" if fname_bytes else b"")
+
+
+class ParallelGzipFile(io.BufferedIOBase):
+    """Write-only file object that compresses the data written to it in
+    parallel, and writes it to the given gzip file. Up to max_workers blocks
+    are compressed concurrently."""
+
+    def __init__(
+        self,
+        filename: str | Path,
+        compresslevel: int = 9,
+        mtime: float | None = None,
+        max_workers: int | None = None,
+    ):
+        self.compresslevel = compresslevel
+        self.max_workers = max_workers or get_default_workers()
+        self.fileobj = Path(filename).open("wb")  # noqa: SIM115
+        self.pool = ThreadPoolExecutor(self.max_workers)
+        self.pending: deque[Future[bytes]] = deque()
+        self.buffer = bytearray()
+        self.zdict = b""
+        self.crc = 0
+        self.size = 0
+        try:
+            self.fileobj.write(gzip_header(filename, compresslevel, mtime))
+        except BaseException:
+            self.fileobj.close()
+            self.pool.shutdown()
+            raise
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        """Number of uncompressed bytes written so far."""
+        return self.size
+
+    def write(self, data) -> int:
+        if self.closed:
+            msg = "write to closed file"
+            raise ValueError(msg)
+        data = memoryview(data).cast("B")
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self.buffer += data
+        if len(self.buffer) >= block_size:
+            buffer = bytes(self.buffer)
+            end = len(buffer) - len(buffer) % block_size
+            for start in range(0, end, block_size):
+                self._submit(buffer[start : start + block_size], last=False)
+            self.buffer = bytearray(buffer[end:])
+        return len(data)
+
+    def _submit(self, block: bytes, last: bool):
+        # Only compress a limited number of blocks ahead of the writer
+        if len(self.pending) >= 2 * self.max_workers:
+            self.fileobj.write(self.pending.popleft().result())
+        args = (block, self.zdict, self.compresslevel, last)
+        self.pending.append(self.pool.submit(compress_block, *args))
+        self.zdict = block[-_window_size:]
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._submit(bytes(self.buffer), last=True)
+            while self.pending:
+                self.fileobj.write(self.pending.popleft().result())
+            trailer = struct.pack("<LL", self.crc, self.size & 0xFFFFFFFF)
+            self.fileobj.write(trailer)
+        finally:
+            for future in self.pending:
+                future.cancel()
+            self.pool.shutdown()
+            self.fileobj.close()
+            self.buffer = bytearray()
+            super().close()
@@ -0,0 +1,277 @@
+"""
+Writing ZIP archives (Wheels) using multiple threads. The files are read in
+chunks and compressed concurrently, and the compressed data is then written to
+the archive sequentially, in the given order. The result therefore does not
+depend on the number of threads or their scheduling: it is byte-for-byte
+identical to the archive created by calling zipfile.ZipFile.write for each of
+the entries. The SHA256 hash of each file (for the RECORD file of a Wheel) is
+computed in the same pass, so every file is read only once.
+
+To bound the memory usage, only a limited number of entries are compressed
+ahead of the writer, and compressed data that does not fit in memory is
+spilled to a temporary file.
+
+Entries can also be copied from an existing archive without recompressing
+them, if the files they were created from did not change.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterable, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DateTime = Tuple[int, int, int, int, int, int]
+
+# Size of the fixed part of a local file header (zipfile.sizeFileHeader)
+_header_size = 30
+
+# Files are read and compressed in chunks of this size
+chunk_size = 1 << 20
+# Maximum amount of compressed data kept in memory (divided over all entries
+# that are being compressed ahead of the writer), the rest is spilled to
+# temporary files
+memory_limit = 256 << 20
+
+
+@dataclass
+class ZipEntry:
+    arcname: str
+    path: Path
+    date_time: DateTime | None = None  # Modification time of the file if None
+    compress_type: int = zipfile.ZIP_DEFLATED
+    compresslevel: int | None = None
+
+
+@dataclass
+class CompressedEntry:
+    zinfo: zipfile.ZipInfo
+    data: IO[bytes]
+    zip64: bool
+    sha256: bytes
+
+
+@dataclass
+class RawEntry:
+    """Entry that is copied from an existing ZIP archive, without recompressing
+    it. The file it was created from (entry.path) should be unchanged, and the
+    compression settings should be the same. If verify is true, the file is
+    hashed first, and it is compressed again if its hash is different."""
+
+    entry: ZipEntry
+    archive: Path
+    zinfo: zipfile.ZipInfo  # The entry in the existing archive
+    sha256: bytes
+    verify: bool = False
+
+
+AnyEntry = Union[ZipEntry, RawEntry]
+
+
+def get_default_workers() -> int:
+    return min(32, os.cpu_count() or 1)
+
+
+def _get_compressor(compress_type: int, compresslevel: int | None):
+    """Same compressors as zipfile._get_compressor."""
+    if compress_type == zipfile.ZIP_STORED:
+        return None
+    if compress_type == zipfile.ZIP_DEFLATED:
+        if compresslevel is None:
+            compresslevel = zlib.Z_DEFAULT_COMPRESSION
+        return zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    msg = f"Unsupported compression method {compress_type}"
+    raise NotImplementedError(msg)
+
+
+def _get_zinfo(entry: ZipEntry) -> tuple[zipfile.ZipInfo, bool]:
+    zinfo = zipfile.ZipInfo.from_file(entry.path, entry.arcname)
+    if entry.date_time is not None:
+        zinfo.date_time = entry.date_time
+    zinfo.compress_type = entry.compress_type
+    # Same criterion as zipfile.ZipFile._open_to_write
+    zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+    return zinfo, zip64
+
+
+def compress_entry(entry: AnyEntry, spool_size: int) -> CompressedEntry:
+    """Read and compress the given file, computing its CRC, SHA256 hash and
+    sizes."""
+    if isinstance(entry, RawEntry):
+        if entry.verify and _file_sha256(entry.entry.path) != entry.sha256:
+            logger.debug("Contents of %s changed", entry.entry.path)
+            return compress_entry(entry.entry, spool_size)
+        return open_raw_entry(entry)
+    zinfo, zip64 = _get_zinfo(entry)
+    compressor = _get_compressor(entry.compress_type, entry.compresslevel)
+    crc, file_size, sha256 = 0, 0, hashlib.sha256()
+    data = tempfile.SpooledTemporaryFile(max_size=spool_size)  # noqa: SIM115
+    try:
+        with entry.path.open("rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                crc = zlib.crc32(chunk, crc)
+                sha256.update(chunk)
+                data.write(compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            data.write(compressor.flush())
+        zinfo.CRC = crc
+        zinfo.file_size = file_size
+        zinfo.compress_size = data.tell()
+        data.seek(0)
+    except BaseException:
+        data.close()
+        raise
+    zip64 = zip64 or max(file_size, zinfo.compress_size) > zipfile.ZIP64_LIMIT
+    return CompressedEntry(zinfo, data, zip64, sha256.digest())
+
+
+def _file_sha256(path: Path) -> bytes:
+    sha256 = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.digest()
+
+
+def open_entry_data(archive: Path, zinfo: zipfile.ZipInfo) -> IO[bytes]:
+    """Open the given archive at the start of the compressed data of the given
+    entry."""
+    f = archive.open("rb")
+    try:
+        # The local file header can have a different extra field than the
+        # central directory, so we need to read its size
+        f.seek(zinfo.header_offset)
+        header = f.read(_header_size)
+        if len(header) != _header_size or header[:4] != b"PK\x03\x04":
+            msg = f"Bad local file header for {zinfo.filename} in {archive}"
+            raise zipfile.BadZipFile(msg)
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        f.seek(name_length + extra_length, os.SEEK_CUR)
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+
+def open_raw_entry(raw: RawEntry) -> CompressedEntry:
+    """Prepare the given entry for copying its compressed data from the
+    existing archive."""
+    zinfo, zip64 = _get_zinfo(raw.entry)
+    old = raw.zinfo
+    zinfo.CRC = old.CRC
+    zinfo.file_size = old.file_size
+    zinfo.compress_size = old.compress_size
+    zip64 = zip64 or max(old.file_size, old.compress_size) > zipfile.ZIP64_LIMIT
+    return CompressedEntry(zinfo, open_entry_data(raw.archive, old), zip64, raw.sha256)
+
+
+def _copy_data(src: IO[bytes], dst: IO[bytes], size: int):
+    while size > 0:
+        chunk = src.read(min(size, chunk_size))
+        if not chunk:
+            msg = "Unexpected end of compressed data"
+            raise zipfile.BadZipFile(msg)
+        dst.write(chunk)
+        size -= len(chunk)
+
+
+class RawZipFile(zipfile.ZipFile):
+    """ZipFile that can write entries that have already been compressed."""
+
+    def write_compressed(self, entry: CompressedEntry):
+        """Equivalent to ZipFile.write, but for data that has already been
+        compressed. Since the CRC and the sizes are known in advance, the
+        local file header can be written directly (see
+        zipfile.ZipFile._open_to_write and zipfile._ZipWriteFile.close)."""
+        zinfo, fp = entry.zinfo, self.fp
+        assert fp is not None
+        zinfo.flag_bits = 0x00
+        if not zinfo.external_attr:
+            zinfo.external_attr = 0o600 << 16  # permissions: ?rw-------
+        if self._seekable:  # type: ignore[attr-defined]
+            fp.seek(self.start_dir)
+        zinfo.header_offset = fp.tell()
+        self._writecheck(zinfo)  # type: ignore[attr-defined]
+        self._didModify = True
+        fp.write(zinfo.FileHeader(entry.zip64))
+        _copy_data(entry.data, fp, zinfo.compress_size)
+        self.start_dir = fp.tell()
+        self.filelist.append(zinfo)
+        self.NameToInfo[zinfo.filename] = zinfo
+
+
+class ParallelZipWriter:
+    """Write files to a new ZIP archive, in the given order. Up to max_workers
+    files are compressed concurrently."""
+
+    def __init__(self, pathname: str | Path, max_workers: int | None = None):
+        self.max_workers = max_workers or get_default_workers()
+        self.zipfile = RawZipFile(pathname, "w")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.zipfile.close()
+
+    def write_entries(self, entries: Iterable[AnyEntry]) -> list[CompressedEntry]:
+        """Compress and write the given entries. Returns the information about
+        the written entries (the compressed data itself is discarded)."""
+        # Only compress a limited number of entries ahead of the writer
+        max_pending = 2 * self.max_workers
+        spool_size = max(chunk_size, memory_limit // max_pending)
+        pending: deque[Future[CompressedEntry]] = deque()
+        written: list[CompressedEntry] = []
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            try:
+                for entry in entries:
+                    pending.append(pool.submit(compress_entry, entry, spool_size))
+                    if len(pending) >= max_pending:
+                        written.append(self._write_next(pending))
+                while pending:
+                    written.append(self._write_next(pending))
+            except BaseException:
+                for future in pending:
+                    future.add_done_callback(_discard)
+                    future.cancel()
+                raise
+        return written
+
+    def _write_next(self, pending: deque[Future[CompressedEntry]]):
+        compressed = pending.popleft().result()
+        with compressed.data:
+            self.zipfile.write_compressed(compressed)
+        logger.debug("Wrote %s to zip file", compressed.zinfo.filename)
+        return compressed
+
+
+def _discard(future: Future[CompressedEntry]):
+    """Clean up the temporary data of entries that will not be written."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().data.close()
+
+
+def write_zip(
+    pathname: str | Path, entries: Iterable[AnyEntry], max_workers: int | None = None
+) -> list[CompressedEntry]:
+    """Write the given files to a new ZIP archive, in the given order."""
+    with ParallelZipWriter(pathname, max_workers) as writer:
+        return writer.write_entries(entries)
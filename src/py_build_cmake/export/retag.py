@@ -0,0 +1,143 @@
+"""
+Changing the tags of an existing Wheel without rebuilding it. Only the WHEEL
+and RECORD files in the dist-info folder are rewritten, the compressed data
+of all other entries is copied as-is.
+"""
+
+from __future__ import annotations
+
+import base64
+import csv
+import hashlib
+import io
+import logging
+import re
+import zipfile
+from itertools import product
+from pathlib import Path
+from typing import Any
+
+from distlib.wheel import Wheel  # type: ignore[import-untyped]
+
+from .native_tags import WheelTags
+from .parallel_zip import CompressedEntry, RawZipFile, open_entry_data
+from .tags import convert_wheel_tags
+
+logger = logging.getLogger(__name__)
+
+
+def parse_wheel_metadata(wheel_metadata: str) -> tuple[list[str], WheelTags]:
+    """Split the contents of a WHEEL file into the lines other than the tags,
+    and the Python, ABI and platform tags."""
+    lines, tags = [], []
+    for line in wheel_metadata.splitlines():
+        key, _, value = line.partition(":")
+        if key.strip() == "Tag":
+            tags.append(value.strip().split("-"))
+        elif line.strip():
+            lines.append(line)
+    keys = ("pyver", "abi", "arch")
+    return lines, {
+        k: list(dict.fromkeys(t[i] for t in tags)) for i, k in enumerate(keys)
+    }
+
+
+def format_wheel_metadata(lines: list[str], tags: WheelTags, build_tag: str | None):
+    """Replace the tags and the build tag in the given lines of a WHEEL file."""
+    lines = [line for line in lines if line.partition(":")[0].strip() != "Build"]
+    if build_tag:
+        lines.append(f"Build: {build_tag}")
+    for pyver, abi, arch in product(tags["pyver"], tags["abi"], tags["arch"]):
+        lines.append(f"Tag: {pyver}-{abi}-{arch}")
+    return "\n".join(lines)
+
+
+def get_retagged_filename(
+    wheel_path: Path, tags: WheelTags, build_tag: str | None
+) -> str:
+    """File name of the given Wheel with the given tags."""
+    parts = wheel_path.name[: -len(".whl")].split("-")
+    if wheel_path.suffix != ".whl" or len(parts) not in (5, 6):
+        msg = f"Invalid Wheel file name: {wheel_path.name}"
+        raise ValueError(msg)
+    whl = Wheel()
+    whl.name, whl.version = parts[0], parts[1]
+    whl.buildver = build_tag
+    whl.pyver, whl.abi, whl.arch = tags["pyver"], tags["abi"], tags["arch"]
+    return whl.filename
+
+
+def find_distinfo(zf: zipfile.ZipFile) -> str:
+    """Name of the top-level .dist-info folder of the given Wheel."""
+    for name in zf.namelist():
+        parts = name.split("/")
+        if len(parts) == 2 and parts[0].endswith(".dist-info") and parts[1] == "WHEEL":
+            return parts[0]
+    msg = "No .dist-info/WHEEL file found in Wheel"
+    raise ValueError(msg)
+
+
+def update_record(record: str, path: str, data: bytes) -> str:
+    """Update the hash and size of the given file in the RECORD file."""
+    digest = hashlib.sha256(data).digest()
+    digest_str = base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+    new_row = [path, f"sha256={digest_str}", str(len(data))]
+    rows = csv.reader(io.StringIO(record))
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=",", quotechar='"', lineterminator="\n")
+    writer.writerows(new_row if row and row[0] == path else row for row in rows)
+    return out.getvalue()
+
+
+def retag_wheel(
+    wheel_path: Path,
+    wheel_dir: Path,
+    wheel_cfg: dict[str, Any],
+    build_tag: str | None = None,
+) -> Path:
+    """Write a copy of the given Wheel to wheel_dir, with its tags converted
+    according to the given Wheel configuration (see convert_wheel_tags).
+    The build tag is kept if build_tag is None, and removed if it is empty.
+    Returns the path of the new Wheel."""
+    with zipfile.ZipFile(wheel_path) as zf:
+        distinfo = find_distinfo(zf)
+        wheel_info = zf.getinfo(f"{distinfo}/WHEEL")
+        record_info = zf.getinfo(f"{distinfo}/RECORD")
+        lines, tags = parse_wheel_metadata(zf.read(wheel_info).decode("utf-8"))
+        record = zf.read(record_info).decode("utf-8")
+        zinfos = zf.infolist()
+    if build_tag and not re.match(r"^\d[^-\s]*$", build_tag):
+        msg = f"Invalid build tag: {build_tag!r} (should start with a digit)"
+        raise ValueError(msg)
+    if build_tag is None:
+        old_build = [line for line in lines if line.startswith("Build:")]
+        build_tag = old_build[0].partition(":")[2].strip() if old_build else None
+    new_tags = convert_wheel_tags(tags, wheel_cfg)
+    wheel_metadata = format_wheel_metadata(lines, new_tags, build_tag).encode()
+    record = update_record(record, wheel_info.filename, wheel_metadata)
+    new_files = {
+        wheel_info.filename: wheel_metadata,
+        record_info.filename: record.encode("utf-8"),
+    }
+    new_path = wheel_dir / get_retagged_filename(wheel_path, new_tags, build_tag)
+    if new_path.exists() and new_path.samefile(wheel_path):
+        msg = "The retagged Wheel would overwrite the original Wheel"
+        raise ValueError(msg)
+
+    with RawZipFile(new_path, "w") as out:
+        for old in zinfos:
+            zinfo = zipfile.ZipInfo(old.filename, old.date_time)
+            zinfo.external_attr = old.external_attr
+            zinfo.create_system = old.create_system
+            zinfo.compress_type = old.compress_type
+            if old.filename in new_files:
+                out.writestr(zinfo, new_files[old.filename])
+                continue
+            zinfo.CRC = old.CRC
+            zinfo.file_size = old.file_size
+            zinfo.compress_size = old.compress_size
+            zip64 = max(old.file_size, old.compress_size) > zipfile.ZIP64_LIMIT
+            with open_entry_data(wheel_path, old) as data:
+                out.write_compressed(CompressedEntry(zinfo, data, zip64, b""))
+    logger.info("Retagged %s as %s", wheel_path.name, new_path.name)
+    return new_path
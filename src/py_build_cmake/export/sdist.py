@@ -34,19 +34,36 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 from __future__ import annotations
 
+import contextlib
+import functools
 import io
 import logging
 import os
+import queue
+import re
 import tarfile
+import threading
 from copy import copy
-from gzip import GzipFile
-from pathlib import Path, PurePosixPath
-from typing import Iterable
+from pathlib import Path, PurePath, PurePosixPath
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
 from pyproject_metadata import StandardMetadata
 
 from ..common import ConfigError, Module, PackageInfo
 
+if TYPE_CHECKING:
+    from .vcs import GitFiles
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,6 +71,23 @@ class SdistError(ConfigError):
     """Problem packaging the project's sdist"""
 
 
+# Directories that are skipped when searching for the files to include
+prune_dir_names = frozenset(
+    (".bzr", ".git", ".hg", ".svn", "__pycache__", ".py-build-cmake_cache")
+)
+# Files that mark a directory as a build directory or virtual environment
+prune_dir_markers = ("CMakeCache.txt", "pyvenv.cfg")
+
+# Regular files up to this size are read by a background thread, while the
+# previous files are being written to the archive
+read_ahead_size = 1 << 20
+# Maximum number of files that are read ahead of the writer
+read_ahead_count = 64
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
 def normalize_file_permissions(st_mode):
     """Normalize the permission bits in the st_mode field from stat to 644/755
 
@@ -87,36 +121,227 @@ def clean_tarinfo(ti: tarfile.TarInfo, mtime=None) -> tarfile.TarInfo:
     return ti
 
 
+def read_ahead(func: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+    """Call func for each of the items in a background thread, and yield the
+    results in order. At most read_ahead_count results are computed ahead of
+    the consumer. Exceptions raised by func are raised by the iterator."""
+    results: queue.Queue[tuple[bool, Any]] = queue.Queue(read_ahead_count)
+    stop = threading.Event()
+    done = object()
+
+    def reader():
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                results.put((True, func(item)))
+            results.put((False, done))
+        except BaseException as e:
+            results.put((False, e))
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        while True:
+            ok, result = results.get()
+            if ok:
+                yield result
+            elif result is done:
+                return
+            else:
+                raise result
+    finally:
+        # Unblock the reader if it is waiting for space in the queue
+        stop.set()
+        while thread.is_alive():
+            with contextlib.suppress(queue.Empty):
+                results.get(timeout=0.01)
+
+
+def _translate_glob_component(component: str) -> str:
+    """Translate a single path component of a glob pattern to a regular
+    expression (similar to fnmatch.translate, but wildcards never match
+    slashes)."""
+    i, n, res = 0, len(component), ""
+    while i < n:
+        c = component[i]
+        i += 1
+        if c == "*":
+            res += "[^/]*"
+        elif c == "?":
+            res += "[^/]"
+        elif c == "[":
+            j = i
+            if j < n and component[j] == "!":
+                j += 1
+            if j < n and component[j] == "]":
+                j += 1
+            while j < n and component[j] != "]":
+                j += 1
+            if j >= n:
+                res += "\\["
+                continue
+            stuff = component[i:j].replace("\\", "\\\\")
+            i = j + 1
+            if stuff[0] == "!":
+                stuff = "^/" + stuff[1:]
+            elif stuff[0] in ("^", "["):
+                stuff = "\\" + stuff
+            res += f"[{stuff}]"
+        else:
+            res += re.escape(c)
+    return res
+
+
+def _translate_glob(parts: Sequence[str]) -> str:
+    """Translate the components of a glob pattern to a regular expression that
+    matches the relative path with a leading slash (see FilePatterns). A
+    recursive wildcard (**) matches zero or more directories."""
+    return "".join(
+        "(?:/[^/]+)*" if part == "**" else "/" + _translate_glob_component(part)
+        for part in parts
+    )
+
+
+class _PatternNode:
+    """Node of the prefix tree of FilePatterns, for a path without wildcards.
+    Glob patterns are stored in the node of their longest prefix without
+    wildcards, as regular expressions for the rest of the path."""
+
+    __slots__ = ("children", "end", "globs", "prefix_regex", "prefixes", "regex")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _PatternNode] = {}
+        self.end = False  # Whether a pattern matches this path exactly
+        self.globs: list[str] = []
+        self.prefixes: set[str] = set()
+        self.regex: re.Pattern[str] | None = None
+        self.prefix_regex: re.Pattern[str] | None = None
+
+    def compile(self, flags: int):
+        if self.globs:
+            # Matches the path itself or any of its parent directories
+            globs = "|".join(self.globs)
+            self.regex = re.compile(f"(?:{globs})(?:/.*)?", flags)
+            # Matches the directories that could contain matches
+            self.prefix_regex = re.compile("|".join(sorted(self.prefixes)), flags)
+        for child in self.children.values():
+            child.compile(flags)
+
+
+# Prefix tree node of a directory and the nodes of its parents with glob
+# patterns (and the offsets of their paths in the relative path)
+_WalkState = Tuple[Optional[_PatternNode], Tuple[Tuple[int, _PatternNode], ...]]
+
+
 class FilePatterns:
-    """Manage a set of file inclusion/exclusion patterns relative to basedir"""
+    """Manage a set of file inclusion/exclusion patterns relative to basedir.
+
+    The patterns use the same syntax as Path.glob, and a pattern that matches
+    a directory also matches all files in that directory. Rather than
+    expanding the patterns using the file system, they are compiled into a
+    prefix tree of path components: each node stores the patterns without
+    wildcards that end there, and a single regular expression for the glob
+    patterns that start there. Matching a path only involves the nodes along
+    that path, independent of the total number of patterns."""
 
     def __init__(self, patterns: Iterable[str], basedir: Path):
         self.basedir = basedir
+        self.ignore_case = os.name == "nt"
+        self._root = _PatternNode()
+        self._literals: set[str] = set()
+        for pattern in patterns:
+            if Path(pattern).anchor:
+                msg = f"Non-relative sdist patterns are not supported: {pattern}"
+                raise SdistError(msg)
+            parts = Path(self._normcase(pattern)).parts
+            node = self._root
+            for i, part in enumerate(parts):
+                if any(c in part for c in "*?["):
+                    rest = parts[i:]
+                    node.globs.append(_translate_glob(rest))
+                    node.prefixes.update(
+                        _translate_glob(rest[:k]) for k in range(len(rest))
+                    )
+                    break
+                node = node.children.setdefault(part, _PatternNode())
+                self._literals.add("/".join(parts[: i + 1]))
+            else:
+                node.end = True
+        self._root.compile(re.DOTALL | (re.IGNORECASE if self.ignore_case else 0))
 
-        self.dirs = set()
-        self.files = set()
+    def _normcase(self, path: str) -> str:
+        return path.lower() if self.ignore_case else path
 
-        for pattern in patterns:
-            for path in sorted(basedir.glob(pattern)):
-                rel = path.relative_to(basedir)
-                if path.is_dir():
-                    self.dirs.add(rel)
-                else:
-                    self.files.add(rel)
+    @property
+    def root(self) -> _WalkState:
+        """State for basedir itself, for use with match_entry."""
+        return self._root, ((0, self._root),) if self._root.regex else ()
+
+    def match_root(self) -> bool:
+        """Check whether basedir itself matches (e.g. using **)."""
+        root = self._root
+        return root.end or bool(root.regex and root.regex.fullmatch(""))
+
+    def match_entry(
+        self, state: _WalkState, rel_path: str, name: str
+    ) -> tuple[bool, _WalkState]:
+        """Incremental version of match for directory walks: state belongs to
+        the parent directory of the given path, which must not match itself.
+        Returns whether the given entry of that directory matches, and its
+        state."""
+        node, active = state
+        child = node.children.get(self._normcase(name)) if node else None
+        if child is None:
+            if not active:
+                return False, (None, active)
+        elif child.end:
+            return True, (child, active)
+        elif child.regex is not None:
+            active = (*active, (len(rel_path) + 1, child))
+        path = f"/{rel_path}"
+        for offset, n in active:
+            if n.regex.fullmatch(path, offset):  # type: ignore[union-attr]
+                return True, (child, active)
+        return False, (child, active)
+
+    def may_contain(self, state: _WalkState, rel_path: str) -> bool:
+        """Check whether the directory with the given state could contain any
+        matches (if it does not match itself)."""
+        node, active = state
+        path = f"/{rel_path}"
+        return node is not None or any(
+            n.prefix_regex.fullmatch(path, offset)  # type: ignore[union-attr]
+            for offset, n in active
+        )
 
-    def match_file(self, rel_path: Path) -> bool:
-        if rel_path in self.files:
+    def match(self, rel_path: str) -> bool:
+        """Check whether the given path (relative to basedir, using forward
+        slashes) or any of its parent directories matches one of the
+        patterns."""
+        if self.match_root():
             return True
+        state, rel = self.root, ""
+        for name in rel_path.split("/"):
+            rel = f"{rel}/{name}" if rel else name
+            matched, state = self.match_entry(state, rel, name)
+            if matched:
+                return True
+            if state[0] is None and not state[1]:
+                return False
+        return False
+
+    def is_literal(self, rel_path: str) -> bool:
+        """Check whether the given path (relative to basedir, using forward
+        slashes) appears in one of the patterns without wildcards, either as
+        the full pattern or as one of its parent directories."""
+        return self._normcase(rel_path) in self._literals
 
-        # Check if it's contained in any directory in the list
-        return any(d in rel_path.parents for d in self.dirs)
+    def match_file(self, rel_path: Path) -> bool:
+        return self.match(rel_path.as_posix())
 
     def match_dir(self, rel_path: Path) -> bool:
-        if rel_path in self.dirs:
-            return True
-
-        # Check if it's a subdirectory of any directory in the list
-        return any(d in rel_path.parents for d in self.dirs)
+        return self.match(rel_path.as_posix())
 
 
 class SdistBuilder:
@@ -136,6 +361,10 @@ class SdistBuilder:
         extra_files,
         include_patterns: Iterable[str] = (),
         exclude_patterns: Iterable[str] = (),
+        prune: bool = True,
+        prune_dirs: Iterable[Path] = (),
+        vcs: str | None = None,
+        compression_level: int = 9,
     ):
         self.module = module
         self.pkg_info = pkg_info
@@ -144,6 +373,27 @@ class SdistBuilder:
         self.extra_files = extra_files
         self.includes = FilePatterns(include_patterns, cfgdir)
         self.excludes = FilePatterns(exclude_patterns, cfgdir)
+        self.prune = prune
+        self.prune_dirs = self.get_relative_prune_dirs(prune_dirs, cfgdir)
+        self.pruned: list[str] = []
+        self.vcs = vcs
+        self._vcs_files: GitFiles | None = None
+        self.compression_level = compression_level
+
+    @staticmethod
+    def get_relative_prune_dirs(prune_dirs: Iterable[Path], cfgdir: Path):
+        """Paths of the given directories relative to cfgdir. Directories
+        outside of cfgdir (and cfgdir itself) are never visited, so they are
+        not included."""
+        result = set()
+        for d in prune_dirs:
+            try:
+                rel = (cfgdir / d).relative_to(cfgdir)
+            except ValueError:
+                continue
+            if rel.parts:
+                result.add(rel)
+        return result
 
     def select_files(self):
         """Pick which files from the source tree will be included in the sdist
@@ -152,39 +402,162 @@ class SdistBuilder:
         include tests, docs, etc. for a 'gold standard' sdist.
         """
         make_rel = lambda p: p.relative_to(self.module.base_path)
-        yield from map(make_rel, self.module.iter_files_abs())
+        vcs_files = self.get_vcs_files()
+        if vcs_files is not None and self.module.is_package:
+            yield from self.iter_module_vcs_files(vcs_files)
+        else:
+            yield from map(make_rel, self.module.iter_files_abs())
         yield from map(make_rel, self.extra_files)
 
+    def get_vcs_files(self) -> GitFiles | None:
+        """The files tracked by version control, or None if the selection of
+        files using version control is disabled, or if the project is not
+        part of a repository."""
+        if self.vcs != "git":
+            return None
+        if self._vcs_files is None:
+            from .vcs import list_git_files
+
+            self._vcs_files = list_git_files(self.cfgdir)
+            if self._vcs_files is None:
+                logger.info(
+                    "Not a git repository, selecting the sdist files by "
+                    "walking the project directory"
+                )
+                self.vcs = None
+        return self._vcs_files
+
+    def iter_vcs_files(self, vcs_files: GitFiles) -> Iterable[str]:
+        """All files tracked by version control, including the files in
+        submodules, relative to cfgdir. Files that were deleted from the
+        working tree may be included. The files in submodules are found by
+        walking the submodule directories, skipping the same directories as
+        iter_included_files."""
+        yield from vcs_files.files
+        for submodule in vcs_files.submodules:
+            for dirpath, dirs, files in os.walk(self.cfgdir / submodule):
+                rel_dir = Path(dirpath).relative_to(self.cfgdir).as_posix()
+                dirs[:] = [
+                    d for d in dirs if not self.should_skip_dir(f"{rel_dir}/{d}", d)
+                ]
+                yield from (f"{rel_dir}/{f}" for f in files)
+
+    def iter_module_vcs_files(self, vcs_files: GitFiles) -> Iterable[Path]:
+        """Version of Module.iter_files_abs that only yields tracked files,
+        relative to cfgdir."""
+        if self.module.is_generated:
+            return
+        rel_module = self.module.full_path.relative_to(self.module.base_path)
+        prefix = f"{rel_module.as_posix()}/"
+        for rel in self.iter_vcs_files(vcs_files):
+            if not rel.startswith(prefix) or rel.endswith(".pyc"):
+                continue
+            if "__pycache__" in rel.split("/"):
+                continue
+            if os.path.lexists(self.cfgdir / rel):
+                yield Path(rel)
+
     def crucial_files(self):
         make_rel = lambda p: p.relative_to(self.module.base_path)
         if not self.module.is_generated and not self.module.is_namespace:
             yield make_rel(self.module.full_file)
         yield from map(make_rel, self.extra_files)
 
+    def should_prune(self, rel_path: str, name: str) -> bool:
+        """Check whether the given directory is a build directory, virtual
+        environment, or other directory that should never be searched for
+        files to include in the sdist, unless the include patterns refer to
+        it explicitly."""
+        if self.includes.is_literal(rel_path):
+            return False
+        if name in prune_dir_names or PurePath(rel_path) in self.prune_dirs:
+            return True
+        path = self.cfgdir / rel_path
+        return any((path / marker).is_file() for marker in prune_dir_markers)
+
+    def should_skip_dir(self, rel_path: str, name: str) -> bool:
+        """Check whether the given directory should be skipped while walking
+        the project directory. Version control directories are always skipped,
+        other directories only if pruning is enabled (see should_prune)."""
+        if not self.prune:
+            return name in prune_dir_names
+        if not self.should_prune(rel_path, name):
+            return False
+        if rel_path not in self.pruned:
+            self.pruned.append(rel_path)
+        return True
+
+    def log_pruned(self):
+        if self.pruned:
+            logger.info(
+                "Skipped %d build, cache and version control directories "
+                "while selecting the sdist files",
+                len(self.pruned),
+            )
+            logger.debug("Skipped directories: %s", ", ".join(sorted(self.pruned)))
+
+    def iter_included_files(self) -> Iterable[Path]:
+        """Walk the project directory once, and yield the files that match the
+        include patterns but not the exclude patterns. Only directories that
+        could contain included files are visited, excluded directories are
+        skipped entirely, and so are build directories and similar (see
+        should_prune)."""
+        self.pruned = []
+        if self.excludes.match_root():
+            return
+        vcs_files = self.get_vcs_files()
+        if vcs_files is not None:
+            yield from self.iter_included_vcs_files(vcs_files)
+            self.log_pruned()
+            return
+        # Relative path, whether all files are included, pattern states
+        stack = [
+            ("", self.includes.match_root(), self.includes.root, self.excludes.root)
+        ]
+        while stack:
+            rel_dir, included, inc_state, exc_state = stack.pop()
+            with os.scandir(self.cfgdir / rel_dir) as it:
+                entries = list(it)
+            for entry in entries:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                excluded, exc_child = self.excludes.match_entry(
+                    exc_state, rel, entry.name
+                )
+                if excluded:
+                    continue
+                matched, inc_child = included, inc_state
+                if not included:
+                    matched, inc_child = self.includes.match_entry(
+                        inc_state, rel, entry.name
+                    )
+                if entry.is_dir():
+                    # Like os.walk, symbolic links to directories are only
+                    # followed if they were matched explicitly
+                    if included and entry.is_symlink():
+                        continue
+                    if not matched and not self.includes.may_contain(inc_child, rel):
+                        continue
+                    if self.prune and self.should_prune(rel, entry.name):
+                        self.pruned.append(rel)
+                        continue
+                    stack.append((rel, matched, inc_child, exc_child))
+                elif matched:
+                    yield Path(rel)
+        self.log_pruned()
+
+    def iter_included_vcs_files(self, vcs_files: GitFiles) -> Iterable[Path]:
+        """Yield the files tracked by version control that match the include
+        patterns but not the exclude patterns."""
+        for rel in self.iter_vcs_files(vcs_files):
+            if not self.includes.match(rel) or self.excludes.match(rel):
+                continue
+            if os.path.lexists(self.cfgdir / rel):
+                yield Path(rel)
+
     def apply_includes_excludes(self, files: Iterable[Path]):
         files = {f for f in files if not self.excludes.match_file(f)}
 
-        for f_rel in self.includes.files:
-            if not self.excludes.match_file(f_rel):
-                files.add(Path(f_rel))
-
-        for rel_d in self.includes.dirs:
-            for dirpath, dirs, dfiles in os.walk(self.cfgdir / rel_d):
-                file: str
-                for file in dfiles:
-                    f_abs = Path(dirpath) / file
-                    f_rel = f_abs.relative_to(self.cfgdir)
-                    if not self.excludes.match_file(f_rel):
-                        files.add(f_rel)
-
-                # Filter subdirectories before os.walk scans them
-                dirs[:] = [
-                    d
-                    for d in dirs
-                    if not self.excludes.match_dir(
-                        (Path(dirpath) / d).relative_to(self.cfgdir)
-                    )
-                ]
+        files.update(self.iter_included_files())
 
         crucial_files = set(self.crucial_files())
         missing_crucial = crucial_files - files
@@ -201,37 +574,91 @@ class SdistBuilder:
     def dir_name(self):
         return f"{self.pkg_info.norm_name}-{self.pkg_info.version}"
 
-    def build(self, target_dir: Path, gen_setup_py=True):
+    def read_entry(
+        self, tf: tarfile.TarFile, relpath: Path, mtime: int | None
+    ) -> tuple[Path, tarfile.TarInfo, bytes | None]:
+        """Get the archive member for the given file, and read its contents
+        if it is a small regular file (larger files are streamed)."""
+        path = self.cfgdir / relpath
+        archive_path = PurePosixPath(self.dir_name) / PurePosixPath(relpath)
+        ti = tf.gettarinfo(path, arcname=str(archive_path))
+        ti = clean_tarinfo(ti, mtime)
+        data = None
+        if ti.isreg() and ti.size <= read_ahead_size:
+            data = path.read_bytes()
+        return path, ti, data
+
+    def build(
+        self,
+        target_dir: Path,
+        gen_setup_py=True,
+        cache_dir: Path | None = None,
+        rebuild: bool = False,
+    ):
+        """Build the sdist in the given directory. If cache_dir is given, the
+        previous sdist in that directory is reused if none of the selected
+        files and the metadata changed (unless rebuild is true)."""
         target_dir.mkdir(parents=True, exist_ok=True)
         target = target_dir / (self.dir_name + ".tar.gz")
+        files_to_add = self.apply_includes_excludes(self.select_files())
+        stream = io.StringIO()
+        stream.write(str(self.metadata.as_rfc822()))
+        pkg_info = stream.getvalue().encode()
+
+        cache_key = None
+        if cache_dir is not None:
+            from .cache import get_sdist_cache_key, lookup_cached_sdist
+
+            settings = (self.dir_name, self.compression_level, gen_setup_py)
+            cache_key = get_sdist_cache_key(
+                self.cfgdir, files_to_add, pkg_info, *settings
+            )
+            if not rebuild:
+                cached_sdist = lookup_cached_sdist(cache_dir, cache_key, target_dir)
+                if cached_sdist is not None:
+                    return target_dir / cached_sdist
+
+        self.write_archive(target, files_to_add, pkg_info, gen_setup_py)
+        logger.debug("Built sdist: %s", target)
+
+        if cache_dir is not None and cache_key is not None:
+            from .cache import store_cached_sdist
+
+            try:
+                store_cached_sdist(cache_dir, cache_key, target)
+            except OSError as e:
+                logger.debug("Failed to store sdist in cache %s: %s", cache_dir, e)
+        return target
+
+    def write_archive(
+        self, target: Path, files_to_add: list[Path], pkg_info: bytes, gen_setup_py
+    ):
+        from .parallel_gzip import ParallelGzipFile
+
         source_date_epoch = os.environ.get("SOURCE_DATE_EPOCH", "")
         mtime = int(source_date_epoch) if source_date_epoch else None
-        gz = GzipFile(str(target), mode="wb", mtime=mtime)
+        gz = ParallelGzipFile(target, self.compression_level, mtime=mtime)
         tf = tarfile.TarFile(
             str(target), mode="w", fileobj=gz, format=tarfile.PAX_FORMAT
         )
 
         try:
-            files_to_add = self.apply_includes_excludes(self.select_files())
             archive_dir = PurePosixPath(self.dir_name)
-            for relpath in files_to_add:
-                path = self.cfgdir / relpath
-                archive_path = archive_dir / PurePosixPath(relpath)
-                ti = tf.gettarinfo(path, arcname=str(archive_path))
-                ti = clean_tarinfo(ti, mtime)
-
-                if ti.isreg():
+            # The files are read by a separate thread, so that reading the
+            # next files overlaps with writing and compressing the archive
+            read = functools.partial(self.read_entry, tf, mtime=mtime)
+            for path, ti, data in read_ahead(read, files_to_add):
+                if not ti.isreg():
+                    tf.addfile(ti)  # Symlinks & ?
+                elif data is not None:
+                    tf.addfile(ti, io.BytesIO(data))
+                else:
                     with path.open("rb") as f:
                         tf.addfile(ti, f)
-                else:
-                    tf.addfile(ti)  # Symlinks & ?
 
             if gen_setup_py:
                 self.add_setup_py(files_to_add, tf)
 
-            stream = io.StringIO()
-            stream.write(str(self.metadata.as_rfc822()))
-            pkg_info = stream.getvalue().encode()
             ti = tarfile.TarInfo(str(archive_dir / "PKG-INFO"))
             ti.size = len(pkg_info)
             tf.addfile(ti, io.BytesIO(pkg_info))
@@ -239,6 +666,3 @@ class SdistBuilder:
         finally:
             tf.close()
             gz.close()
-
-        logger.debug("Built sdist: %s", target)
-        return target
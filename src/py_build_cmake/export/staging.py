@@ -0,0 +1,154 @@
+"""
+Staging of files for inclusion in a Wheel. Rather than copying every file to
+the staging directory, the files can be reflinked (copy-on-write clones,
+supported by e.g. Btrfs and XFS) or hard linked, which does not require reading
+or writing their contents. If a method is not supported, the next one is used:
+reflink, hard link, copy.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import errno
+import logging
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+staging_methods = ("auto", "reflink", "hardlink", "copy")
+
+# ioctl request code to clone a file on Linux (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+# Errors that indicate that a method is not supported for the given files
+_unsupported_errors = frozenset(
+    (
+        errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTTY,
+        errno.EINVAL, errno.ENOSYS, errno.EPERM, errno.EACCES, errno.EMLINK,
+    )
+)  # fmt: skip
+
+FilePair = Tuple[Path, Path]
+
+
+def supports_reflink() -> bool:
+    return sys.platform.startswith("linux")
+
+
+def reflink(src: Path, dst: Path):
+    """Create a copy-on-write clone of src at dst (Linux only)."""
+    import fcntl
+
+    with src.open("rb") as fsrc, dst.open("xb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except BaseException:
+            fdst.close()
+            dst.unlink()
+            raise
+    shutil.copystat(src, dst)
+
+
+def reflink_or_copy(src: Path, dst: Path):
+    """Create an independent copy of src at dst, using a copy-on-write clone
+    if the file system supports it. Unlike a hard link, modifying dst in place
+    never affects src. Replaces dst if it exists."""
+    with contextlib.suppress(FileNotFoundError):
+        dst.unlink()
+    if supports_reflink():
+        try:
+            reflink(src, dst)
+            return
+        except OSError as e:
+            if e.errno not in _unsupported_errors:
+                raise
+    shutil.copy2(src, dst)
+
+
+def select_staging_method(src: Path, dst_dir: Path) -> str:
+    """Select the fastest method that is expected to work for staging files
+    from the folder of src to dst_dir: files can only be linked if they are
+    on the same file system."""
+    if src.stat().st_dev != dst_dir.stat().st_dev:
+        return "copy"
+    return "reflink" if supports_reflink() else "hardlink"
+
+
+class _Stager:
+    def __init__(self, method: str, replace: bool):
+        self.method = method
+        self.replace = replace
+
+    def fallback(self, method: str, e: OSError) -> bool:
+        """Switch to the next method if the given error indicates that the
+        current method is not supported."""
+        if e.errno not in _unsupported_errors:
+            return False
+        next_method = {"reflink": "hardlink", "hardlink": "copy"}[method]
+        if self.method == method:
+            logger.debug(
+                "Staging using %s failed (%s), using %s", method, e, next_method
+            )
+            self.method = next_method
+        return True
+
+    def __call__(self, files: FilePair):
+        src, dst = files
+        if self.replace:
+            with contextlib.suppress(FileNotFoundError):
+                dst.unlink()
+        method = self.method
+        if src.is_symlink():
+            method = "copy"
+        if method == "reflink":
+            try:
+                reflink(src, dst)
+                return
+            except OSError as e:
+                if not self.fallback(method, e):
+                    raise
+                method = "hardlink"
+        if method == "hardlink":
+            try:
+                os.link(src, dst)
+                return
+            except OSError as e:
+                if not self.fallback(method, e):
+                    raise
+        shutil.copy2(src, dst, follow_symlinks=False)
+
+
+def stage_files(
+    files: Iterable[FilePair],
+    method: str = "auto",
+    replace: bool = False,
+    max_workers: int | None = None,
+):
+    """Reflink, hard link or copy the given files (pairs of source and
+    destination paths), using a thread pool. The destination folders should
+    exist already. If replace is true, existing destination files are removed
+    first (they are never written to, since they may be links to other
+    files)."""
+    from .parallel_zip import get_default_workers
+
+    files = list(files)
+    if not files:
+        return
+    if method == "auto":
+        method = select_staging_method(files[0][0], files[0][1].parent)
+    logger.debug("Staging %d files using method %s", len(files), method)
+    stager = _Stager(method, replace)
+    max_workers = max_workers or get_default_workers()
+    if max_workers == 1 or len(files) == 1:
+        for f in files:
+            stager(f)
+        return
+    with ThreadPoolExecutor(max_workers) as pool:
+        # Consume the results to propagate exceptions
+        for _ in pool.map(stager, files):
+            pass
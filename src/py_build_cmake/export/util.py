@@ -1,18 +1,66 @@
 from __future__ import annotations
 
+import contextlib
+import logging
+import os
 import shutil
 from pathlib import Path
+from typing import Iterable
 
 from ..common import Module
+from .staging import stage_files
 
+logger = logging.getLogger(__name__)
 
-def copy_pkg_source_to(staging_dir: Path, module: Module, symlink: bool = False):
-    """Copy the files of a Python package to the build directory."""
-    for src in module.iter_files_abs():
-        rel_path = src.relative_to(module.prefix)
+
+def copy_pkg_source_to(
+    staging_dir: Path, module: Module, symlink: bool = False, method: str = "auto"
+):
+    """Copy the files of a Python package to the build directory. See
+    staging.stage_files for the possible methods."""
+    if symlink:
+        for src in module.iter_files_abs():
+            dst = staging_dir / src.relative_to(module.prefix)
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            dst.symlink_to(src, target_is_directory=False)
+        return
+    files = [
+        (src, staging_dir / src.relative_to(module.prefix))
+        for src in module.iter_files_abs()
+    ]
+    for parent in sorted({dst.parent for _, dst in files}):
+        parent.mkdir(parents=True, exist_ok=True)
+    stage_files(files, method)
+
+
+def link_or_copy(src: Path, dst: Path):
+    """Hard link src to dst, or copy it if that is not possible (e.g. because
+    they are on different file systems). Replaces dst if it exists. Symbolic
+    links are copied as symbolic links."""
+    with contextlib.suppress(FileNotFoundError):
+        dst.unlink()
+    if src.is_symlink():
+        shutil.copy2(src, dst, follow_symlinks=False)
+        return
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def stage_installed_files(
+    staging_dir: Path, prefix: Path, files: Iterable[Path], method: str = "auto"
+):
+    """Link (or copy) the given files, which were installed into the given
+    prefix, to the staging directory, replacing existing files."""
+    staged = []
+    for src in files:
+        try:
+            rel_path = src.relative_to(prefix)
+        except ValueError:
+            logger.warning("Installed file %s is not in prefix %s", src, prefix)
+            continue
         dst = staging_dir / rel_path
         dst.parent.mkdir(parents=True, exist_ok=True)
-        if symlink:
-            dst.symlink_to(src, target_is_directory=False)
-        else:
-            shutil.copy2(src, dst, follow_symlinks=False)
+        staged.append((src, dst))
+    stage_files(staged, method, replace=True)
@@ -0,0 +1,122 @@
+"""
+Selection of sdist files from the git index. Instead of walking the source
+directory (which can be slow for large checkouts, and which picks up files
+that are not under version control), the list of tracked files is obtained
+using `git ls-files`. The listing is cached in .py-build-cmake_cache, keyed by
+the modification time of the git index, which git updates whenever files are
+added, removed or renamed.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import pickle
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ..common.util import write_file_if_changed
+
+logger = logging.getLogger(__name__)
+
+gitlink_mode = "160000"  # Submodules
+
+
+@dataclass
+class GitFiles:
+    """Files tracked by git, relative to the directory in which git ls-files
+    was executed, using forward slashes."""
+
+    files: list[str] = field(default_factory=list)
+    submodules: list[str] = field(default_factory=list)
+
+
+def get_git_files_cache_file(source_dir: Path) -> Path:
+    return source_dir / ".py-build-cmake_cache" / "git-files.pickle"
+
+
+def find_git_index(source_dir: Path) -> Path | None:
+    """Locate the index of the git repository containing source_dir, without
+    invoking git. Worktrees and submodules use a .git file that refers to the
+    actual git directory."""
+    index_file = os.environ.get("GIT_INDEX_FILE")
+    if index_file:
+        return Path(index_file)
+    for d in (source_dir, *source_dir.parents):
+        git = d / ".git"
+        if git.is_dir():
+            return git / "index"
+        if git.is_file():
+            contents = git.read_text(encoding="utf-8").strip()
+            if not contents.startswith("gitdir:"):
+                return None
+            return d / contents[len("gitdir:") :].strip() / "index"
+    return None
+
+
+def parse_ls_files(output: bytes) -> GitFiles:
+    """Parse the output of `git ls-files -z --stage`. Every entry has the form
+    `<mode> <object> <stage>\\t<path>`. Conflicting files have multiple
+    entries with different stages."""
+    result = GitFiles()
+    seen = set()
+    for entry in output.split(b"\0"):
+        if not entry:
+            continue
+        info, _, path_bytes = entry.partition(b"\t")
+        path = os.fsdecode(path_bytes)
+        if path in seen:
+            continue
+        seen.add(path)
+        if info.split(b" ", 1)[0].decode() == gitlink_mode:
+            result.submodules.append(path)
+        else:
+            result.files.append(path)
+    return result
+
+
+def run_git_ls_files(source_dir: Path) -> GitFiles | None:
+    """List the files in the git index that are inside of source_dir. Returns
+    None if source_dir is not part of a git repository, or if git is not
+    available."""
+    cmd = ["git", "ls-files", "-z", "--stage", "--", "."]
+    try:
+        res = subprocess.run(cmd, cwd=source_dir, capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.debug("git ls-files failed: %s", getattr(e, "stderr", None) or e)
+        return None
+    return parse_ls_files(res.stdout)
+
+
+def list_git_files(source_dir: Path) -> GitFiles | None:
+    """List the files in the git index that are inside of source_dir, using
+    the cached listing if the git index did not change since it was created.
+    Returns None if source_dir is not part of a git repository."""
+    index = find_git_index(source_dir)
+    if index is None:
+        return None
+    cache_file = get_git_files_cache_file(source_dir)
+    try:
+        st = index.stat()
+        key = (str(index.resolve()), st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:  # E.g. a new repository without any files
+        key = None
+    if key is not None:
+        try:
+            with cache_file.open("rb") as f:
+                entry = pickle.load(f)
+            if entry["key"] == key:
+                logger.debug("Using cached git file listing %s", cache_file)
+                return entry["files"]
+        except Exception:  # Missing, corrupt or different versions
+            pass
+    files = run_git_ls_files(source_dir)
+    if files is not None and key is not None:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            entry = {"key": key, "files": files}
+            write_file_if_changed(cache_file, pickle.dumps(entry))
+        except OSError as e:
+            logger.debug("Failed to write git file cache %s: %s", cache_file, e)
+    return files
@@ -1,17 +1,45 @@
 from __future__ import annotations
 
+import base64
+import contextlib
 import logging
 import os
 import time
 import zipfile
+from fnmatch import fnmatchcase
 from pathlib import Path
+from typing import cast
 
+from distlib import __version__ as distlib_version  # type: ignore[import-untyped]
 from distlib.wheel import Wheel  # type: ignore[import-untyped]
 
+from .incremental import IncrementalWheel
+from .parallel_zip import AnyEntry, DateTime, ParallelZipWriter, ZipEntry
+
 logger = logging.getLogger(__name__)
 
 
 class WheelBuilder(Wheel):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Deflate compression level (None for the default level of zlib)
+        self.compression_level: int | None = None
+        # Compression levels for files matching glob patterns (last match wins)
+        self.compression_rules: list[tuple[str, int]] = []
+        # Directory to keep the previous Wheel in for incremental updates
+        self.incremental_dir: Path | None = None
+
+    def get_compression(self, arcname: str) -> tuple[int, int | None]:
+        """Get the compression method and level for the given file. Level 0
+        means no compression."""
+        level = self.compression_level
+        for pattern, pattern_level in self.compression_rules:
+            if fnmatchcase(arcname, pattern):
+                level = pattern_level
+        if level == 0:
+            return zipfile.ZIP_STORED, None
+        return zipfile.ZIP_DEFLATED, level
+
     def _get_source_time(self):
         """
         Get the value of the SOURCE_DATE_EPOCH in a format to pass to ZipInfo.
@@ -28,20 +56,110 @@ class WheelBuilder(Wheel):
             return None
         return time.gmtime(max(315532800, filetime))
 
+    def build_from_manifest(
+        self,
+        files: dict[str, Path],
+        distinfo: Path,
+        pure: bool,
+        tags: dict[str, list[str]],
+        wheel_version: tuple[int, int] | None = None,
+    ) -> str:
+        """
+        Build a Wheel from the given files (archive paths and the paths to read
+        them from) and dist-info folder, without staging them in a directory
+        first. The result is the same as Wheel.build for a directory containing
+        these files, whose logic is replicated here.
+        """
+        self.pyver, self.abi, self.arch = tags["pyver"], tags["abi"], tags["arch"]
+        info_dir = f"{self.name}-{self.version}.dist-info"
+        archive_paths = [
+            (ap, str(p)) for ap, p in files.items() if not ap.endswith((".pyc", ".pyo"))
+        ]
+        for p in distinfo.rglob("*"):
+            if p.is_file() and p.name not in ("RECORD", "INSTALLER", "SHARED", "WHEEL"):
+                ap = f"{info_dir}/{p.relative_to(distinfo).as_posix()}"
+                archive_paths.append((ap, str(p)))
+        wheel_metadata = [
+            "Wheel-Version: {}.{}".format(*(wheel_version or self.wheel_version)),
+            f"Generator: distlib {distlib_version}",
+            f"Root-Is-Purelib: {str(pure).lower()}",
+        ]
+        if self.buildver:
+            wheel_metadata.append(f"Build: {self.buildver}")
+        for pyver, abi, arch in self.tags:
+            wheel_metadata.append(f"Tag: {pyver}-{abi}-{arch}")
+        wheel_file = distinfo / "WHEEL"
+        wheel_file.write_text("\n".join(wheel_metadata))
+        archive_paths.append((f"{info_dir}/WHEEL", str(wheel_file)))
+
+        def sorter(t):
+            ap = t[0]
+            n = ap.count("/")
+            if ".dist-info" in ap:
+                n += 10000
+            return (n, ap)
+
+        archive_paths.sort(key=sorter)
+        self.write_records((str(distinfo), info_dir), None, archive_paths)
+        pathname = str(Path(self.dirname) / self.filename)
+        self.build_zip(pathname, archive_paths)
+        return pathname
+
+    def write_records(self, info: tuple[str, str], libdir, archive_paths):
+        """
+        We override this method to postpone writing the RECORD file: build_zip
+        computes the hashes of the files while compressing them, so that each
+        file only has to be read once.
+        """
+        self.record_info = info
+
     def build_zip(self, pathname: str | Path, archive_paths: list[tuple[str, str]]):
         """
-        We override this method to ensure a consistent modification time for all
-        files in the ZIP if the SOURCE_DATE_EPOCH environment variable is set.
+        We override this method to compress the files using multiple threads,
+        to compute the hashes for the RECORD file in the same pass, to reuse
+        unchanged entries of the previous Wheel (if incremental_dir is set), and to
+        ensure a consistent modification time for all files in the ZIP if the
+        SOURCE_DATE_EPOCH environment variable is set.
         """
         filetime = self._get_source_time()
-        if filetime is None:
-            super().build_zip(pathname, archive_paths)
-            return
-        tmstr = time.strftime("%Y-%m-%dT%H:%M:%S", filetime)
-        msg = f"SOURCE_DATE_EPOCH is set, using mtime={tmstr} for files in Wheel"
-        logger.info(msg)
-        with zipfile.ZipFile(pathname, "w", zipfile.ZIP_DEFLATED) as zf:
-            for ap, p in archive_paths:
-                file_zipinfo = zipfile.ZipInfo(ap, date_time=filetime)
-                zf.writestr(file_zipinfo, Path(p).read_bytes())
-                logger.debug("Wrote %s to %s in wheel", p, ap)
+        date_time = None
+        if filetime is not None:
+            tmstr = time.strftime("%Y-%m-%dT%H:%M:%S", filetime)
+            msg = f"SOURCE_DATE_EPOCH is set, using mtime={tmstr} for files in Wheel"
+            logger.info(msg)
+            date_time = cast(DateTime, tuple(filetime[:6]))
+        entries = [
+            ZipEntry(ap, Path(p), date_time, *self.get_compression(ap))
+            for ap, p in archive_paths
+        ]
+        distinfo, info_dir = self.record_info
+        all_entries: list[AnyEntry] = [*entries]
+        incremental = None
+        if self.incremental_dir is not None:
+            incremental = IncrementalWheel(self.incremental_dir)
+            incremental.load()
+            all_entries = incremental.update_entries(entries)
+            # The output file may be a hard link to the previous Wheel
+            with contextlib.suppress(FileNotFoundError):
+                Path(pathname).unlink()
+        with ParallelZipWriter(pathname) as writer:
+            written = writer.write_entries(all_entries)
+            records = [
+                (ap, self.format_digest(w.sha256), w.zinfo.file_size)
+                for (ap, _), w in zip(archive_paths, written)
+            ]
+            # Same as distlib.wheel.Wheel.write_records
+            record_path = Path(distinfo) / "RECORD"
+            record_ap = f"{info_dir}/RECORD"
+            self.write_record(records, str(record_path), record_ap)
+            compression = self.get_compression(record_ap)
+            record = ZipEntry(record_ap, record_path, date_time, *compression)
+            writer.write_entries([record])
+        if incremental is not None:
+            incremental.store(Path(pathname), written)
+
+    @staticmethod
+    def format_digest(sha256: bytes) -> str:
+        """Format of the hashes in the RECORD file (see PEP 376)."""
+        digest = base64.urlsafe_b64encode(sha256).rstrip(b"=").decode("ascii")
+        return f"sha256={digest}"
@@ -0,0 +1,45 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from py_build_cmake.cli import cli
+
+pytestmark = pytest.mark.skipif(shutil.which("cmake") is None, reason="needs CMake")
+
+
+def write_project(directory: Path):
+    (directory / "pyproject.toml").write_text(
+        "[project]\n"
+        'name = "preload-test"\n'
+        'version = "0.1.0"\n'
+        'description = "Test"\n'
+        "[tool.py-build-cmake.module]\n"
+        'name = "preload_test"\n'
+        "[tool.py-build-cmake.cmake]\n"
+        'minimum_version = "3.15"\n'
+    )
+    (directory / "CMakeLists.txt").write_text(
+        "cmake_minimum_required(VERSION 3.15)\nproject(preload-test NONE)\n"
+    )
+    (directory / "preload_test.py").write_text('"""Test"""\n')
+
+
+def test_configure_twice_keeps_preload_file(tmp_path: Path):
+    write_project(tmp_path)
+    build_dir = tmp_path / "build"
+    args = ["-C", str(tmp_path), "-B", str(build_dir), "configure"]
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    preload = build_dir / "py-build-cmake-preload.cmake"
+    assert preload.is_file()
+    contents = preload.read_bytes()
+    # Move the modification time back, so a rewrite cannot go unnoticed
+    os.utime(preload, ns=(1_000_000_000, 1_000_000_000))
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert preload.stat().st_mtime_ns == 1_000_000_000
+    assert preload.read_bytes() == contents
+    assert not list(build_dir.glob(".py-build-cmake-preload.cmake.*"))
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from py_build_cmake.cli import cli
+
+
+def write_project(directory: Path, extra: str = ""):
+    (directory / "pyproject.toml").write_text(
+        "[project]\n"
+        'name = "lint-test"\n'
+        'version = "0.1.0"\n'
+        'description = "Test"\n'
+        "[tool.py-build-cmake.module]\n"
+        'name = "lint_test"\n' + extra
+    )
+    (directory / "lint_test.py").write_text('"""Test"""\n')
+
+
+def test_lint(tmp_path: Path):
+    write_project(tmp_path, "[tool.py-build-cmake.windows.editable]\nmode = 'hook'\n")
+    args = ["-C", str(tmp_path), "config", "lint"]
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert "No problems found" in result.output
+
+
+def test_lint_other_platform(tmp_path: Path):
+    write_project(tmp_path, "[tool.py-build-cmake.mac.wheel]\nabi3 = true\n")
+    args = ["-C", str(tmp_path), "config", "lint"]
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code != 0
+    assert "Unknown option 'abi3'" in result.output
+    assert "mac/wheel" in result.output
@@ -0,0 +1,61 @@
+import pytest
+
+from py_build_cmake.build import _BuildBackend
+from py_build_cmake.common import ConfigError
+
+
+def test_build_order_no_dependencies():
+    cmake_cfg = {0: {}, 1: {}, 2: {}}
+    assert _BuildBackend.get_cmake_build_order(cmake_cfg) == [0, 1, 2]
+
+
+def test_build_order_dependencies():
+    cmake_cfg = {
+        0: {"depends_on": ["2"]},
+        1: {},
+        2: {"depends_on": ["1"]},
+        3: {"depends_on": ["1"]},
+    }
+    assert _BuildBackend.get_cmake_build_order(cmake_cfg) == [1, 2, 0, 3]
+
+
+def test_build_order_invalid_dependency():
+    cmake_cfg = {0: {"depends_on": ["1"]}}
+    with pytest.raises(ConfigError, match=r"cmake\.0\.depends_on"):
+        _BuildBackend.get_cmake_build_order(cmake_cfg)
+    cmake_cfg = {0: {"depends_on": ["0"]}, 1: {}}
+    with pytest.raises(ConfigError, match=r"cmake\.0\.depends_on"):
+        _BuildBackend.get_cmake_build_order(cmake_cfg)
+
+
+def test_build_order_circular_dependency():
+    cmake_cfg = {0: {}, 1: {"depends_on": ["2"]}, 2: {"depends_on": ["1"]}}
+    with pytest.raises(ConfigError, match="^Circular dependency .* 1, 2 "):
+        _BuildBackend.get_cmake_build_order(cmake_cfg)
+
+
+def test_parallel_pipelines_install_in_order():
+    log = []
+
+    class FakeCMaker:
+        def __init__(self, idx):
+            self.idx = idx
+
+        def configure(self):
+            log.append(("configure", self.idx))
+
+        def build(self):
+            log.append(("build", self.idx))
+
+    cmake_cfg = {0: {"depends_on": ["1"]}, 1: {}, 2: {}}
+    order = _BuildBackend.get_cmake_build_order(cmake_cfg)
+    cmakers = {i: FakeCMaker(i) for i in cmake_cfg}
+    installed = []
+
+    def install(idx):
+        assert ("build", idx) in log
+        installed.append(idx)
+
+    _BuildBackend.run_cmake_pipelines_parallel(cmake_cfg, cmakers, order, install)
+    assert installed == [1, 0, 2]
+    assert log.index(("configure", 0)) > log.index(("build", 1))
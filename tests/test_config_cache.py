@@ -0,0 +1,122 @@
+from pathlib import Path
+
+import pytest
+
+from py_build_cmake.build import _BuildBackend
+from py_build_cmake.common.util import get_os_name
+from py_build_cmake.config import load
+
+
+def write_project(directory: Path, description: str):
+    (directory / "pyproject.toml").write_text(
+        "[project]\n"
+        'name = "cache-test"\n'
+        'version = "0.1.0"\n'
+        f'description = "{description}"\n'
+        'readme = "README.md"\n'
+        "[tool.py-build-cmake.module]\n"
+        'name = "cache_test"\n'
+    )
+    (directory / "cache_test.py").write_text('"""Test"""\n')
+
+
+@pytest.fixture
+def count_process_config(monkeypatch):
+    calls = []
+    process_config = load.process_config
+
+    def counting_process_config(*args, **kwargs):
+        calls.append(args)
+        return process_config(*args, **kwargs)
+
+    monkeypatch.setattr(load, "process_config", counting_process_config)
+    return calls
+
+
+def test_config_cache(tmp_path: Path, monkeypatch, count_process_config):
+    monkeypatch.chdir(tmp_path)
+    write_project(tmp_path, "First")
+    (tmp_path / "README.md").write_text("Readme 1")
+    pyproject = tmp_path / "pyproject.toml"
+
+    def read(config_settings=None):
+        return load.read_full_config(pyproject, config_settings, False, use_cache=True)
+
+    cfg = read()
+    assert len(count_process_config) == 1
+    assert (tmp_path / ".py-build-cmake_cache" / "config.pickle").is_file()
+    assert read() == cfg
+    assert len(count_process_config) == 1
+
+    # Changes to pyproject.toml
+    write_project(tmp_path, "Second")
+    assert read().standard_metadata.description == "Second"
+    assert len(count_process_config) == 2
+
+    # Changes to referenced files
+    (tmp_path / "README.md").write_text("Readme 2")
+    assert read().standard_metadata.readme.text == "Readme 2"
+    assert len(count_process_config) == 3
+
+    # Command-line overrides
+    cfg = read({"--override": 'wheel.build_tag="1"'})
+    assert cfg.wheel[get_os_name()]["build_tag"] == "1"
+    assert len(count_process_config) == 4
+    assert read()
+    assert len(count_process_config) == 5
+
+    # Local config files
+    local = tmp_path / "py-build-cmake.local.toml"
+    local.write_text('[wheel]\nbuild_tag = "2"\n')
+    assert read().wheel[get_os_name()]["build_tag"] == "2"
+    local.write_text('[wheel]\nbuild_tag = "3"\n')
+    assert read().wheel[get_os_name()]["build_tag"] == "3"
+    assert len(count_process_config) == 7
+
+
+def test_config_cache_corrupt(tmp_path: Path, monkeypatch, count_process_config):
+    monkeypatch.chdir(tmp_path)
+    write_project(tmp_path, "Test")
+    (tmp_path / "README.md").write_text("Readme")
+    cache_file = tmp_path / ".py-build-cmake_cache" / "config.pickle"
+    cache_file.parent.mkdir()
+    cache_file.write_bytes(b"garbage")
+    cfg = load.read_full_config(
+        tmp_path / "pyproject.toml", None, False, use_cache=True
+    )
+    assert cfg.standard_metadata.description == "Test"
+    assert len(count_process_config) == 1
+
+
+def test_config_cache_readme_removed(tmp_path: Path, monkeypatch, count_process_config):
+    monkeypatch.chdir(tmp_path)
+    write_project(tmp_path, "Test")
+    (tmp_path / "README.md").write_text("Readme")
+    pyproject = tmp_path / "pyproject.toml"
+    load.read_full_config(pyproject, None, False, use_cache=True)
+    (tmp_path / "README.md").unlink()
+    with pytest.raises(Exception, match="README.md"):
+        load.read_full_config(pyproject, None, False, use_cache=True)
+    assert len(count_process_config) == 2
+
+
+def test_config_cache_opt_in(tmp_path: Path, monkeypatch, count_process_config):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("PY_BUILD_CMAKE_CONFIG_CACHE", raising=False)
+    write_project(tmp_path, "Test")
+    (tmp_path / "README.md").write_text("Readme")
+    cache_dir = tmp_path / ".py-build-cmake_cache"
+    # Disabled by default, nothing is written to the source directory
+    _BuildBackend.read_config(tmp_path, None, False)
+    _BuildBackend.read_config(tmp_path, None, False)
+    assert len(count_process_config) == 2
+    assert not cache_dir.exists()
+    # Enabled using a config setting or an environment variable
+    _BuildBackend.read_config(tmp_path, {"config_cache": ""}, False)
+    assert (cache_dir / "config.pickle").is_file()
+    monkeypatch.setenv("PY_BUILD_CMAKE_CONFIG_CACHE", "1")
+    _BuildBackend.read_config(tmp_path, None, False)
+    assert len(count_process_config) == 3
+    # The config setting takes precedence over the environment variable
+    _BuildBackend.read_config(tmp_path, {"config_cache": "0"}, False)
+    assert len(count_process_config) == 4
@@ -1,8 +1,10 @@
 import os
+from copy import deepcopy
 from pathlib import PurePosixPath
 
 import pytest
 
+from py_build_cmake.common.util import get_os_name
 from py_build_cmake.config.cli_override import parse_file
 from py_build_cmake.config.load import (
     Config,
@@ -48,6 +50,18 @@ def test_process_config_no_cmake_namespace_wrong_editable_mode():
         process_config(pyproj_path, files, {}, test=True)
 
 
+def test_process_config_invalid_staging_method():
+    pyproj_path = PurePosixPath("/project/pyproject.toml")
+    pyproj = {
+        "project": {"name": "foobar", "version": "0.0.1"},
+        "tool": {"py-build-cmake": {"wheel": {"staging_method": "symlink"}}},
+    }
+    files = {"pyproject.toml": pyproj}
+    expected = "^Value of pyproject.toml/tool/py-build-cmake/wheel/staging_method "
+    with pytest.raises(ConfigError, match=expected):
+        process_config(pyproj_path, files, {}, test=True)
+
+
 def test_inherit_cross_cmake():
     pyproj_path = PurePosixPath("/project/pyproject.toml")
     pyproj = {
@@ -652,3 +666,45 @@ def test_real_config_cli_override():
         },
     }
     assert conf.cross is None
+
+
+@pytest.mark.parametrize("cross", [None, "windows"])
+def test_process_config_active_only(cross):
+    pyproj_path = PurePosixPath("/project/pyproject.toml")
+    pyproj: dict = {
+        "project": {"name": "foobar", "version": "1.2.3", "description": "descr"},
+        "tool": {
+            "py-build-cmake": {
+                "cmake": {
+                    "build_type": "Release",
+                    "source_path": "src",
+                    "args": ["arg1", "arg2"],
+                },
+                "linux": {"cmake": {"install_components": ["linux_install"]}},
+                "windows": {"cmake": {"install_components": ["win_install"]}},
+                "mac": {"wheel": {"python_abi": "none"}},
+            },
+        },
+    }
+    if cross is not None:
+        pyproj["tool"]["py-build-cmake"]["cross"] = {
+            "os": cross,
+            "arch": "win_arm64",
+            "cmake": {"args": ["cross_arg"]},
+        }
+        active = {"cross", cross}
+    else:
+        active = {get_os_name()}
+    full = process_config(pyproj_path, deepcopy({"pyproject.toml": pyproj}), {}, True)
+    conf = process_config(
+        pyproj_path,
+        deepcopy({"pyproject.toml": pyproj}),
+        {},
+        test=True,
+        active_only=True,
+    )
+    for attr in ("editable", "sdist", "cmake", "wheel"):
+        expected = {k: v for k, v in getattr(full, attr).items() if k in active}
+        assert getattr(conf, attr) == expected
+    assert conf.cross == full.cross
+    assert conf.module == full.module
@@ -0,0 +1,125 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from py_build_cmake.commands.cmake import (
+    CMakeBuildSettings,
+    CMakeConfigureSettings,
+    CMakeInstallSettings,
+    CMaker,
+    CMakeSettings,
+)
+from py_build_cmake.commands.cmd_runner import CommandRunner
+from py_build_cmake.common import PackageInfo
+
+pytestmark = pytest.mark.skipif(not shutil.which("cmake"), reason="requires cmake")
+
+cmake_lists = """\
+cmake_minimum_required(VERSION 3.15)
+project(test NONE)
+file(APPEND "${CMAKE_BINARY_DIR}/configure-count.txt" "x")
+install(FILES data.txt DESTINATION share)
+"""
+
+
+def make_cmaker(tmp_path: Path, prefix: str = "prefix", **kwargs) -> CMaker:
+    conf = {
+        "environment": {},
+        "build_type": None,
+        "options": {},
+        "args": [],
+        "preset": None,
+        "generator": None,
+        "make_program": None,
+        "cross_compiling": False,
+        "toolchain_file": None,
+        "python_prefix": None,
+        "python_library": None,
+        "python_include_dir": None,
+        "python_interpreter_id": None,
+    }
+    conf.update(kwargs)
+    return CMaker(
+        cmake_settings=CMakeSettings(
+            working_dir=tmp_path,
+            source_path=tmp_path / "src",
+            build_path=tmp_path / "build",
+            os="linux",
+            find_python=False,
+            find_python3=False,
+            minimum_required="3.15",
+            generator_platform=None,
+        ),
+        conf_settings=CMakeConfigureSettings(**conf),
+        build_settings=CMakeBuildSettings([], [], [], []),
+        install_settings=CMakeInstallSettings([], [], [""], tmp_path / prefix),
+        package_info=PackageInfo(version="1.0", package_name="pkg", module_name="pkg"),
+        runner=CommandRunner(),
+    )
+
+
+def configure_count(tmp_path: Path) -> int:
+    return len((tmp_path / "build" / "configure-count.txt").read_text())
+
+
+@pytest.fixture
+def project(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv("CMAKE_GENERATOR", raising=False)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "CMakeLists.txt").write_text(cmake_lists)
+    (tmp_path / "src" / "data.txt").write_text("data")
+    (tmp_path / "toolchain.cmake").write_text("")
+    return tmp_path
+
+
+def test_configure_skip(project: Path):
+    make_cmaker(project).configure()
+    assert configure_count(project) == 1
+    assert (project / "build" / "py-build-cmake-configure.sha256").is_file()
+    make_cmaker(project).configure()
+    assert configure_count(project) == 1
+    make_cmaker(project).configure(force=True)
+    assert configure_count(project) == 2
+
+
+def test_configure_invalidate(project: Path, monkeypatch: pytest.MonkeyPatch):
+    make_cmaker(project).configure()
+    make_cmaker(project, options={"FOO:STRING": "1"}).configure()
+    assert configure_count(project) == 2
+    make_cmaker(project, options={"FOO:STRING": "1"}).configure()
+    assert configure_count(project) == 2
+    # Environment variables that affect the configuration
+    monkeypatch.setenv("CFLAGS", "-O3")
+    make_cmaker(project, options={"FOO:STRING": "1"}).configure()
+    assert configure_count(project) == 3
+    # Variables that only affect the output of py-build-cmake itself
+    monkeypatch.setenv("PY_BUILD_CMAKE_VERBOSE", "1")
+    monkeypatch.setenv("PY_BUILD_CMAKE_LOGLEVEL", "DEBUG")
+    make_cmaker(project, options={"FOO:STRING": "1"}).configure()
+    assert configure_count(project) == 3
+    # Toolchain file and its contents
+    toolchain = project / "toolchain.cmake"
+    make_cmaker(project, toolchain_file=toolchain).configure()
+    assert configure_count(project) == 4
+    make_cmaker(project, toolchain_file=toolchain).configure()
+    assert configure_count(project) == 4
+    toolchain.write_text("# changed\n")
+    make_cmaker(project, toolchain_file=toolchain).configure()
+    assert configure_count(project) == 5
+
+
+def test_configure_install_prefix(project: Path):
+    cmaker = make_cmaker(project, "staging-1")
+    cmaker.configure()
+    cmaker.build()
+    cmaker.install()
+    assert (project / "staging-1" / "share" / "data.txt").is_file()
+    # Every build installs into a new temporary prefix, which is passed to
+    # CMake again during installation, so it does not require reconfiguring
+    cmaker = make_cmaker(project, "staging-2")
+    cmaker.configure()
+    assert configure_count(project) == 1
+    cmaker.build()
+    cmaker.install()
+    assert (project / "staging-2" / "share" / "data.txt").is_file()
@@ -0,0 +1,162 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from py_build_cmake import daemon
+
+pytestmark = pytest.mark.skipif(
+    not daemon.is_supported(), reason="Daemon requires Unix domain sockets"
+)
+
+hook_script = """\
+import sys
+from py_build_cmake import build
+print("Requires:", build.{hook}({{"verbose": "1"}}))
+"""
+
+
+def write_project(directory: Path):
+    (directory / "pyproject.toml").write_text(
+        "[project]\n"
+        'name = "daemon-test"\n'
+        'version = "0.1.0"\n'
+        'description = "Test"\n'
+        "[tool.py-build-cmake.module]\n"
+        'name = "daemon_test"\n'
+    )
+    (directory / "daemon_test.py").write_text('"""Test"""\n')
+
+
+def run_hook(
+    directory: Path, env: dict, hook: str = "get_requires_for_build_sdist"
+) -> str:
+    cmd = [sys.executable, "-c", hook_script.format(hook=hook)]
+    res = subprocess.run(
+        cmd,
+        cwd=str(directory),
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        check=True,
+    )
+    return res.stdout.decode()
+
+
+def wait_for(predicate, timeout=10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+@pytest.fixture
+def daemon_env(tmp_path: Path):
+    src = Path(__file__).parent.parent / "src"
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(src), env.get("PYTHONPATH")]))
+    env["PY_BUILD_CMAKE_DAEMON"] = "1"
+    env["PY_BUILD_CMAKE_DAEMON_TIMEOUT"] = "30"
+    env["TMPDIR"] = str(tmp_path / "tmp")
+    (tmp_path / "tmp").mkdir()
+    return env
+
+
+def get_socket_path(project: Path, env: dict) -> Path:
+    """Ask a subprocess, since the socket path depends on sys.path."""
+    script = (
+        "from pathlib import Path\n"
+        "from py_build_cmake import daemon\n"
+        "print(daemon.get_socket_path(Path().resolve()))\n"
+    )
+    cmd = [sys.executable, "-c", script]
+    res = subprocess.run(
+        cmd, cwd=str(project), env=env, stdout=subprocess.PIPE, check=True
+    )
+    return Path(res.stdout.decode().strip())
+
+
+def test_daemon(tmp_path: Path, daemon_env: dict):
+    project = tmp_path / "project"
+    project.mkdir()
+    write_project(project)
+    socket_path = get_socket_path(project, daemon_env)
+    # The first hook is carried out in-process and starts the daemon
+    output = run_hook(project, daemon_env)
+    assert "Requires: []" in output
+    assert "in py-build-cmake daemon" not in output
+    try:
+        assert wait_for(socket_path.exists)
+        # Subsequent hooks are forwarded to the daemon
+        output = run_hook(project, daemon_env)
+        assert "Running get_requires_for_build_sdist in py-build-cmake daemon" in output
+        assert "Requires: []" in output
+        # The daemon keeps the configuration in memory
+        hook = "get_requires_for_build_wheel"
+        output = run_hook(project, daemon_env, hook)
+        assert "using configuration in memory" not in output
+        output = run_hook(project, daemon_env, hook)
+        assert f"Running {hook} in py-build-cmake daemon" in output
+        assert "using configuration in memory" in output
+        # Until it changes
+        (project / "pyproject.toml").write_text(
+            (project / "pyproject.toml").read_text().replace("Test", "Changed")
+        )
+        output = run_hook(project, daemon_env, hook)
+        assert "using configuration in memory" not in output
+    finally:
+        daemon.stop_daemon(socket_path)
+    assert wait_for(lambda: not socket_path.exists())
+
+
+def test_daemon_idle_timeout(tmp_path: Path, daemon_env: dict):
+    project = tmp_path / "project"
+    project.mkdir()
+    write_project(project)
+    daemon_env["PY_BUILD_CMAKE_DAEMON_TIMEOUT"] = "0.5"
+    socket_path = get_socket_path(project, daemon_env)
+    run_hook(project, daemon_env)
+    try:
+        assert wait_for(socket_path.exists)
+        assert wait_for(lambda: not socket_path.exists())
+    finally:
+        daemon.stop_daemon(socket_path)
+
+
+def test_daemon_connection_lost(tmp_path: Path, monkeypatch):
+    socket_dir = tmp_path / "sockets"
+    socket_dir.mkdir(mode=0o700)
+    socket_path = socket_dir / "test.sock"
+    monkeypatch.setattr(daemon, "get_socket_path", lambda _: socket_path)
+    monkeypatch.setattr(daemon, "start_daemon", lambda _: None)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    server.listen()
+
+    def accept_and_drop():
+        conn = server.accept()[0]
+        _, fds = daemon._recv(conn)
+        for fd in fds:
+            os.close(fd)
+        conn.close()
+
+    thread = threading.Thread(target=accept_and_drop)
+    thread.start()
+    fallback_calls = []
+    try:
+        # The request was forwarded, so the hook must not be carried out again
+        with pytest.raises(daemon.DaemonConnectionLost, match="build_wheel"):
+            daemon.call_hook("build_wheel", (), {}, lambda: fallback_calls.append(1))
+    finally:
+        thread.join()
+        server.close()
+    assert not fallback_calls
+    # If the daemon cannot be reached, the hook is carried out in-process
+    assert daemon.call_hook("build_wheel", (), {}, lambda: "fallback") == "fallback"
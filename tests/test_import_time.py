@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Modules that should only be imported by the hooks that actually need them
+heavy_modules = [
+    "distlib",
+    "lark",
+    "packaging",
+    "pyproject_metadata",
+    "py_build_cmake.commands.cmake",
+    "py_build_cmake.config.load",
+    "py_build_cmake.export.sdist",
+    "py_build_cmake.export.wheel",
+]
+
+
+def get_imported_modules(script: str, cwd: Path) -> set[str]:
+    """Run the script using `python -X importtime` and return the names of all
+    imported modules."""
+    src = Path(__file__).parent.parent / "src"
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(src), env.get("PYTHONPATH")]))
+    env.pop("PY_BUILD_CMAKE_DAEMON", None)
+    cmd = [sys.executable, "-X", "importtime", "-c", script]
+    res = subprocess.run(cmd, cwd=str(cwd), env=env, stderr=subprocess.PIPE, check=True)
+    modules = set()
+    for line in res.stderr.decode().splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            modules.add(line.split("|")[-1].strip())
+    return modules
+
+
+def test_import_build_backend(tmp_path: Path):
+    script = "from py_build_cmake import build\n"
+    script += "assert build.get_requires_for_build_sdist({}) == []\n"
+    modules = get_imported_modules(script, tmp_path)
+    assert "py_build_cmake.build" in modules
+    for name in heavy_modules:
+        assert name not in modules
+
+
+@pytest.mark.parametrize("overrides", [False, True])
+def test_import_config_overrides(tmp_path: Path, overrides: bool):
+    (tmp_path / "pyproject.toml").write_text(
+        "[project]\n"
+        'name = "import-test"\n'
+        'version = "0.1.0"\n'
+        'description = "Test"\n'
+        "[tool.py-build-cmake.module]\n"
+        'name = "import_test"\n'
+    )
+    (tmp_path / "import_test.py").write_text('"""Test"""\n')
+    config_settings = {"--override": 'wheel.build_tag="1"'} if overrides else {}
+    script = "from py_build_cmake import build\n"
+    script += f"build.get_requires_for_build_wheel({config_settings!r})\n"
+    modules = get_imported_modules(script, tmp_path)
+    assert "py_build_cmake.config.load" in modules
+    # The parsers for the command-line overrides are only needed if there are
+    # any overrides
+    assert ("lark" in modules) == overrides
@@ -0,0 +1,45 @@
+import os
+from pathlib import Path
+
+from py_build_cmake.build import _BuildBackend
+from py_build_cmake.common import BuildPaths
+from py_build_cmake.export.util import stage_installed_files
+
+
+def test_install_prefix(tmp_path: Path):
+    paths = BuildPaths(
+        source_dir=tmp_path,
+        build_dir=tmp_path / "build",
+        wheel_dir=tmp_path / "dist",
+        temp_dir=tmp_path / "tmp",
+        staging_dir=tmp_path / "tmp" / "staging",
+        pkg_staging_dir=tmp_path / "tmp" / "staging",
+    )
+    build_path = tmp_path / "build" / "cmake"
+    get_prefix = _BuildBackend.get_install_prefix
+    assert get_prefix({}, build_path, paths, False) == paths.staging_dir
+    cfg = {"incremental_install": True}
+    assert get_prefix(cfg, build_path, paths, False) == (
+        build_path / "py-build-cmake-install"
+    )
+    assert get_prefix(cfg, build_path, paths, True) == paths.staging_dir
+
+
+def test_stage_installed_files(tmp_path: Path):
+    prefix, staging = tmp_path / "prefix", tmp_path / "staging"
+    (prefix / "pkg").mkdir(parents=True)
+    (prefix / "pkg" / "libfoo.so.1").write_bytes(b"foo")
+    (prefix / "pkg" / "libfoo.so").symlink_to("libfoo.so.1")
+    (prefix / "pkg" / "stale.so").write_bytes(b"stale")
+    (staging / "pkg").mkdir(parents=True)
+    (staging / "pkg" / "libfoo.so.1").write_bytes(b"old")
+    installed = [
+        prefix / "pkg" / "libfoo.so.1",
+        prefix / "pkg" / "libfoo.so",
+        tmp_path / "outside.txt",
+    ]
+    stage_installed_files(staging, prefix, installed, "hardlink")
+    assert sorted(os.listdir(staging / "pkg")) == ["libfoo.so", "libfoo.so.1"]
+    assert (staging / "pkg" / "libfoo.so.1").read_bytes() == b"foo"
+    assert (staging / "pkg" / "libfoo.so.1").samefile(prefix / "pkg" / "libfoo.so.1")
+    assert os.readlink(staging / "pkg" / "libfoo.so") == "libfoo.so.1"
@@ -0,0 +1,75 @@
+import logging
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from py_build_cmake.export.wheel import WheelBuilder
+
+
+@pytest.fixture
+def staging(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1732565790")
+    staging = tmp_path / "staging"
+    (staging / "pkg").mkdir(parents=True)
+    (staging / "pkg-1.0.dist-info").mkdir()
+    (staging / "pkg-1.0.dist-info" / "METADATA").write_text("Name: pkg\n")
+    for i in range(4):
+        (staging / "pkg" / f"lib{i}.so").write_bytes(bytes([i]) * 10000)
+        os.utime(staging / "pkg" / f"lib{i}.so", ns=(0, 1700000000123456789 + i))
+    return staging
+
+
+def build(staging: Path, out_dir: Path, incremental_dir=None):
+    out_dir.mkdir(exist_ok=True)
+    whl = WheelBuilder()
+    whl.name, whl.version, whl.dirname = "pkg", "1.0", str(out_dir)
+    whl.incremental_dir = incremental_dir
+    paths = {"prefix": str(staging), "platlib": str(staging)}
+    tags = {"pyver": ["cp3"], "abi": ["none"], "arch": ["any"]}
+    return Path(whl.build(paths, tags=tags, wheel_version=(1, 0)))
+
+
+def test_incremental_wheel(tmp_path: Path, staging: Path, caplog):
+    caplog.set_level(logging.INFO)
+    inc = tmp_path / "incremental"
+    first = build(staging, tmp_path / "dist", inc)
+    assert "Reusing 0 of 6 files" in caplog.text
+    (staging / "pkg" / "lib2.so").write_bytes(b"changed")
+    second = build(staging, tmp_path / "dist", inc)
+    # The WHEEL file is written again by every build
+    assert "Reusing 4 of 6 files from the previous Wheel (verifying 0)" in caplog.text
+    assert first == second
+    assert (inc / second.name).samefile(second)
+    assert second.read_bytes() == build(staging, tmp_path / "full").read_bytes()
+    with zipfile.ZipFile(second) as zf:
+        assert zf.testzip() is None
+        assert zf.read("pkg/lib2.so") == b"changed"
+
+
+def test_incremental_wheel_verify(tmp_path: Path, staging: Path, caplog):
+    """Files with a modification time in whole seconds are hashed."""
+    caplog.set_level(logging.INFO)
+    inc = tmp_path / "incremental"
+    lib = staging / "pkg" / "lib1.so"
+    os.utime(lib, (1700000000, 1700000000))
+    build(staging, tmp_path / "dist", inc)
+    lib.write_bytes(b"\xff" * 10000)
+    os.utime(lib, (1700000000, 1700000000))
+    result = build(staging, tmp_path / "dist", inc)
+    assert "Reusing 5 of 6 files from the previous Wheel (verifying 1)" in caplog.text
+    with zipfile.ZipFile(result) as zf:
+        assert zf.read("pkg/lib1.so") == b"\xff" * 10000
+    assert result.read_bytes() == build(staging, tmp_path / "full").read_bytes()
+
+
+def test_incremental_wheel_modified(tmp_path: Path, staging: Path, caplog):
+    caplog.set_level(logging.INFO)
+    inc = tmp_path / "incremental"
+    first = build(staging, tmp_path / "dist", inc)
+    first.write_bytes(b"corrupted")
+    build(staging, tmp_path / "dist", inc)
+    assert "was modified" in caplog.text
+    assert "Reusing 0 of 6 files" in caplog.text
+    assert "Reusing 5 of 6 files" not in caplog.text
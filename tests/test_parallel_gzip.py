@@ -0,0 +1,75 @@
+import gzip
+import random
+import zlib
+from pathlib import Path
+
+import pytest
+
+from py_build_cmake.export import parallel_gzip
+from py_build_cmake.export.parallel_gzip import ParallelGzipFile
+from py_build_cmake.export.sdist import read_ahead
+
+
+@pytest.fixture
+def data(monkeypatch):
+    # Use small blocks to exercise the block boundaries
+    monkeypatch.setattr(parallel_gzip, "block_size", 1000)
+    rng = random.Random(0)
+    text = "".join(rng.choice("abc\n") for _ in range(23456)).encode()
+    return text + bytes(rng.getrandbits(8) for _ in range(5432))
+
+
+def write(path: Path, data: bytes, level: int, workers: int, mtime=1700000000):
+    with ParallelGzipFile(path, level, mtime=mtime, max_workers=workers) as f:
+        # Write in pieces that do not line up with the blocks
+        for i in range(0, len(data), 777):
+            f.write(data[i : i + 777])
+        assert f.tell() == len(data)
+
+
+@pytest.mark.parametrize("level", [0, 1, 6, 9])
+def test_parallel_gzip_reproducible(tmp_path: Path, data: bytes, level: int):
+    expected = None
+    for workers in (1, 2, 8):
+        (tmp_path / str(workers)).mkdir()
+        result = tmp_path / str(workers) / "reference.tar.gz"
+        write(result, data, level, workers)
+        assert gzip.decompress(result.read_bytes()) == data
+        expected = expected or result.read_bytes()
+        assert result.read_bytes() == expected
+    # Same header as GzipFile
+    reference = tmp_path / "reference.tar.gz"
+    with gzip.GzipFile(reference, "wb", level, mtime=1700000000) as f:
+        f.write(data)
+    header_size = 10 + len(b"reference.tar\0")
+    assert expected[:header_size] == reference.read_bytes()[:header_size]
+
+
+def test_parallel_gzip_dictionary(tmp_path: Path, data: bytes):
+    # Using the previous block as dictionary keeps the size close to that of a
+    # single deflate stream
+    write(tmp_path / "a.gz", data, 9, 4)
+    size = len(zlib.compress(data, 9))
+    assert (tmp_path / "a.gz").stat().st_size < 1.05 * size
+
+
+def test_parallel_gzip_empty(tmp_path: Path):
+    write(tmp_path / "empty.gz", b"", 9, 2)
+    assert gzip.decompress((tmp_path / "empty.gz").read_bytes()) == b""
+
+
+def test_read_ahead():
+    assert list(read_ahead(lambda x: 2 * x, range(1000))) == list(range(0, 2000, 2))
+
+    def fail(x: int):
+        if x == 5:
+            msg = "Failed"
+            raise ValueError(msg)
+        return x
+
+    with pytest.raises(ValueError, match="Failed"):
+        list(read_ahead(fail, range(10)))
+    # Stopping early must not block the reader thread
+    it = read_ahead(lambda x: x, range(100000))
+    assert next(it) == 0
+    it.close()
@@ -0,0 +1,88 @@
+import os
+import random
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from py_build_cmake.export import parallel_zip
+from py_build_cmake.export.parallel_zip import RawEntry, ZipEntry, write_zip
+
+
+@pytest.fixture
+def files(tmp_path: Path, monkeypatch):
+    # Use small chunks to exercise the streaming of large files
+    monkeypatch.setattr(parallel_zip, "chunk_size", 1000)
+    monkeypatch.setattr(parallel_zip, "memory_limit", 5000)
+    rng = random.Random(0)
+    src = tmp_path / "src"
+    (src / "pkg").mkdir(parents=True)
+    contents = {
+        "pkg/__init__.py": b"",
+        "pkg/module.py": b"print('Hello, world!')\n" * 100,
+        "pkg/random.bin": bytes(rng.getrandbits(8) for _ in range(12345)),
+        "pkg/text.txt": "".join(rng.choice("ab\n") for _ in range(54321)).encode(),
+        "pkg/ünicode.txt": b"\xc3\xbc",
+        "pkg/script": b"#!/bin/sh\n",
+    }
+    paths = []
+    for i, (name, data) in enumerate(contents.items()):
+        path = src / name
+        path.write_bytes(data)
+        os.utime(path, (1700000000 + i, 1700000000 + i))
+        paths.append((name, path))
+    (src / "pkg" / "script").chmod(0o755)
+    return paths
+
+
+def test_write_zip_identical(tmp_path: Path, files):
+    expected = tmp_path / "expected.zip"
+    with zipfile.ZipFile(expected, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, path in files:
+            zf.write(path, name)
+    for workers in (1, 2, 8):
+        result = tmp_path / f"result-{workers}.zip"
+        write_zip(result, [ZipEntry(n, p) for n, p in files], max_workers=workers)
+        assert result.read_bytes() == expected.read_bytes()
+
+
+def test_write_zip_date_time(tmp_path: Path, files):
+    date_time = (2024, 11, 25, 20, 16, 30)
+    entries = [ZipEntry(n, p, date_time) for n, p in files]
+    write_zip(tmp_path / "a.zip", entries, max_workers=4)
+    for _, path in files:
+        os.utime(path)
+    write_zip(tmp_path / "b.zip", entries, max_workers=3)
+    assert (tmp_path / "a.zip").read_bytes() == (tmp_path / "b.zip").read_bytes()
+    with zipfile.ZipFile(tmp_path / "a.zip") as zf:
+        assert zf.testzip() is None
+        for info, (name, path) in zip(zf.infolist(), files):
+            assert info.filename == name
+            assert info.date_time == date_time
+            assert zf.read(info) == path.read_bytes()
+
+
+def test_write_zip_error(tmp_path: Path, files):
+    entries = [ZipEntry(n, p) for n, p in files]
+    entries.insert(3, ZipEntry("missing", tmp_path / "missing"))
+    with pytest.raises(FileNotFoundError):
+        write_zip(tmp_path / "error.zip", entries, max_workers=2)
+
+
+def test_write_zip_raw(tmp_path: Path, files):
+    """Entries copied from an existing archive should be identical to newly
+    compressed entries."""
+    entries = [ZipEntry(n, p) for n, p in files]
+    written = write_zip(tmp_path / "a.zip", entries, max_workers=2)
+    with zipfile.ZipFile(tmp_path / "a.zip") as zf:
+        zinfos = zf.infolist()
+    raw_entries = [
+        RawEntry(e, tmp_path / "a.zip", zinfo, w.sha256, verify=i % 2 == 0)
+        for i, (e, zinfo, w) in enumerate(zip(entries, zinfos, written))
+    ]
+    # A changed file is compressed again if verify is true
+    files[2][1].write_bytes(b"changed")
+    raw_entries[2] = RawEntry(entries[2], tmp_path / "a.zip", zinfos[2], b"", True)
+    write_zip(tmp_path / "b.zip", raw_entries, max_workers=3)
+    write_zip(tmp_path / "c.zip", entries, max_workers=1)
+    assert (tmp_path / "b.zip").read_bytes() == (tmp_path / "c.zip").read_bytes()
@@ -0,0 +1,60 @@
+import zipfile
+from pathlib import Path
+
+from py_build_cmake import build
+
+
+def write_project(directory: Path):
+    (directory / "pyproject.toml").write_text(
+        "[project]\n"
+        'name = "metadata-test"\n'
+        'version = "1.2.3"\n'
+        'description = "Test"\n'
+        "[project.scripts]\n"
+        'metadata-test = "metadata_test:main"\n'
+        "[tool.py-build-cmake.module]\n"
+        'name = "metadata_test"\n'
+        "[tool.py-build-cmake.cmake]\n"
+        'minimum_version = "3.15"\n'
+    )
+    (directory / "metadata_test.py").write_text('"""Test"""\n')
+    # Preparing the metadata must not invoke CMake
+    (directory / "CMakeLists.txt").write_text('message(FATAL_ERROR "No CMake")\n')
+
+
+def test_prepare_metadata_for_build_wheel(tmp_path: Path, monkeypatch):
+    write_project(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    metadata_dir = tmp_path / "metadata"
+    for hook in (
+        build.prepare_metadata_for_build_wheel,
+        build.prepare_metadata_for_build_editable,
+    ):
+        name = hook(str(metadata_dir), {})
+        assert name == "metadata_test-1.2.3.dist-info"
+        distinfo = metadata_dir / name
+        metadata = (distinfo / "METADATA").read_text()
+        assert "Name: metadata-test\n" in metadata
+        assert "Version: 1.2.3\n" in metadata
+        entry_points = (distinfo / "entry_points.txt").read_text()
+        assert "metadata-test=metadata_test:main" in entry_points
+    assert not (tmp_path / ".py-build-cmake_cache").exists()
+
+
+def test_build_wheel_reuses_metadata(tmp_path: Path, monkeypatch):
+    write_project(tmp_path)
+    with (tmp_path / "pyproject.toml").open("a") as f:
+        f.write("[tool.py-build-cmake.wheel]\npure_python = true\n")
+    monkeypatch.chdir(tmp_path)
+    metadata_dir = tmp_path / "metadata"
+    name = build.prepare_metadata_for_build_wheel(str(metadata_dir), {})
+    marker = "Prepared-Metadata: yes\n"
+    with (metadata_dir / name / "METADATA").open("a") as f:
+        f.write(marker)
+    monkeypatch.setattr(build._BuildBackend, "run_cmake_pipelines", lambda *a: None)
+    wheel_dir = tmp_path / "dist"
+    wheel_dir.mkdir()
+    wheel = build.build_wheel(str(wheel_dir), {}, str(metadata_dir / name))
+    with zipfile.ZipFile(wheel_dir / wheel) as z:
+        metadata = z.read(f"{name}/METADATA").decode()
+        assert metadata.endswith(marker)
@@ -0,0 +1,106 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from distlib.version import NormalizedVersion  # type: ignore[import-untyped]
+
+from py_build_cmake.commands.cmd_runner import CommandRunner
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="needs sh")
+
+
+def write_program(directory: Path, name: str, version: str) -> Path:
+    program = directory / name
+    log = directory / f"{name}.log"
+    program.write_text(f'#!/bin/sh\necho run >> "{log}"\necho "{name} {version}"\n')
+    program.chmod(0o755)
+    return log
+
+
+@pytest.fixture
+def programs(tmp_path: Path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("PY_BUILD_CMAKE_CACHE_DIR", str(tmp_path / "cache"))
+    return bin_dir
+
+
+def test_probe_cache(programs: Path, tmp_path: Path):
+    log = write_program(programs, "fake-cmake", "version 3.99.1")
+    runner = CommandRunner(probe_cache=True)
+    min_ver = NormalizedVersion("3.20")
+    assert runner.check_program_version("fake-cmake", min_ver, None)
+    assert runner.check_program_version("fake-cmake", min_ver, None)
+    # The minimum version is checked against the cached output
+    assert not runner.check_program_version("fake-cmake", NormalizedVersion("4"), None)
+    assert len(log.read_text().splitlines()) == 1
+    # Modifying the program invalidates the cache
+    write_program(programs, "fake-cmake", "version 3.18")
+    assert not runner.check_program_version("fake-cmake", min_ver, None)
+    assert len(log.read_text().splitlines()) == 2
+    assert (tmp_path / "cache" / "probes.json").is_file()
+
+
+def test_probe_cache_disabled(programs: Path, tmp_path: Path):
+    # The results are only stored in the user's cache directory if enabled
+    log = write_program(programs, "fake-cmake", "version 3.99.1")
+    runner = CommandRunner()
+    min_ver = NormalizedVersion("3.20")
+    assert runner.check_program_version("fake-cmake", min_ver, None)
+    assert runner.check_program_version("fake-cmake", min_ver, None)
+    assert len(log.read_text().splitlines()) == 2
+    assert not (tmp_path / "cache").exists()
+
+
+def test_probe_concurrent(programs: Path):
+    write_program(programs, "fake-cmake", "version 3.30.0")
+    write_program(programs, "fake-ninja", "1.12.1")
+    probes = [
+        ("fake-cmake", NormalizedVersion("3.20"), "CMake", True),
+        ("nonexistent-program", None, None, False),
+        ("fake-ninja", NormalizedVersion("1.13"), "Ninja", True),
+        ("fake-ninja", None, "Ninja", True),
+    ]
+    results = CommandRunner(probe_cache=True).check_program_versions(probes)
+    assert results == [True, False, False, True]
+
+
+def test_probe_cache_shim(programs: Path, tmp_path: Path, monkeypatch):
+    # Shims select the actual program based on the environment or working dir
+    log = programs / "fake-cmake.log"
+    shim = programs / "fake-cmake"
+    shim.write_text(
+        f'#!/bin/sh\necho run >> "{log}"\necho "fake-cmake version $FAKE_VERSION"\n'
+    )
+    shim.chmod(0o755)
+    runner = CommandRunner(probe_cache=True)
+    monkeypatch.setenv("FAKE_VERSION", "3.30")
+    assert runner.check_program_version("fake-cmake", NormalizedVersion("3.20"), None)
+    assert runner.check_program_version("fake-cmake", NormalizedVersion("3.20"), None)
+    assert len(log.read_text().splitlines()) == 1
+    monkeypatch.setenv("FAKE_VERSION", "3.18")
+    assert not runner.check_program_version(
+        "fake-cmake", NormalizedVersion("3.20"), None
+    )
+    assert len(log.read_text().splitlines()) == 2
+    monkeypatch.chdir(tmp_path)
+    assert not runner.check_program_version(
+        "fake-cmake", NormalizedVersion("3.20"), None
+    )
+    assert len(log.read_text().splitlines()) == 3
+
+
+def test_probe_cache_symlink(programs: Path):
+    # Programs such as ccache behave differently depending on their name
+    program = programs / "fake-multi"
+    program.write_text(
+        '#!/bin/sh\n[ "$(basename "$0")" = fake-a ] && echo 3.30 || echo 3.10\n'
+    )
+    program.chmod(0o755)
+    (programs / "fake-a").symlink_to(program)
+    (programs / "fake-b").symlink_to(program)
+    runner = CommandRunner(probe_cache=True)
+    assert runner.check_program_version("fake-a", NormalizedVersion("3.20"), None)
+    assert not runner.check_program_version("fake-b", NormalizedVersion("3.20"), None)
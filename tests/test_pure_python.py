@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+
+from py_build_cmake import build
+from py_build_cmake.build import _BuildBackend
+from py_build_cmake.common.util import get_os_name
+
+# An OS other than the one running the tests
+other_os = "windows" if get_os_name() != "windows" else "linux"
+
+
+@pytest.fixture
+def project(tmp_path: Path, monkeypatch):
+    (tmp_path / "pyproject.toml").write_text(
+        "[project]\n"
+        'name = "other-os"\n'
+        'version = "1.0"\n'
+        'description = "Test"\n'
+        "[tool.py-build-cmake.module]\n"
+        'name = "other_os"\n'
+        f"[tool.py-build-cmake.{other_os}.cmake]\n"
+        'minimum_version = "3.15"\n'
+    )
+    (tmp_path / "other_os.py").write_text('"""Test"""\n')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PY_BUILD_CMAKE_CACHE_DIR", str(tmp_path / "user-cache"))
+    return tmp_path
+
+
+def test_cmake_other_os_not_pure(project: Path, monkeypatch):
+    # The CMake configuration for the other OS is pruned, but the package is
+    # still not a pure Python package
+    cfg = _BuildBackend.read_config(project, None, False)
+    assert not cfg.cmake
+    assert cfg.has_cmake
+    assert not _BuildBackend.get_build_config_name(cfg, 0).startswith("py3")
+    # CMake is still a build requirement if it cannot be found
+    with monkeypatch.context() as m:
+        m.setenv("PATH", str(project / "empty"))
+        reqs = build.get_requires_for_build_wheel({})
+    assert any(r.startswith("cmake>=") for r in reqs)
+    wheel_dir = project / "dist"
+    wheel_dir.mkdir()
+    wheel = build.build_wheel(str(wheel_dir), {})
+    assert not wheel.endswith("-py3-none-any.whl")
+    assert "-none-any" not in wheel
@@ -0,0 +1,92 @@
+import zipfile
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+from distlib.wheel import Wheel
+
+from py_build_cmake.cli import cli
+from py_build_cmake.export.retag import retag_wheel
+from py_build_cmake.export.wheel import WheelBuilder
+
+
+def build_wheel(tmp_path: Path) -> Path:
+    staging = tmp_path / "staging"
+    (staging / "pkg").mkdir(parents=True)
+    (staging / "pkg-1.0.dist-info").mkdir()
+    (staging / "pkg-1.0.dist-info" / "METADATA").write_text("Name: pkg\n")
+    (staging / "pkg" / "__init__.py").write_text("")
+    (staging / "pkg" / "lib.so").write_bytes(bytes(range(256)) * 1000)
+    out_dir = tmp_path / "dist"
+    out_dir.mkdir()
+    whl = WheelBuilder()
+    whl.name, whl.version, whl.dirname = "pkg", "1.0", str(out_dir)
+    paths = {"prefix": str(staging), "platlib": str(staging)}
+    tags = {"pyver": ["cp312"], "abi": ["cp312"], "arch": ["linux_x86_64"]}
+    return Path(whl.build(paths, tags=tags, wheel_version=(1, 0)))
+
+
+def read_raw(wheel_path: Path):
+    result = {}
+    with zipfile.ZipFile(wheel_path) as zf, wheel_path.open("rb") as f:
+        for info in zf.infolist():
+            f.seek(info.header_offset + 26)
+            name_len = int.from_bytes(f.read(2), "little")
+            extra_len = int.from_bytes(f.read(2), "little")
+            f.seek(name_len + extra_len, 1)
+            data = f.read(info.compress_size)
+            result[info.filename] = (info.CRC, info.external_attr, data)
+    return result
+
+
+def test_retag_wheel(tmp_path: Path):
+    wheel_path = build_wheel(tmp_path)
+    out_dir = tmp_path / "retagged"
+    out_dir.mkdir()
+    wheel_cfg = {
+        "python_abi": "auto",
+        "python_tag": ["auto"],
+        "platform_tag": ["manylinux_2_17_x86_64", "guess"],
+    }
+    new_path = retag_wheel(wheel_path, out_dir, wheel_cfg, "1")
+    expected_name = "pkg-1.0-1-cp312-cp312-manylinux_2_17_x86_64.linux_x86_64.whl"
+    assert new_path == out_dir / expected_name
+    with zipfile.ZipFile(new_path) as zf:
+        assert zf.testzip() is None
+        wheel_metadata = zf.read("pkg-1.0.dist-info/WHEEL").decode()
+    assert "Build: 1" in wheel_metadata
+    assert "Tag: cp312-cp312-manylinux_2_17_x86_64" in wheel_metadata
+    assert "Tag: cp312-cp312-linux_x86_64" in wheel_metadata
+    # The RECORD file is valid and all other entries were copied as-is
+    Wheel(str(new_path)).verify()
+    old, new = read_raw(wheel_path), read_raw(new_path)
+    assert list(old) == list(new)
+    for name in ("pkg/__init__.py", "pkg/lib.so", "pkg-1.0.dist-info/METADATA"):
+        assert old[name] == new[name]
+
+
+def test_retag_wheel_same_name(tmp_path: Path):
+    wheel_path = build_wheel(tmp_path)
+    wheel_cfg = {"python_abi": "auto", "python_tag": ["auto"]}
+    with pytest.raises(ValueError, match="overwrite"):
+        retag_wheel(wheel_path, wheel_path.parent, wheel_cfg)
+
+
+def test_retag_cli(tmp_path: Path):
+    wheel_path = build_wheel(tmp_path)
+    args = ["wheel", "retag", str(wheel_path), "--python-tag", "cp3"]
+    args += ["--abi-tag", "abi3", "--build-tag", "2"]
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    new_path = wheel_path.parent / "pkg-1.0-2-cp3-abi3-linux_x86_64.whl"
+    assert str(new_path) in result.output
+    Wheel(str(new_path)).verify()
+    # Removing the build tag again
+    args = ["wheel", "retag", str(new_path), "--build-tag", "", "-w", str(tmp_path)]
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "pkg-1.0-cp3-abi3-linux_x86_64.whl").is_file()
+    args = ["wheel", "retag", str(new_path), "--build-tag", "a-b"]
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code != 0
+    assert "Invalid build tag" in result.output
@@ -0,0 +1,88 @@
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from py_build_cmake.common import Module
+from py_build_cmake.export.sdist import SdistBuilder
+
+
+class Metadata:
+    def __init__(self, version: str):
+        self.version = version
+
+    def as_rfc822(self):
+        return f"Metadata-Version: 2.1\nName: pkg\nVersion: {self.version}\n"
+
+
+def make_builder(tree: Path, version: str = "1.0"):
+    module = Module(
+        name="pkg",
+        full_path=tree / "pkg",
+        base_path=tree,
+        is_package=True,
+        is_namespace=False,
+    )
+    return SdistBuilder(
+        module,
+        SimpleNamespace(norm_name="pkg", version="1.0"),  # type: ignore[arg-type]
+        Metadata(version),  # type: ignore[arg-type]
+        cfgdir=tree,
+        extra_files=[],
+        include_patterns=["src"],
+    )
+
+
+@pytest.fixture
+def tree(tmp_path: Path):
+    src = tmp_path / "src"
+    for f in ("pkg/__init__.py", "src/a.c", "src/b.c"):
+        (src / f).parent.mkdir(parents=True, exist_ok=True)
+        (src / f).write_text(f"// {f}\n")
+    return src
+
+
+def test_sdist_cache(tree: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    cache_dir = tree / ".py-build-cmake_cache" / "sdist"
+    dist_dir = tmp_path / "dist"
+    sdist = make_builder(tree).build(dist_dir, cache_dir=cache_dir)
+    contents = sdist.read_bytes()
+    sdist.unlink()
+
+    def write_archive(*args):
+        raise AssertionError
+
+    # Nothing changed, the cached sdist is used without writing a new archive
+    with monkeypatch.context() as m:
+        m.setattr(SdistBuilder, "write_archive", write_archive)
+        assert make_builder(tree).build(dist_dir, cache_dir=cache_dir) == sdist
+        assert sdist.read_bytes() == contents
+        # The returned sdist is a copy, modifying it does not affect the cache
+        (cached,) = cache_dir.glob("*.tar.gz")
+        assert not sdist.samefile(cached)
+        with sdist.open("r+b") as f:
+            f.write(b"modified")
+        assert cached.read_bytes() == contents
+        make_builder(tree).build(dist_dir, cache_dir=cache_dir)
+        assert sdist.read_bytes() == contents
+        with pytest.raises(AssertionError):
+            make_builder(tree).build(dist_dir, cache_dir=cache_dir, rebuild=True)
+        with pytest.raises(AssertionError):
+            make_builder(tree, "1.1").build(dist_dir, cache_dir=cache_dir)
+        # Same size and modification time, but different contents
+        st = (tree / "src" / "a.c").stat()
+        (tree / "src" / "a.c").write_text("// src/x.c\n")
+        os.utime(tree / "src" / "a.c", ns=(st.st_atime_ns, st.st_mtime_ns))
+        with pytest.raises(AssertionError):
+            make_builder(tree).build(dist_dir, cache_dir=cache_dir)
+        (tree / "src" / "b.c").unlink()
+        with pytest.raises(AssertionError):
+            make_builder(tree).build(dist_dir, cache_dir=cache_dir)
+    # The cache is updated after building again
+    make_builder(tree).build(dist_dir, cache_dir=cache_dir)
+    (tree / "src" / "c.c").write_text("")
+    make_builder(tree).build(dist_dir, cache_dir=cache_dir)
+    with monkeypatch.context() as m:
+        m.setattr(SdistBuilder, "write_archive", write_archive)
+        make_builder(tree).build(dist_dir, cache_dir=cache_dir)
@@ -0,0 +1,123 @@
+from pathlib import Path
+
+import pytest
+
+from py_build_cmake.export.sdist import FilePatterns, SdistBuilder, SdistError
+
+files = [
+    "CMakeLists.txt",
+    "README.md",
+    "src/a.c",
+    "src/b.cpp",
+    "src/sub/c.c",
+    "src/sub/deeper/d.h",
+    "include/pkg/a.h",
+    "include/pkg/[x].h",
+    "tests/test_a.py",
+    "tests/data/x.bin",
+    "cmake/Find.cmake",
+    "cmake/x.cmake.in",
+]
+
+patterns = [
+    "src",
+    "src/sub",
+    "src/*.c",
+    "src/*/*.c",
+    "src/**/*.h",
+    "src/**",
+    "**/*.cmake",
+    "**/data",
+    "include/pkg/[[]x].h",
+    "include/pkg/[!b].h",
+    "tests/test_?.py",
+    "*.md",
+    "*",
+    "**",
+    "cmake/*.cmake*",
+    "does-not-exist",
+    "src/sub/deeper/d.h",
+]
+
+
+@pytest.fixture
+def tree(tmp_path: Path):
+    for f in files:
+        (tmp_path / f).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / f).write_text("")
+    return tmp_path
+
+
+def all_paths(basedir: Path):
+    return [p.relative_to(basedir) for p in basedir.rglob("*")]
+
+
+@pytest.mark.parametrize("pattern", patterns)
+def test_file_patterns_glob(tree: Path, pattern: str):
+    """A path should match if Path.glob returns the path or any of its
+    parent directories."""
+    globbed = {p.relative_to(tree) for p in tree.glob(pattern)}
+    file_patterns = FilePatterns([pattern], tree)
+    for path in all_paths(tree):
+        expected = path in globbed or any(d in globbed for d in path.parents)
+        assert file_patterns.match_file(path) == expected, path
+
+
+def select(tree: Path, includes, excludes):
+    builder = SdistBuilder.__new__(SdistBuilder)
+    builder.cfgdir = tree
+    builder.includes = FilePatterns(includes, tree)
+    builder.excludes = FilePatterns(excludes, tree)
+    builder.prune, builder.prune_dirs = True, set()
+    builder.vcs = None
+    return sorted(p.as_posix() for p in builder.iter_included_files())
+
+
+def test_iter_included_files(tree: Path):
+    includes = ["src", "include/**/*.h", "**/*.cmake", "README.md"]
+    excludes = ["src/sub/deeper", "**/[[]*", "cmake"]
+    assert select(tree, includes, excludes) == [
+        "README.md",
+        "include/pkg/a.h",
+        "src/a.c",
+        "src/b.cpp",
+        "src/sub/c.c",
+    ]
+    assert select(tree, ["**"], ["*/*/*", "src", "include", "cmake"]) == [
+        "CMakeLists.txt",
+        "README.md",
+        "tests/test_a.py",
+    ]
+    assert select(tree, ["tests/*"], ["**"]) == []
+    assert select(tree, [], []) == []
+
+
+def test_file_patterns_absolute(tree: Path):
+    with pytest.raises(SdistError, match="Non-relative"):
+        FilePatterns([str(tree / "src")], tree)
+
+
+def test_iter_included_files_prune(tree: Path):
+    for d in (".git", "src/__pycache__", "build/x", "venv", "out"):
+        (tree / d).mkdir(parents=True)
+        (tree / d / "f.txt").write_text("")
+    (tree / "build" / "x" / "CMakeCache.txt").write_text("")
+    (tree / "venv" / "pyvenv.cfg").write_text("")
+    builder = SdistBuilder.__new__(SdistBuilder)
+    builder.cfgdir = tree
+    builder.includes = FilePatterns(["**", "venv/f.txt"], tree)
+    builder.excludes = FilePatterns(["src", "include", "tests", "cmake"], tree)
+    builder.prune, builder.vcs = True, None
+    builder.prune_dirs = SdistBuilder.get_relative_prune_dirs([tree / "out"], tree)
+    selected = sorted(p.as_posix() for p in builder.iter_included_files())
+    assert selected == [
+        "CMakeLists.txt",
+        "README.md",
+        "venv/f.txt",
+        "venv/pyvenv.cfg",
+    ]
+    assert sorted(builder.pruned) == [".git", "build/x", "out"]
+    builder.prune = False
+    selected = sorted(p.as_posix() for p in builder.iter_included_files())
+    assert len(selected) == 8
+    assert builder.pruned == []
@@ -0,0 +1,160 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from py_build_cmake.common import Module
+from py_build_cmake.export import vcs
+from py_build_cmake.export.sdist import SdistBuilder
+
+pytestmark = pytest.mark.skipif(not shutil.which("git"), reason="requires git")
+
+files = [
+    "CMakeLists.txt",
+    "README.md",
+    "src/a.c",
+    "src/sub/b.c",
+    "pkg/__init__.py",
+    "pkg/mod.py",
+    "pkg/deleted.py",
+]
+
+
+def git(repo: Path, *args: str):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path: Path):
+    for f in [*files, "src/untracked.c", "pkg/untracked.py"]:
+        (tmp_path / f).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / f).write_text("")
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "add", *files)
+    (tmp_path / "pkg" / "deleted.py").unlink()
+    return tmp_path
+
+
+def make_builder(tree: Path, includes, excludes, vcs="git", **kwargs):
+    module = Module(
+        name="pkg",
+        full_path=tree / "pkg",
+        base_path=tree,
+        is_package=True,
+        is_namespace=False,
+    )
+    return SdistBuilder(
+        module,
+        None,  # type: ignore[arg-type]
+        None,  # type: ignore[arg-type]
+        cfgdir=tree,
+        extra_files=[],
+        include_patterns=includes,
+        exclude_patterns=excludes,
+        vcs=vcs,
+        **kwargs,
+    )
+
+
+def select(builder: SdistBuilder):
+    files = builder.apply_includes_excludes(builder.select_files())
+    return [f.as_posix() for f in files]
+
+
+def test_sdist_vcs_select(repo: Path):
+    builder = make_builder(repo, ["**"], ["src/sub"])
+    assert select(builder) == [
+        "CMakeLists.txt",
+        "README.md",
+        "pkg/__init__.py",
+        "pkg/mod.py",
+        "src/a.c",
+    ]
+    builder = make_builder(repo, ["src"], [], vcs="none")
+    assert "src/untracked.c" in select(builder)
+    assert "pkg/untracked.py" in select(builder)
+
+
+def test_sdist_vcs_fallback(repo: Path):
+    shutil.rmtree(repo / ".git")
+    builder = make_builder(repo, ["src/*.c"], [])
+    assert select(builder) == [
+        "pkg/__init__.py",
+        "pkg/mod.py",
+        "pkg/untracked.py",
+        "src/a.c",
+        "src/untracked.c",
+    ]
+
+
+def test_sdist_vcs_cache(repo: Path, monkeypatch: pytest.MonkeyPatch):
+    listing = vcs.list_git_files(repo)
+    assert listing is not None
+    assert sorted(listing.files) == sorted(files)
+    assert vcs.get_git_files_cache_file(repo).exists()
+    # The cached listing is used as long as the index does not change
+    monkeypatch.setattr(vcs, "run_git_ls_files", lambda _: None)
+    assert vcs.list_git_files(repo) == listing
+    monkeypatch.undo()
+    git(repo, "add", "src/untracked.c")
+    listing = vcs.list_git_files(repo)
+    assert listing is not None
+    assert "src/untracked.c" in listing.files
+
+
+def test_sdist_vcs_parse_ls_files():
+    output = (
+        b"100644 0123 0\ta.c\0"
+        b"100644 4567 1\tconflict.c\x00100644 89ab 2\tconflict.c\0"
+        b"160000 cdef 0\textern/lib\0"
+    )
+    listing = vcs.parse_ls_files(output)
+    assert listing.files == ["a.c", "conflict.c"]
+    assert listing.submodules == ["extern/lib"]
+
+
+def test_sdist_vcs_submodule(repo: Path):
+    lib = repo / "extern" / "lib"
+    lib_files = [
+        "lib.c",
+        "include/lib.h",
+        "build/CMakeCache.txt",
+        "build/gen.c",
+        "venv/pyvenv.cfg",
+        "venv/site.py",
+        "out/lib.o",
+        "__pycache__/x.pyc",
+    ]
+    for f in lib_files:
+        (lib / f).parent.mkdir(parents=True, exist_ok=True)
+        (lib / f).write_text("")
+    git(lib, "init", "-q")
+    git(lib, "add", "lib.c", "include/lib.h")
+    git(lib, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "lib")
+    git(repo, "add", "extern/lib")
+    listing = vcs.list_git_files(repo)
+    assert listing is not None
+    assert listing.submodules == ["extern/lib"]
+    # Build directories, virtual environments and prune_dirs are skipped
+    builder = make_builder(repo, ["extern"], [], prune_dirs=[lib / "out"])
+    assert select(builder) == [
+        "extern/lib/include/lib.h",
+        "extern/lib/lib.c",
+        "pkg/__init__.py",
+        "pkg/mod.py",
+    ]
+    assert sorted(builder.pruned) == [
+        "extern/lib/.git",
+        "extern/lib/__pycache__",
+        "extern/lib/build",
+        "extern/lib/out",
+        "extern/lib/venv",
+    ]
+    # Unless they are included explicitly, or pruning is disabled
+    builder = make_builder(repo, ["extern", "extern/lib/build/gen.c"], [])
+    assert "extern/lib/build/gen.c" in select(builder)
+    assert "extern/lib/venv/site.py" not in select(builder)
+    builder = make_builder(repo, ["extern"], [], prune=False)
+    assert "extern/lib/venv/site.py" in select(builder)
+    assert "extern/lib/out/lib.o" in select(builder)
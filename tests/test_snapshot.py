@@ -0,0 +1,212 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import tarfile
+import time
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from py_build_cmake.cli import cli
+from py_build_cmake.commands.snapshot import (
+    export_snapshot,
+    get_snapshot_fingerprint,
+    get_snapshot_path,
+    import_snapshot,
+)
+
+
+def write_source(src_dir: Path):
+    (src_dir / "src").mkdir(parents=True)
+    (src_dir / "CMakeLists.txt").write_text("project(test C)\n")
+    (src_dir / "src" / "a.c").write_text("int a(void) { return 1; }\n")
+    (src_dir / "src" / "b.c").write_text("int b(void) { return 2; }\n")
+
+
+def write_build(src_dir: Path, build_dir: Path):
+    (build_dir / "CMakeFiles").mkdir(parents=True)
+    (build_dir / "CMakeCache.txt").write_text(
+        f"CMAKE_CACHEFILE_DIR:INTERNAL={build_dir.as_posix()}\n"
+        f"CMAKE_HOME_DIRECTORY:INTERNAL={src_dir.as_posix()}\n"
+        f"OTHER_DIR:PATH={src_dir.as_posix()}-other\n"
+    )
+    (build_dir / "CMakeFiles" / "a.o").write_bytes(b"\0" + str(src_dir).encode())
+    (build_dir / "CMakeFiles" / "b.o").write_bytes(b"\0")
+    (build_dir / "CMakeFiles" / "b.o.d").write_text(
+        f"CMakeFiles/b.o: {src_dir.as_posix()}/src/b.c \\\n /usr/include/stdio.h\n"
+    )
+
+
+def test_snapshot_relocate(tmp_path: Path):
+    src_a, src_b = tmp_path / "a", tmp_path / "b"
+    build_a = src_a / ".py-build-cmake_cache" / "cp311"
+    build_b = src_b / ".py-build-cmake_cache" / "cp311"
+    write_source(src_a)
+    write_build(src_a, build_a)
+    store = tmp_path / "store"
+    snapshot = export_snapshot(store, build_a, src_a, "cp311", "0123")
+    assert snapshot.is_file()
+    # Fresh checkout in a different location, with one modified file
+    write_source(src_b)
+    (src_b / "src" / "b.c").write_text("int b(void) { return 3; }\n")
+    old = 1_000_000_000
+    for f in ("CMakeLists.txt", "src/a.c", "src/b.c"):
+        os.utime(src_b / f, (old, old))
+    assert import_snapshot(store, build_b, src_b, "cp311", "0123") == snapshot
+    cache = (build_b / "CMakeCache.txt").read_text()
+    assert f"CMAKE_CACHEFILE_DIR:INTERNAL={build_b.as_posix()}\n" in cache
+    assert f"CMAKE_HOME_DIRECTORY:INTERNAL={src_b.as_posix()}\n" in cache
+    assert f"OTHER_DIR:PATH={src_a.as_posix()}-other\n" in cache
+    # Binary files are not relocated
+    assert (build_b / "CMakeFiles" / "a.o").read_bytes() == b"\0" + str(src_a).encode()
+    # The source files are not modified, only the outputs that depend on the
+    # modified file are older than it
+    for f in ("CMakeLists.txt", "src/a.c", "src/b.c"):
+        assert (src_b / f).stat().st_mtime == old
+    assert (build_b / "CMakeCache.txt").stat().st_mtime >= old
+    assert (build_b / "CMakeFiles" / "a.o").stat().st_mtime >= old
+    assert (build_b / "CMakeFiles" / "b.o").stat().st_mtime < old
+    assert not list(build_b.parent.glob(".*.tmp"))
+
+
+def test_snapshot_import_existing(tmp_path: Path):
+    src = tmp_path / "src"
+    build = tmp_path / "build"
+    write_source(src)
+    write_build(src, build)
+    store = tmp_path / "store"
+    assert import_snapshot(store, build, src, "cp311", "0123") is None
+    export_snapshot(store, build, src, "cp311", "0123")
+    (build / "CMakeCache.txt").write_text("modified")
+    assert import_snapshot(store, build, src, "cp311", "0123") is None
+    assert (build / "CMakeCache.txt").read_text() == "modified"
+    assert import_snapshot(store, build, src, "cp311", "0123", force=True)
+    assert (build / "CMakeCache.txt").read_text().startswith("CMAKE_CACHEFILE_DIR")
+
+
+def test_snapshot_fingerprint(tmp_path: Path):
+    def fingerprint(src_dir: Path, *extra: str):
+        cmake_cfg = {
+            "build_path": src_dir / ".py-build-cmake_cache" / "{build_config}",
+            "source_path": src_dir,
+            "build_type": "Release",
+        }
+        return get_snapshot_fingerprint("cp311", cmake_cfg, None, src_dir, extra)
+
+    a, b = tmp_path / "a", tmp_path / "b"
+    assert fingerprint(a) == fingerprint(b)
+    assert fingerprint(a) != fingerprint(a, "gcc-14")
+
+
+def test_snapshot_cli(tmp_path: Path):
+    (tmp_path / "pyproject.toml").write_text(
+        "[project]\n"
+        'name = "snapshot-test"\n'
+        'version = "0.1.0"\n'
+        'description = "Test"\n'
+        "[tool.py-build-cmake.module]\n"
+        'name = "snapshot_test"\n'
+        "[tool.py-build-cmake.cmake]\n"
+        'minimum_version = "3.15"\n'
+    )
+    (tmp_path / "snapshot_test.py").write_text('"""Test"""\n')
+    (tmp_path / "CMakeLists.txt").write_text("project(test NONE)\n")
+    build = tmp_path / "build"
+    store = tmp_path / "store"
+    args = ["-C", str(tmp_path), "-B", str(build), "snapshot"]
+    result = CliRunner().invoke(cli, [*args, "export", "--store", str(store)])
+    assert result.exit_code != 0
+    assert "has not been configured" in result.output
+    write_build(tmp_path, build)
+    result = CliRunner().invoke(cli, [*args, "export", "--store", str(store)])
+    assert result.exit_code == 0, result.output
+    snapshot = Path(result.output.strip())
+    assert snapshot.is_file()
+    result = CliRunner().invoke(cli, [*args, "import", "--store", str(store)])
+    assert result.exit_code == 0, result.output
+    assert "No snapshot restored" in result.output
+    result = CliRunner().invoke(
+        cli, [*args, "import", "--store", str(store), "--force"]
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output.strip() == str(snapshot)
+
+
+@pytest.mark.skipif(
+    not (shutil.which("cmake") and shutil.which("make") and shutil.which("cc")),
+    reason="requires cmake, make and a C compiler",
+)
+def test_snapshot_rebuild_makefiles(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("CMAKE_GENERATOR", raising=False)
+    src_a, src_b = tmp_path / "a", tmp_path / "b"
+    build_a, build_b = tmp_path / "build-a", tmp_path / "build-b"
+    for src in (src_a, src_b):
+        (src / "src").mkdir(parents=True)
+        (src / "CMakeLists.txt").write_text(
+            "cmake_minimum_required(VERSION 3.15)\n"
+            "project(test C)\n"
+            "add_library(test STATIC src/a.c src/b.c)\n"
+        )
+        (src / "src" / "a.c").write_text("int a(void) { return 1; }\n")
+        (src / "src" / "b.c").write_text('#include "b.h"\nint b(void) { return B; }\n')
+        (src / "src" / "b.h").write_text("#define B 2\n")
+
+    def cmake(*args: str) -> str:
+        cmd = ["cmake", *args]
+        return subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+
+    cmake("-S", str(src_a), "-B", str(build_a), "-G", "Unix Makefiles")
+    cmake("--build", str(build_a))
+    store = tmp_path / "store"
+    export_snapshot(store, build_a, src_a, "cp311", "0123")
+    # Fresh checkout with a modified header, all files have the same mtime
+    (src_b / "src" / "b.h").write_text("#define B 3\n")
+    checkout = time.time_ns()
+    for f in ("CMakeLists.txt", "src/a.c", "src/b.c", "src/b.h"):
+        os.utime(src_b / f, ns=(checkout, checkout))
+    assert import_snapshot(store, build_b, src_b, "cp311", "0123")
+    output = cmake("--build", str(build_b))
+    assert "a.c.o" not in output
+    assert "b.c.o" in output
+    assert "Configuring done" not in output
+    for f in ("CMakeLists.txt", "src/a.c", "src/b.c", "src/b.h"):
+        assert (src_b / f).stat().st_mtime_ns == checkout
+    # Changes to the CMakeLists.txt file cause CMake to re-run
+    with (src_b / "CMakeLists.txt").open("a") as f:
+        f.write("# changed\n")
+    os.utime(src_b / "CMakeLists.txt", ns=(checkout, checkout))
+    assert import_snapshot(store, build_b, src_b, "cp311", "0123", force=True)
+    assert "Configuring done" in cmake("--build", str(build_b))
+
+
+def test_snapshot_ninja(tmp_path: Path):
+    src_a, src_b = tmp_path / "a", tmp_path / "b"
+    build_a, build_b = tmp_path / "build-a", tmp_path / "build-b"
+    write_source(src_a)
+    write_source(src_b)
+    write_build(src_a, build_a)
+    (build_a / "build.ninja").write_text("")
+    (build_a / ".ninja_log").write_text("# ninja log v5\n")
+    store = tmp_path / "store"
+    # Ninja's logs cannot be relocated, so Ninja build directories are refused
+    # rather than silently rebuilding everything
+    with pytest.raises(ValueError, match="Ninja"):
+        export_snapshot(store, build_a, src_a, "cp311", "0123")
+    assert not store.exists() or not any(store.iterdir())
+    # Snapshots of Ninja build directories are not restored either
+    store.mkdir(exist_ok=True)
+    snapshot = get_snapshot_path(store, "cp311", "0123")
+    metadata = {"version": 1, "source_dir": str(src_a), "build_dir": str(build_a)}
+    metadata_bytes = json.dumps({**metadata, "sources": {}}).encode()
+    with tarfile.open(snapshot, "w:gz") as tar:
+        info = tarfile.TarInfo("py-build-cmake-snapshot.json")
+        info.size = len(metadata_bytes)
+        tar.addfile(info, io.BytesIO(metadata_bytes))
+        tar.add(build_a / "build.ninja", arcname="build.ninja")
+    with pytest.raises(ValueError, match="Ninja"):
+        import_snapshot(store, build_b, src_b, "cp311", "0123")
+    assert not build_b.exists()
+    assert not list(tmp_path.glob(".*.tmp"))
@@ -0,0 +1,77 @@
+import errno
+import os
+from pathlib import Path
+
+import pytest
+
+from py_build_cmake.export import staging
+from py_build_cmake.export.staging import stage_files
+
+
+@pytest.fixture
+def files(tmp_path: Path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    pairs = []
+    for i in range(20):
+        (src / f"{i}.py").write_text(f"x = {i}\n")
+        os.utime(src / f"{i}.py", (1700000000, 1700000000))
+        pairs.append((src / f"{i}.py", dst / f"{i}.py"))
+    return pairs
+
+
+def check_contents(files):
+    for src, dst in files:
+        assert dst.read_bytes() == src.read_bytes()
+        assert dst.stat().st_mtime == src.stat().st_mtime
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_stage_copy(files, workers):
+    stage_files(files, "copy", max_workers=workers)
+    check_contents(files)
+    assert not any(src.samefile(dst) for src, dst in files)
+
+
+def test_stage_hardlink(files):
+    stage_files(files, "hardlink")
+    check_contents(files)
+    assert all(src.samefile(dst) for src, dst in files)
+
+
+def test_stage_auto(files):
+    src, dst = files[0]
+    assert staging.select_staging_method(src, dst.parent) in ("reflink", "hardlink")
+    stage_files(files, "auto")
+    check_contents(files)
+
+
+def test_stage_fallback(files, monkeypatch):
+    def unsupported(src, dst):
+        raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+    monkeypatch.setattr(staging, "reflink", unsupported)
+    stage_files(files[:10], "reflink", max_workers=2)
+    check_contents(files[:10])
+    assert all(src.samefile(dst) for src, dst in files[:10])
+    monkeypatch.setattr(os, "link", unsupported)
+    stage_files(files[10:], "reflink", max_workers=2)
+    check_contents(files[10:])
+    assert not any(src.samefile(dst) for src, dst in files[10:])
+
+
+def test_stage_replace(files, tmp_path):
+    src, dst = files[0]
+    other = tmp_path / "other.py"
+    other.write_text("other\n")
+    os.link(other, dst)
+    stage_files([(src, dst)], "copy", replace=True)
+    check_contents([(src, dst)])
+    assert other.read_text() == "other\n"
+
+
+def test_stage_error(files, tmp_path):
+    missing = (tmp_path / "missing", tmp_path / "dst" / "missing")
+    with pytest.raises(FileNotFoundError):
+        stage_files([*files, missing], "copy", max_workers=4)
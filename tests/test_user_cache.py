@@ -0,0 +1,111 @@
+import json
+from pathlib import Path
+
+from py_build_cmake.build import _BuildBackend
+from py_build_cmake.commands.user_cache import (
+    evict,
+    lock_entry,
+    metadata_name,
+    use_entry,
+)
+from py_build_cmake.common import BuildPaths
+
+
+def prepare_entry(*args) -> Path:
+    with use_entry(*args) as entry:
+        return entry
+
+
+def write_source(src_dir: Path, contents: str = "int a(void) { return 1; }\n"):
+    (src_dir / "src").mkdir(parents=True)
+    (src_dir / "CMakeLists.txt").write_text("project(test C)\n")
+    (src_dir / "src" / "a.c").write_text(contents)
+    # The default build cache is not part of the sources
+    (src_dir / ".py-build-cmake_cache").mkdir()
+    (src_dir / ".py-build-cmake_cache" / "config.pickle").write_bytes(b"\0")
+
+
+def test_user_cache_relocate(tmp_path: Path):
+    cache_dir = tmp_path / "cache"
+    src_a, src_b, src_c = tmp_path / "a", tmp_path / "b", tmp_path / "c"
+    write_source(src_a)
+    write_source(src_b)
+    write_source(src_c, "int a(void) { return 2; }\n")
+    entry = prepare_entry(cache_dir, "pkg", "1.0", src_a, 1 << 30)
+    assert entry.parent == cache_dir
+    assert entry.name.startswith("pkg-1.0-")
+    build_dir = entry / "cp311"
+    build_dir.mkdir()
+    (build_dir / "CMakeCache.txt").write_text(
+        f"CMAKE_HOME_DIRECTORY:INTERNAL={src_a.as_posix()}\n"
+    )
+    # Same sources in a different directory
+    assert prepare_entry(cache_dir, "pkg", "1.0", src_b, 1 << 30) == entry
+    cache = (build_dir / "CMakeCache.txt").read_text()
+    assert cache == f"CMAKE_HOME_DIRECTORY:INTERNAL={src_b.as_posix()}\n"
+    metadata = json.loads((entry / metadata_name).read_text())
+    assert metadata["source_dir"] == str(src_b)
+    # Different sources
+    assert prepare_entry(cache_dir, "pkg", "1.0", src_c, 1 << 30) != entry
+
+
+def test_user_cache_relocate_ninja(tmp_path: Path):
+    cache_dir = tmp_path / "cache"
+    src_a, src_b = tmp_path / "a", tmp_path / "b"
+    write_source(src_a)
+    write_source(src_b)
+    entry = prepare_entry(cache_dir, "pkg", "1.0", src_a, 1 << 30)
+    (entry / "cp311").mkdir()
+    (entry / "cp311" / "build.ninja").write_text("")
+    (entry / "cp311-1").mkdir()
+    (entry / "cp311-1" / "Makefile").write_text("")
+    # Ninja build directories cannot be relocated, so they are removed
+    assert prepare_entry(cache_dir, "pkg", "1.0", src_b, 1 << 30) == entry
+    assert not (entry / "cp311").exists()
+    assert (entry / "cp311-1" / "Makefile").is_file()
+
+
+def test_user_cache_evict(tmp_path: Path):
+    for i, name in enumerate(("old", "keep", "new")):
+        entry = tmp_path / name
+        entry.mkdir()
+        metadata = {"source_dir": "", "size": 100, "last_used": i}
+        (entry / metadata_name).write_text(json.dumps(metadata))
+    evict(tmp_path, 300, tmp_path / "keep")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["keep", "new", "old"]
+    # Entries that are in use by other builds are not removed
+    with lock_entry(tmp_path / "new"):
+        evict(tmp_path, 150, tmp_path / "keep")
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == ["keep", "new"]
+    evict(tmp_path, 150, tmp_path / "keep")
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == ["keep"]
+
+
+def test_user_cache_lock(tmp_path: Path):
+    src = tmp_path / "src"
+    write_source(src)
+    cache_dir = tmp_path / "cache"
+    with use_entry(cache_dir, "pkg", "1.0", src, 1 << 30) as entry, lock_entry(
+        entry, blocking=False
+    ) as locked:
+        # A second build of the same sources has to wait
+        assert not locked
+    with lock_entry(entry, blocking=False) as locked:
+        assert locked
+
+
+def test_user_cache_build_path(tmp_path: Path):
+    src_dir = tmp_path / "src"
+    paths = BuildPaths(
+        source_dir=src_dir,
+        build_dir=tmp_path / "cache" / "pkg-1.0-0123" / "cp311",
+        wheel_dir=tmp_path,
+        temp_dir=tmp_path,
+        staging_dir=tmp_path,
+        pkg_staging_dir=tmp_path,
+    )
+    default = src_dir / ".py-build-cmake_cache" / "cp311-1"
+    expected = tmp_path / "cache" / "pkg-1.0-0123" / "cp311-1"
+    assert _BuildBackend.get_cache_build_path(default, paths) == expected
+    custom = tmp_path / "build"
+    assert _BuildBackend.get_cache_build_path(custom, paths) == custom
@@ -0,0 +1,125 @@
+import shutil
+import zipfile
+from pathlib import Path
+
+import pytest
+from distlib.wheel import Wheel
+
+from py_build_cmake.build import _BuildBackend
+from py_build_cmake.common import ConfigError
+from py_build_cmake.export.manifest import WheelManifest
+from py_build_cmake.export.wheel import WheelBuilder
+
+
+def build(cls, staging: Path, out_dir: Path):
+    out_dir.mkdir()
+    whl = cls()
+    whl.name, whl.version, whl.dirname = "pkg", "1.0", str(out_dir)
+    paths = {"prefix": str(staging), "platlib": str(staging)}
+    tags = {"pyver": ["cp3"], "abi": ["none"], "arch": ["any"]}
+    wheel_path = whl.build(paths, tags=tags, wheel_version=(1, 0))
+    with zipfile.ZipFile(wheel_path) as zf:
+        return [
+            (info.filename, info.external_attr, zf.read(info)) for info in zf.infolist()
+        ]
+
+
+@pytest.mark.parametrize("source_date_epoch", [None, "1732565790"])
+def test_wheel_builder_record(tmp_path: Path, monkeypatch, source_date_epoch):
+    """The single-pass RECORD generation should give the same result as
+    distlib."""
+    if source_date_epoch is not None:
+        monkeypatch.setenv("SOURCE_DATE_EPOCH", source_date_epoch)
+    staging = tmp_path / "staging"
+    (staging / "pkg" / "sub").mkdir(parents=True)
+    (staging / "pkg-1.0.dist-info").mkdir()
+    (staging / "pkg-1.0.dist-info" / "METADATA").write_text("Name: pkg\n")
+    (staging / "pkg" / "__init__.py").write_text("")
+    (staging / "pkg" / "sub" / "lib.so").write_bytes(bytes(range(256)) * 1000)
+    expected = build(Wheel, staging, tmp_path / "distlib")
+    result = build(WheelBuilder, staging, tmp_path / "py-build-cmake")
+    assert result == expected
+    names = [name for name, _, _ in result]
+    assert names[-1] == "pkg-1.0.dist-info/RECORD"
+    record = result[-1][2].decode()
+    assert "pkg/sub/lib.so,sha256=" in record
+
+
+def test_wheel_builder_compression(tmp_path: Path):
+    staging = tmp_path / "staging"
+    (staging / "pkg").mkdir(parents=True)
+    (staging / "pkg-1.0.dist-info").mkdir()
+    (staging / "pkg-1.0.dist-info" / "METADATA").write_text("Name: pkg\n")
+    for name in ("__init__.py", "lib.so", "lib.so.debug"):
+        (staging / "pkg" / name).write_bytes(b"\0" * 10000)
+    whl = WheelBuilder()
+    whl.name, whl.version, whl.dirname = "pkg", "1.0", str(tmp_path)
+    whl.compression_level = 1
+    whl.compression_rules = [("*.so*", 9), ("*.debug", 0)]
+    paths = {"prefix": str(staging), "platlib": str(staging)}
+    wheel_path = whl.build(paths, wheel_version=(1, 0))
+    with zipfile.ZipFile(wheel_path) as zf:
+        assert zf.testzip() is None
+        infos = {info.filename: info for info in zf.infolist()}
+    assert infos["pkg/__init__.py"].compress_type == zipfile.ZIP_DEFLATED
+    assert infos["pkg/lib.so"].compress_type == zipfile.ZIP_DEFLATED
+    assert infos["pkg/lib.so.debug"].compress_type == zipfile.ZIP_STORED
+    assert infos["pkg/lib.so.debug"].compress_size == 10000
+    assert infos["pkg-1.0.dist-info/RECORD"].compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_wheel_compression_config():
+    get_compression = _BuildBackend.get_wheel_compression
+    assert get_compression({}, False) == (None, [])
+    assert get_compression({}, True) == (1, [])
+    wheel_cfg = {
+        "compression_level": 9,
+        "editable_compression_level": 0,
+        "compression_rules": {"*.debug": "store", "*.so": "3"},
+    }
+    rules = [("*.debug", 0), ("*.so", 3)]
+    assert get_compression(wheel_cfg, False) == (9, rules)
+    assert get_compression(wheel_cfg, True) == (0, rules)
+    with pytest.raises(ConfigError, match=r"wheel\.compression_level"):
+        get_compression({"compression_level": 10}, False)
+    with pytest.raises(ConfigError, match=r"wheel\.compression_rules\['\*'\]"):
+        get_compression({"compression_rules": {"*": "fast"}}, False)
+
+
+def test_wheel_builder_manifest(tmp_path: Path, monkeypatch):
+    """Building from a manifest should give the same result as building from
+    a staging directory with the same files."""
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1732565790")
+    src, staging = tmp_path / "src", tmp_path / "staging"
+    (src / "pkg").mkdir(parents=True)
+    (src / "pkg" / "__init__.py").write_text("")
+    (src / "pkg" / "__init__.pyc").write_bytes(b"")
+    (staging / "pkg" / "sub").mkdir(parents=True)
+    (staging / "pkg" / "sub" / "lib.so").write_bytes(bytes(range(256)) * 1000)
+    (staging / "pkg-1.0.dist-info").mkdir()
+    (staging / "pkg-1.0.dist-info" / "METADATA").write_text("Name: pkg\n")
+    manifest = WheelManifest()
+    manifest.add("pkg/__init__.py", src / "pkg" / "__init__.py")
+    manifest.add("pkg/__init__.pyc", src / "pkg" / "__init__.pyc")
+    manifest.add("pkg/sub/lib.so", src / "pkg" / "__init__.py")
+    manifest.add_tree(staging)  # replaces pkg/sub/lib.so
+    assert list(manifest.files) == [
+        "pkg/__init__.py",
+        "pkg/__init__.pyc",
+        "pkg/sub/lib.so",
+    ]
+    assert manifest.files["pkg/sub/lib.so"] == staging / "pkg" / "sub" / "lib.so"
+
+    (tmp_path / "virtual").mkdir()
+    whl = WheelBuilder()
+    whl.name, whl.version, whl.dirname = "pkg", "1.0", str(tmp_path / "virtual")
+    tags = {"pyver": ["cp3"], "abi": ["none"], "arch": ["any"]}
+    distinfo = staging / "pkg-1.0.dist-info"
+    wheel_path = whl.build_from_manifest(manifest.files, distinfo, False, tags, (1, 0))
+    with zipfile.ZipFile(wheel_path) as zf:
+        result = [(i.filename, i.external_attr, zf.read(i)) for i in zf.infolist()]
+
+    shutil.copy2(src / "pkg" / "__init__.py", staging / "pkg")
+    (distinfo / "WHEEL").unlink()
+    (distinfo / "RECORD").unlink()
+    assert build(WheelBuilder, staging, tmp_path / "staged") == result
@@ -0,0 +1,105 @@
+import logging
+from pathlib import Path
+
+from py_build_cmake import build
+from py_build_cmake.export import cache
+
+
+def test_wheel_cache_store_lookup(tmp_path):
+    cache_dir = tmp_path / "cache"
+    wheel_dir = tmp_path / "dist"
+    wheel_dir.mkdir()
+    wheel = tmp_path / "pkg-1.0-py3-none-any.whl"
+    wheel.write_bytes(b"wheel contents")
+
+    assert cache.lookup_cached_wheel(cache_dir, "abc", wheel_dir) is None
+    cache.store_cached_wheel(cache_dir, "abc", wheel)
+    assert cache.lookup_cached_wheel(cache_dir, "def", wheel_dir) is None
+    assert not (wheel_dir / wheel.name).exists()
+    assert cache.lookup_cached_wheel(cache_dir, "abc", wheel_dir) == wheel.name
+    assert (wheel_dir / wheel.name).read_bytes() == b"wheel contents"
+
+
+def test_build_outputs(tmp_path):
+    (tmp_path / "CMakeFiles").mkdir()
+    (tmp_path / "CMakeFiles" / "obj.o").write_bytes(b"")
+    (tmp_path / "install_manifest.txt").write_bytes(b"")
+    (tmp_path / "py-build-cmake-preload.cmake").write_bytes(b"")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "lib.so").write_bytes(b"")
+    (tmp_path / "py-build-cmake-install" / "sub").mkdir(parents=True)
+    (tmp_path / "py-build-cmake-install" / "sub" / "lib.so").write_bytes(b"")
+    (tmp_path / "CMakeCache.txt").write_bytes(b"")
+    outputs = [p.relative_to(tmp_path) for p in cache.iter_build_outputs(tmp_path)]
+    assert outputs == [Path("CMakeCache.txt"), Path("sub/lib.so")]
+
+
+def test_installed_sources(tmp_path):
+    src, build_dir = tmp_path / "src", tmp_path / "build"
+    (src / "include" / "sub").mkdir(parents=True)
+    (src / "include" / "a.h").write_bytes(b"")
+    (src / "include" / "sub" / "b.h").write_bytes(b"")
+    (src / "run.sh").write_bytes(b"")
+    (build_dir / "sub").mkdir(parents=True)
+    (build_dir / "lib.so").write_bytes(b"")
+    (build_dir / "cmake_install.cmake").write_text(
+        'file(INSTALL DESTINATION "${CMAKE_INSTALL_PREFIX}/bin"'
+        f' TYPE PROGRAM FILES "{(src / "run.sh").as_posix()}")\n'
+        'file(INSTALL DESTINATION "${CMAKE_INSTALL_PREFIX}/lib"'
+        f' TYPE SHARED_LIBRARY FILES "{(build_dir / "lib.so").as_posix()}")\n'
+    )
+    (build_dir / "sub" / "cmake_install.cmake").write_text(
+        '  file(INSTALL DESTINATION "${CMAKE_INSTALL_PREFIX}/include"'
+        f' TYPE DIRECTORY FILES "{(src / "include").as_posix()}/"'
+        ' FILES_MATCHING REGEX "/[^/]*\\.h$")\n'
+    )
+    sources = list(cache.iter_installed_sources(build_dir))
+    assert sources == [
+        src / "run.sh",
+        src / "include" / "a.h",
+        src / "include" / "sub" / "b.h",
+    ]
+
+
+def test_build_wheel_cache(tmp_path: Path, monkeypatch, caplog):
+    (tmp_path / "pyproject.toml").write_text(
+        "[project]\n"
+        'name = "cache-test"\n'
+        'version = "1.0"\n'
+        'description = "Test"\n'
+        "[tool.py-build-cmake.module]\n"
+        'name = "cache_test"\n'
+        "[tool.py-build-cmake.wheel]\n"
+        "cache = true\n"
+    )
+    (tmp_path / "cache_test.py").write_text('"""Test"""\n')
+    monkeypatch.chdir(tmp_path)
+    wheel_dir = tmp_path / "dist"
+    wheel_dir.mkdir()
+    caplog.set_level(logging.INFO)
+
+    def build_wheel(config_settings):
+        caplog.clear()
+        name = build.build_wheel(str(wheel_dir), config_settings)
+        reused = "reusing cached Wheel" in caplog.text
+        return wheel_dir / name, reused
+
+    wheel, reused = build_wheel({})
+    assert not reused
+    contents = wheel.read_bytes()
+    wheel.unlink()
+    wheel, reused = build_wheel({})
+    assert reused
+    assert wheel.read_bytes() == contents
+    (cached,) = tmp_path.glob(".py-build-cmake_cache/wheels/*/*.whl")
+    assert not wheel.samefile(cached)
+    # Modifying the returned Wheel in place does not affect the cache
+    with wheel.open("r+b") as f:
+        f.write(b"modified")
+    assert cached.read_bytes() == contents
+    wheel, reused = build_wheel({})
+    assert reused
+    assert wheel.read_bytes() == contents
+    # The rebuild config setting ignores the cached Wheel
+    wheel, reused = build_wheel({"rebuild": ""})
+    assert not reused